@@ -2,23 +2,26 @@ import os
 import csv
 import math
 import json
-import stripe
 import re
 import logging
 from math import radians, sin, cos, sqrt, atan2
 from datetime import datetime
 from os.path import isfile
 from functools import wraps
-from random import choice, Random
+from random import choice
 import threading
 import time
+import weakref
 
-# Einfacher In-Memory Rate-Limiter (thread-safe, kein externes Paket nötig)
+from utils.prozesse import anteil_pro_prozess
+
+# Einfacher In-Memory Rate-Limiter (thread-safe, kein externes Paket nötig); zählt pro Worker-Prozess
 _rate_limit_store = {}
 _rate_limit_lock = threading.Lock()
 
 def _is_rate_limited(ip, max_requests=20, window_seconds=300):
-    """Gibt True zurück wenn IP das Limit überschritten hat (max_requests pro window_seconds)."""
+    """Gibt True zurück wenn IP das Limit überschritten hat (max_requests pro window_seconds, für alle Worker zusammen)."""
+    max_requests = anteil_pro_prozess(max_requests)
     now = time.time()
     with _rate_limit_lock:
         if ip not in _rate_limit_store:
@@ -31,23 +34,15 @@ def _is_rate_limited(ip, max_requests=20, window_seconds=300):
         timestamps.append(now)
         return False
 
-# Importiere Stripe-Integration
-from stripe_integration import create_checkout_session, handle_payment_success
-
 from flask import (
-    Flask, render_template, request, redirect, session, url_for, flash, send_file, jsonify
+    Flask, render_template, request, redirect, session, url_for, flash, send_file, jsonify,
+    Response, stream_with_context, abort
 )
 from utils.geocode import get_coordinates_from_address
 from flask_login import LoginManager, login_required, login_user, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 
-from weasyprint import HTML
-from jinja2 import Environment, FileSystemLoader
-
-# Stripe API Key initialisieren
-stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
-
 # Import app und db
 from main import app, csrf
 from database import db
@@ -70,11 +65,16 @@ login_manager.login_message_category = "info"
 login_manager.session_protection = "basic"
 
 # Modelle importieren
-from models import Zahnarzt, Patient, Praxis, Oeffnungszeit, Leistung, TeamMitglied, Termin, PraxisBild, PaketBuchung, Claim, Terminanfrage, Bewertung, Behandlungsart, Verfuegbarkeit, Ausnahme, Stellenangebot, Bewerbung, ExternesInserat, JobAlert, SiteSettings
+from models import Zahnarzt, Patient, Praxis, Oeffnungszeit, Leistung, TeamMitglied, Termin, PraxisBild, PaketBuchung, Claim, Terminanfrage, Bewertung, Behandlungsart, Verfuegbarkeit, Ausnahme, Stellenangebot, Bewerbung, ExternesInserat, JobAlert, SiteSettings, Rechnung
 
 # TheirStack Service für externe Stellenangebote
 from services.theirstack_service import sync_external_jobs, should_refresh_jobs, get_external_jobs, get_cities_with_jobs
 
+# Gemeinsame Datenversion des Praxis-Bestands (für Caches)
+from services.praxis_snapshot import snapshot_version, adress_index, aktualisiere_csv_status, extrahiere_domain
+from services.job_suche import job_treffer, invalidiere_job_index
+from image_utils import ist_unveraenderlich
+
 @login_manager.user_loader
 def load_user(user_id):
     try:
@@ -107,6 +107,17 @@ def check_maintenance_mode():
         return render_template('maintenance.html'), 503
 
 
+@app.after_request
+def bild_cache_header(response):
+    """Inhaltsadressierte Bilder (und ihre Varianten) ändern sich nie und dürfen dauerhaft gecacht werden"""
+    if response.status_code in (200, 304) and ist_unveraenderlich(request.path):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    return response
+
+
 # Dynamischer SEO-Text - Stadt-basierter Index für konsistente Varianten pro Stadt
 def get_city_index(stadt, num_options):
     """Berechnet einen deterministischen Index basierend auf der Stadt.
@@ -316,8 +327,8 @@ def appointments():
 @app.route('/zahnarzt-<stadt_slug>')
 def zahnarzt_stadt(stadt_slug):
     """SEO-optimierte Stadtseite für Zahnärzte"""
-    from models import Praxis, StadtSEO, Bewertung
-    from sqlalchemy import func as sql_func
+    from models import StadtSEO
+    from services.praxis_suche import praxis_suche, SuchAnfrage
     
     stadt_name = stadt_slug.replace('-', ' ').title()
     umlaute = {'ue': 'ü', 'ae': 'ä', 'oe': 'ö'}
@@ -334,98 +345,11 @@ def zahnarzt_stadt(stadt_slug):
         flash('Der Ort konnte nicht gefunden werden.', 'warning')
         return redirect(url_for('index'))
     
-    alle_praxen = lade_praxen("zahnaerzte.csv")
-    
-    bewertung_stats = db.session.query(
-        Bewertung.praxis_id,
-        sql_func.avg(Bewertung.sterne).label('avg_sterne'),
-        sql_func.count(Bewertung.id).label('anzahl')
-    ).filter(Bewertung.bestaetigt == True).group_by(Bewertung.praxis_id).all()
-    bewertung_map = {b.praxis_id: {'avg': round(float(b.avg_sterne), 1), 'anzahl': int(b.anzahl)} for b in bewertung_stats}
-    
-    from models import Oeffnungszeit as OZ_Stadt
-    import pytz
-    berlin_tz_stadt = pytz.timezone('Europe/Berlin')
-    jetzt_stadt = datetime.now(berlin_tz_stadt)
-    wochentag_idx_stadt = jetzt_stadt.weekday()
-    tage_stadt = ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag']
-    aktueller_tag_stadt = tage_stadt[wochentag_idx_stadt]
-    aktuelle_zeit_stadt = jetzt_stadt.time()
-    
-    oz_alle_stadt = OZ_Stadt.query.all()
-    oz_by_praxis_stadt = {}
-    for oz in oz_alle_stadt:
-        if oz.praxis_id not in oz_by_praxis_stadt:
-            oz_by_praxis_stadt[oz.praxis_id] = {}
-        oz_by_praxis_stadt[oz.praxis_id][oz.tag] = oz
-    
-    db_praxen = Praxis.query.filter(Praxis.ist_demo != True).all()
-    for praxis in db_praxen:
-        if praxis.latitude and praxis.longitude:
-            bew = bewertung_map.get(praxis.id, {'avg': 0, 'anzahl': 0})
-            
-            oeffnungsstatus = None
-            if praxis.ist_verifiziert and praxis.id in oz_by_praxis_stadt:
-                oz_dict = oz_by_praxis_stadt[praxis.id]
-                if aktueller_tag_stadt in oz_dict:
-                    oz_heute = oz_dict[aktueller_tag_stadt]
-                    if not oz_heute.geschlossen and oz_heute.von and oz_heute.bis:
-                        if oz_heute.von <= aktuelle_zeit_stadt <= oz_heute.bis:
-                            oeffnungsstatus = 'geoeffnet'
-                        else:
-                            oeffnungsstatus = 'geschlossen'
-                    else:
-                        oeffnungsstatus = 'geschlossen'
-                else:
-                    oeffnungsstatus = 'geschlossen'
-            
-            alle_praxen.append({
-                'id': praxis.id,
-                'name': praxis.name,
-                'email': praxis.email or '',
-                'telefon': praxis.telefon or '',
-                'webseite': praxis.webseite or '',
-                'plz': praxis.plz or '',
-                'stadt': praxis.stadt or '',
-                'straße': praxis.strasse or '',
-                'lat': float(praxis.latitude),
-                'lng': float(praxis.longitude),
-                'slug': praxis.slug,
-                'aus_datenbank': True,
-                'paket': praxis.paket,
-                'landingpage_aktiv': praxis.landingpage_aktiv,
-                'beansprucht': 'ja' if praxis.ist_verifiziert else 'nein',
-                'bewertung_avg': bew['avg'],
-                'bewertung_anzahl': bew['anzahl'],
-                'google_rating': praxis.google_rating,
-                'google_review_count': praxis.google_review_count or 0,
-                'oeffnungsstatus': oeffnungsstatus
-            })
-    
-    gefilterte_praxen = []
-    for praxis in alle_praxen:
-        distanz = entfernung_km(lat, lng, praxis['lat'], praxis['lng'])
-        if distanz <= umkreis:
-            praxis['entfernung'] = distanz
-            gefilterte_praxen.append(praxis)
-    
-    import hashlib
-    heute = datetime.now().strftime('%Y-%m-%d')
-    hash_input = f"{heute}-{stadt_slug}".encode('utf-8')
-    rotation_seed = int(hashlib.sha256(hash_input).hexdigest(), 16) % (2**32)
-    rng = Random(rotation_seed)
-    
-    premium_praxen = [p for p in gefilterte_praxen if p.get('paket', '').lower() in ('premium', 'premiumplus')]
-    standard_praxen = [p for p in gefilterte_praxen if p.get('paket', '').lower() not in ('premium', 'premiumplus')]
-    
-    rng.shuffle(premium_praxen)
-    standard_praxen.sort(key=lambda p: p['entfernung'])
-    gefilterte_praxen = premium_praxen + standard_praxen
-    
-    start = (seite - 1) * eintraege_pro_seite
-    end = start + eintraege_pro_seite
-    ergebnisse = gefilterte_praxen[start:end]
-    gesamt_seiten = math.ceil(len(gefilterte_praxen) / eintraege_pro_seite)
+    ergebnis = praxis_suche.suche(SuchAnfrage(
+        lat, lng, umkreis, seite, eintraege_pro_seite, rotation=stadt_slug
+    ))
+    ergebnisse = ergebnis.eintraege
+    gesamt_seiten = ergebnis.gesamt_seiten
     
     stadt_seo = StadtSEO.query.filter_by(stadt_slug=stadt_slug).first()
     
@@ -555,7 +479,7 @@ def zahnarzt_stadt(stadt_slug):
 
 @app.route('/suche')
 def suche():
-    from models import Praxis
+    from services.praxis_suche import praxis_suche, SuchAnfrage
     
     ort = request.args.get('ort', '').strip()
     behandlung = request.args.get('behandlung')
@@ -594,108 +518,12 @@ def suche():
         flash('Der Ort konnte nicht gefunden werden. Bitte überprüfen Sie Ihre Eingabe.', 'warning')
         return redirect(url_for('index'))
 
-    # CSV-Praxen laden
-    alle_praxen = lade_praxen("zahnaerzte.csv")
-    
-    # Datenbank-Praxen hinzufügen (alle, nicht nur mit aktiver Landingpage)
-    from models import Bewertung, Oeffnungszeit
-    from sqlalchemy import func as sql_func
-    db_praxen = Praxis.query.filter(Praxis.ist_demo != True).all()
-    
-    bewertung_stats = db.session.query(
-        Bewertung.praxis_id,
-        sql_func.avg(Bewertung.sterne).label('avg_sterne'),
-        sql_func.count(Bewertung.id).label('anzahl')
-    ).filter(Bewertung.bestaetigt == True).group_by(Bewertung.praxis_id).all()
-    bewertung_map = {b.praxis_id: {'avg': round(float(b.avg_sterne), 1), 'anzahl': int(b.anzahl)} for b in bewertung_stats}
-    
-    import pytz
-    berlin_tz = pytz.timezone('Europe/Berlin')
-    jetzt_berlin = datetime.now(berlin_tz)
-    wochentag_index = jetzt_berlin.weekday()
-    tage_reihenfolge_suche = ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag']
-    aktueller_tag_suche = tage_reihenfolge_suche[wochentag_index]
-    aktuelle_zeit_suche = jetzt_berlin.time()
-    
-    oz_alle = Oeffnungszeit.query.all()
-    oz_by_praxis = {}
-    for oz in oz_alle:
-        if oz.praxis_id not in oz_by_praxis:
-            oz_by_praxis[oz.praxis_id] = {}
-        oz_by_praxis[oz.praxis_id][oz.tag] = oz
-    
-    for praxis in db_praxen:
-        if praxis.latitude and praxis.longitude:
-            bew = bewertung_map.get(praxis.id, {'avg': 0, 'anzahl': 0})
-            
-            oeffnungsstatus = None
-            if praxis.ist_verifiziert and praxis.id in oz_by_praxis:
-                oz_dict = oz_by_praxis[praxis.id]
-                if aktueller_tag_suche in oz_dict:
-                    oz_heute = oz_dict[aktueller_tag_suche]
-                    if not oz_heute.geschlossen and oz_heute.von and oz_heute.bis:
-                        if oz_heute.von <= aktuelle_zeit_suche <= oz_heute.bis:
-                            oeffnungsstatus = 'geoeffnet'
-                        else:
-                            oeffnungsstatus = 'geschlossen'
-                    else:
-                        oeffnungsstatus = 'geschlossen'
-                else:
-                    oeffnungsstatus = 'geschlossen'
-            
-            alle_praxen.append({
-                'id': praxis.id,
-                'name': praxis.name,
-                'email': praxis.email or '',
-                'telefon': praxis.telefon or '',
-                'webseite': praxis.webseite or '',
-                'plz': praxis.plz or '',
-                'stadt': praxis.stadt or '',
-                'straße': praxis.strasse or '',
-                'lat': float(praxis.latitude),
-                'lng': float(praxis.longitude),
-                'slug': praxis.slug,
-                'aus_datenbank': True,
-                'paket': praxis.paket,
-                'landingpage_aktiv': praxis.landingpage_aktiv,
-                'beansprucht': 'ja' if praxis.ist_verifiziert else 'nein',
-                'bewertung_avg': bew['avg'],
-                'bewertung_anzahl': bew['anzahl'],
-                'google_rating': praxis.google_rating,
-                'google_review_count': praxis.google_review_count or 0,
-                'oeffnungsstatus': oeffnungsstatus
-            })
-
-    gefilterte_praxen = []
-    for praxis in alle_praxen:
-        distanz = entfernung_km(lat, lng, praxis['lat'], praxis['lng'])
-        if distanz <= umkreis:
-            praxis['entfernung'] = distanz
-            gefilterte_praxen.append(praxis)
-
-    # Trennung in Premium und Standard-Praxen (case-insensitive)
-    premium_praxen = [p for p in gefilterte_praxen if p.get('paket', '').lower() in ('premium', 'premiumplus')]
-    standard_praxen = [p for p in gefilterte_praxen if p.get('paket', '').lower() not in ('premium', 'premiumplus')]
-    
-    # Tagesbasierte Rotation für Premium-Praxen
-    # Seed basiert auf Datum + Ort für konsistente Ergebnisse am selben Tag
-    import hashlib
-    heute = datetime.now().strftime('%Y-%m-%d')
-    hash_input = f"{heute}-{ort.lower()}".encode('utf-8')
-    rotation_seed = int(hashlib.sha256(hash_input).hexdigest(), 16) % (2**32)
-    rng = Random(rotation_seed)
-    rng.shuffle(premium_praxen)
-    
-    # Standard-Praxen nach Entfernung sortieren
-    standard_praxen.sort(key=lambda p: p['entfernung'])
-    
-    # Kombinieren: Premium zuerst, dann Standard
-    gefilterte_praxen = premium_praxen + standard_praxen
-
-    start = (seite - 1) * eintraege_pro_seite
-    end = start + eintraege_pro_seite
-    ergebnisse = gefilterte_praxen[start:end]
-    gesamt_seiten = math.ceil(len(gefilterte_praxen) / eintraege_pro_seite)
+    # Premium-Praxen zuerst (tagesbasierte Rotation je Ort), dann Standard-Praxen nach Entfernung
+    ergebnis = praxis_suche.suche(SuchAnfrage(
+        lat, lng, umkreis, seite, eintraege_pro_seite, rotation=ort.lower()
+    ))
+    ergebnisse = ergebnis.eintraege
+    gesamt_seiten = ergebnis.gesamt_seiten
 
     canonical_url = None
     meta_robots = 'noindex, follow'
@@ -719,61 +547,9 @@ def suche():
         meta_robots=meta_robots
     )
 
-# Modul-Level-Cache für die CSV-Praxen (Speicher sparen: nur 1× laden pro Worker)
-_praxen_cache = {}  # {csv_datei: {"daten": [...], "mtime": float, "ladezeit": float}}
-
-def lade_praxen(csv_datei):
-    """Lädt Praxen aus CSV mit Modul-Level-Cache (wird nur bei Dateiänderung neu geladen)."""
-    import time
-    global _praxen_cache
-
-    # Cache-Check: Datei-Änderungszeit prüfen
-    try:
-        mtime = os.path.getmtime(csv_datei)
-    except OSError:
-        mtime = 0
-
-    cached = _praxen_cache.get(csv_datei)
-    if cached and cached["mtime"] == mtime:
-        return cached["daten"]
-
-    praxen = []
-    with open(csv_datei, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for original_idx, row in enumerate(reader):
-            try:
-                raw_lat = row['lat'].replace(',', '').replace('.', '')
-                raw_lng = row['lng'].replace(',', '').replace('.', '')
-                lat = int(raw_lat) / 1e7
-                lng = int(raw_lng) / 1e7
-
-                if 45 <= lat <= 55 and 5 <= lng <= 15:
-                    praxen.append({
-                        'csv_id': f"csv_{original_idx}",
-                        'csv_original_idx': original_idx,
-                        'name': row['name'],
-                        'email': row['email'],
-                        'telefon': row['telefon'],
-                        'webseite': row['webseite'],
-                        'plz': row['plz'],
-                        'stadt': row['stadt'],
-                        'straße': row['straße'],
-                        'lat': lat,
-                        'lng': lng,
-                        'paket': '',
-                        'beansprucht': 'nein',
-                        'aus_csv': True,
-                        'google_rating': None,
-                        'google_review_count': 0,
-                        'bewertung_avg': 0,
-                        'bewertung_anzahl': 0
-                    })
-            except Exception as e:
-                print(f"⚠️ Fehler in Zeile: {row}\nGrund: {e}")
-                continue
-    print(f"{len(praxen)} Praxen geladen (mtime={mtime})")
-    _praxen_cache[csv_datei] = {"daten": praxen, "mtime": mtime}
-    return praxen
+# CSV-Praxen aus dem gemappten Datensatz (siehe services/praxis_snapshot.py); die
+# Umkreissuche der Suchrouten läuft über services/praxis_suche.py
+from services.praxis_snapshot import csv_praxis as csv_praxis_nach_index
 
 def entfernung_km(lat1, lng1, lat2, lng2):
     R = 6371
@@ -833,16 +609,9 @@ def register():
         
         # Prüfen, ob die Praxis bereits beansprucht wurde
         if strasse and plz:
-            datei = "zahnaerzte.csv"
-            if os.path.isfile(datei):
-                with open(datei, newline='', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        if (row["straße"].strip().lower() == strasse.strip().lower() and
-                            row["plz"].strip() == plz.strip()):
-                            if row.get("beansprucht", "").strip().lower() == "ja":
-                                flash("Hinweis: Diese Praxis wurde bereits beansprucht. Ihre Anfrage wird nach der Registrierung von unserem Team geprüft.", "warning")
-                            break
+            treffer = adress_index().finde_genaue_adresse(plz, strasse)
+            if treffer and treffer['beansprucht'] == "ja":
+                flash("Hinweis: Diese Praxis wurde bereits beansprucht. Ihre Anfrage wird nach der Registrierung von unserem Team geprüft.", "warning")
 
     if request.method == "POST":
         vorname = request.form["vorname"]
@@ -883,135 +652,25 @@ def register():
         from werkzeug.security import generate_password_hash
         session["passwort_hash"] = generate_password_hash(passwort)
 
-        # Duplikatprüfung (CSV + Datenbank) mit Fuzzy-Matching
-        import re as re_mod
-        
-        def normalize_strasse(s):
-            """Straßenname ohne Hausnummer extrahieren und normalisieren"""
-            s = s.strip().lower()
-            s = re_mod.sub(r'\s*\d+[\s\-/]*\d*\s*[a-zA-Z]?\s*$', '', s)
-            s = re_mod.sub(r'\s+', ' ', s).strip()
-            s = s.replace('str.', 'straße').replace('strasse', 'straße')
-            return s
-        
-        def normalize_stadt(s):
-            """Stadt normalisieren: Stadtteil-Zusatz nach Bindestrich entfernen"""
-            s = s.strip().lower()
-            return s
-        
-        def staedte_match(stadt1, stadt2):
-            """Prüft ob zwei Städte übereinstimmen (mit/ohne Stadtteil)"""
-            s1 = stadt1.strip().lower()
-            s2 = stadt2.strip().lower()
-            if s1 == s2:
-                return True
-            base1 = s1.split('-')[0].strip()
-            base2 = s2.split('-')[0].strip()
-            if base1 == s2 or base2 == s1:
-                return True
-            if base1 == base2:
-                return True
-            return False
-        
-        def extract_domain(url):
-            """Extrahiert die Domain aus einer URL (ohne Protokoll/www)"""
-            if not url:
-                return ""
-            url = url.strip().lower()
-            url = re_mod.sub(r'^https?://', '', url)
-            url = re_mod.sub(r'^www\.', '', url)
-            url = url.split('/')[0].strip()
-            return url
-        
-        csv_datei = "zahnaerzte.csv"
-        duplikat_gefunden = False
-        beansprucht_status = "nein"
-        gefundener_name = ""
-        gefundene_strasse = ""
-        gefundene_plz = ""
-        gefundene_stadt = ""
-        
-        eingabe_strasse_norm = normalize_strasse(strasse)
-        eingabe_plz = plz.strip()
-
-        if os.path.isfile(csv_datei):
-            with open(csv_datei, newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    csv_plz = row["plz"].strip()
-                    csv_strasse_norm = normalize_strasse(row["straße"])
-                    
-                    if (
-                        csv_plz == eingabe_plz and
-                        csv_strasse_norm == eingabe_strasse_norm and
-                        staedte_match(row["stadt"], stadt)
-                    ):
-                        duplikat_gefunden = True
-                        beansprucht_status = row.get("beansprucht", "").strip().lower()
-                        gefundener_name = row.get("name", "").strip()
-                        gefundene_strasse = row["straße"].strip()
-                        gefundene_plz = csv_plz
-                        gefundene_stadt = row["stadt"].strip()
-                        break
-
-        if not duplikat_gefunden:
-            from models import Praxis
-            alle_praxen = Praxis.query.filter(Praxis.plz == eingabe_plz).all()
-            for p in alle_praxen:
-                if (
-                    normalize_strasse(p.strasse or '') == eingabe_strasse_norm and
-                    staedte_match(p.stadt or '', stadt)
-                ):
-                    duplikat_gefunden = True
-                    beansprucht_status = "ja"
-                    gefundener_name = p.name or ""
-                    gefundene_strasse = p.strasse or ""
-                    gefundene_plz = p.plz or ""
-                    gefundene_stadt = p.stadt or ""
-                    break
+        # Duplikatprüfung (CSV + Datenbank) über den Adress-/Domain-Index:
+        # erst Adresse (PLZ + Straße ohne Hausnummer + Stadt), dann Web-Domain
+        adr_index = adress_index(aktuell=True)
+        treffer = adr_index.finde_adresse(plz, strasse, stadt)
+        if not treffer and webseite:
+            treffer = adr_index.finde_domain(webseite)
 
-        if not duplikat_gefunden and webseite:
-            eingabe_domain = extract_domain(webseite)
-            if eingabe_domain:
-                if os.path.isfile(csv_datei):
-                    with open(csv_datei, newline='', encoding='utf-8') as f:
-                        reader = csv.DictReader(f)
-                        for row in reader:
-                            csv_domain = extract_domain(row.get("webseite", ""))
-                            if csv_domain and csv_domain == eingabe_domain:
-                                duplikat_gefunden = True
-                                beansprucht_status = row.get("beansprucht", "").strip().lower()
-                                gefundener_name = row.get("name", "").strip()
-                                gefundene_strasse = row["straße"].strip()
-                                gefundene_plz = row["plz"].strip()
-                                gefundene_stadt = row["stadt"].strip()
-                                break
-
-                if not duplikat_gefunden:
-                    from models import Praxis
-                    alle_praxen_domain = Praxis.query.filter(Praxis.webseite.isnot(None), Praxis.webseite != '').all()
-                    for p in alle_praxen_domain:
-                        if extract_domain(p.webseite or '') == eingabe_domain:
-                            duplikat_gefunden = True
-                            beansprucht_status = "ja"
-                            gefundener_name = p.name or ""
-                            gefundene_strasse = p.strasse or ""
-                            gefundene_plz = p.plz or ""
-                            gefundene_stadt = p.stadt or ""
-                            break
-
-        if duplikat_gefunden:
+        if treffer:
             return render_template(
                 "register_exists.html",
                 praxisname=praxisname,
                 strasse=strasse,
                 plz=plz,
                 stadt=stadt,
-                beansprucht=beansprucht_status,
-                gefundener_name=gefundener_name,
-                gefundene_strasse=gefundene_strasse,
-                gefundene_plz=gefundene_plz,
-                gefundene_stadt=gefundene_stadt
+                beansprucht=treffer['beansprucht'],
+                gefundener_name=treffer['name'],
+                gefundene_strasse=treffer['strasse'],
+                gefundene_plz=treffer['plz'],
+                gefundene_stadt=treffer['stadt']
             )
         else:
             import secrets
@@ -1083,29 +742,13 @@ def register():
 
             db.session.commit()
 
-            # zahnaerzte.csv als beansprucht markieren (nicht fatal wenn nicht möglich)
+            # CSV-Zeilen mit derselben Adresse als beansprucht markieren (Overlay, die CSV bleibt unverändert)
             try:
-                csv_datei_aktuell = "zahnaerzte.csv"
-                if os.path.isfile(csv_datei_aktuell):
-                    eintraege = []
-                    with open(csv_datei_aktuell, newline='', encoding='utf-8') as f:
-                        reader = csv.DictReader(f)
-                        for row in reader:
-                            if (normalize_strasse(row.get("straße", "")) == eingabe_strasse_norm and
-                                    row.get("plz", "").strip() == eingabe_plz):
-                                row["beansprucht"] = "ja"
-                                row["email"] = email
-                            eintraege.append(row)
-                    if eintraege:
-                        with open(csv_datei_aktuell, "w", newline="", encoding="utf-8") as f:
-                            fieldnames = eintraege[0].keys()
-                            writer = csv.DictWriter(f, fieldnames=fieldnames)
-                            writer.writeheader()
-                            writer.writerows(eintraege)
-                    # Cache invalidieren damit die Änderung sichtbar wird
-                    _praxen_cache.pop(csv_datei_aktuell, None)
-            except Exception as csv_err:
-                print(f"⚠️ CSV-Update übersprungen (Dateisystem schreibgeschützt?): {csv_err}")
+                betroffene = adr_index.alle_adresse(plz, strasse, quelle='csv')
+                aktualisiere_csv_status([e['schluessel'] for e in betroffene], beansprucht=True, email=email, praxis_id=neue_praxis.id)
+            except Exception as overlay_err:
+                db.session.rollback()
+                print(f"⚠️ CSV-Overlay-Update übersprungen: {overlay_err}")
 
             # User einloggen
             flask_login_user(zahnarzt)
@@ -1168,52 +811,28 @@ def claim():
         flash("Diese E-Mail-Adresse ist bereits registriert. Bitte melden Sie sich an.", "danger")
         return redirect("/zahnarzt-login")
     
-    datei = "zahnaerzte.csv"
     bereits_beansprucht = False
     csv_lat = 0
     csv_lng = 0
     csv_telefon = ""
     csv_webseite = ""
-    csv_fachgebiete = ""
-    
-    import re as re_mod
-    def extract_domain(url):
-        if not url:
-            return ""
-        url = url.strip().lower()
-        url = re_mod.sub(r'^https?://', '', url)
-        url = re_mod.sub(r'^www\.', '', url)
-        url = url.split('/')[0].strip()
-        return url
-    
-    eingabe_domain = extract_domain(webseite)
-    
-    if os.path.isfile(datei):
-        with open(datei, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                csv_strasse = row.get("straße", "").strip().lower()
-                csv_plz = row.get("plz", "").strip()
-                csv_stadt = row.get("stadt", "").strip().lower()
-                adress_match = (
-                    csv_strasse == strasse.strip().lower() and
-                    csv_plz == plz.strip() and
-                    csv_stadt == stadt.strip().lower()
-                )
-                domain_match = (
-                    eingabe_domain and 
-                    extract_domain(row.get("webseite", "")) == eingabe_domain
-                )
-                if adress_match or domain_match:
-                    if row.get("beansprucht", "").strip().lower() == "ja":
-                        bereits_beansprucht = True
-                    csv_lat = row.get("lat", 0)
-                    csv_lng = row.get("lng", 0)
-                    csv_telefon = row.get("telefon", "")
-                    csv_webseite = row.get("webseite", "")
-                    csv_fachgebiete = row.get("fachgebiete", "")
-                    break
     
+    eingabe_domain = extrahiere_domain(webseite)
+
+    # Erster CSV-Treffer (Dateireihenfolge) über exakte Adresse oder Web-Domain
+    adr_index = adress_index(aktuell=True)
+    kandidaten = [t for t in (
+        adr_index.finde_genaue_adresse(plz, strasse, stadt),
+        adr_index.finde_domain(webseite, quelle='csv') if eingabe_domain else None,
+    ) if t]
+    if kandidaten:
+        treffer = min(kandidaten, key=lambda t: t['zeile'])
+        bereits_beansprucht = treffer['beansprucht'] == "ja"
+        csv_lat = treffer['lat']
+        csv_lng = treffer['lng']
+        csv_telefon = treffer['telefon']
+        csv_webseite = treffer['webseite']
+
     if bereits_beansprucht:
         neuer_claim = Claim(
             praxis_name=praxisname,
@@ -1284,33 +903,14 @@ def claim():
     
     db.session.commit()
     
-    eintraege = []
-    if os.path.isfile(datei):
-        with open(datei, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                adress_match = (
-                    row.get("straße", "").strip().lower() == strasse.strip().lower() and
-                    row.get("plz", "").strip() == plz.strip() and
-                    row.get("stadt", "").strip().lower() == stadt.strip().lower()
-                )
-                domain_match = (
-                    eingabe_domain and
-                    extract_domain(row.get("webseite", "")) == eingabe_domain
-                )
-                if adress_match or domain_match:
-                    row["beansprucht"] = "ja"
-                    row["name"] = praxisname
-                    row["email"] = email
-                eintraege.append(row)
-        
-        if eintraege:
-            with open(datei, "w", newline="", encoding="utf-8") as f:
-                fieldnames = eintraege[0].keys()
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(eintraege)
-            _praxen_cache.pop(datei, None)
+    # Alle passenden CSV-Zeilen als übernommen markieren (Overlay, die CSV bleibt unverändert)
+    betroffene = adr_index.alle_genaue_adresse(plz, strasse, stadt)
+    if eingabe_domain:
+        betroffene += adr_index.alle_domain(webseite, quelle='csv')
+    aktualisiere_csv_status(
+        [e['schluessel'] for e in betroffene],
+        beansprucht=True, name=praxisname, email=email, praxis_id=neue_praxis.id
+    )
 
     login_user(zahnarzt)
     session["angemeldet"] = True
@@ -1456,15 +1056,8 @@ def praxis_uebernehmen_csv(csv_id):
         flash("Ungültige Praxis-ID.", "danger")
         return redirect(url_for('index'))
     
-    # CSV-Praxen laden und die richtige finden (über original_idx)
-    alle_praxen = lade_praxen("zahnaerzte.csv")
-    
-    # Finde die Praxis mit dem passenden csv_original_idx
-    csv_praxis = None
-    for p in alle_praxen:
-        if p.get('csv_original_idx') == csv_index:
-            csv_praxis = p
-            break
+    # CSV-Praxis direkt über die Zeilennummer (csv_original_idx) lesen
+    csv_praxis = csv_praxis_nach_index(csv_index)
     
     if not csv_praxis:
         flash("Praxis konnte nicht gefunden werden.", "danger")
@@ -2000,6 +1593,9 @@ def zahlung_abschliessen():
     # Bei Kreditkarte zu Stripe-Checkout-Seite weiterleiten
     if methode == "Kreditkarte":
         try:
+            from stripe_integration import hole_stripe
+            stripe = hole_stripe()
+
             # Domain für Redirect-URLs ermitteln
             your_domain = request.host_url.rstrip('/')
             
@@ -2071,6 +1667,8 @@ def zahlung_erfolgreich():
     # Bei Stripe-Zahlungen: Versuchen, Daten aus Stripe-Metadaten wiederherzustellen
     if methode == "Kreditkarte" and session_id:
         try:
+            from stripe_integration import hole_stripe
+            stripe = hole_stripe()
             checkout_session = stripe.checkout.Session.retrieve(session_id)
             
             # Metadaten aus Stripe-Session lesen und in Flask-Session wiederherstellen
@@ -2135,6 +1733,8 @@ def zahlung_erfolgreich():
     # Bei Stripe-Zahlungen: Zahlungsstatus überprüfen
     if methode == "Kreditkarte" and session_id:
         try:
+            from stripe_integration import hole_stripe
+            stripe = hole_stripe()
             checkout_session = stripe.checkout.Session.retrieve(session_id)
             
             payment_status = checkout_session.payment_status
@@ -2191,13 +1791,18 @@ def zahlung_erfolgreich():
     heute = datetime.now().strftime("%Y-%m-%d")
     
     # Bei erfolgreicher Zahlung das Paket in neue_praxen.csv aktualisieren
+    rechnungsnummer = None
     if methode != "Kreditkarte" or (methode == "Kreditkarte" and session_id):
-        # 📄 PDF erstellen
+        # 📄 PDF wird im Hintergrund-Worker erstellt (services/rechnung_jobs.py)
         try:
-            erstelle_rechnung_pdf(praxisname, email, paket, details, methode)
-            print(f"✅ Rechnung erfolgreich erstellt für {praxisname}")
+            from services.rechnung_jobs import plane_rechnung
+            rechnungsnummer = plane_rechnung(praxisname, email, paket, details, methode)
+            # Dieser Browser darf die Rechnung ohne Login herunterladen
+            session['rechnungen'] = (session.get('rechnungen') or [])[-4:] + [rechnungsnummer]
+            print(f"✅ Rechnung {rechnungsnummer} für {praxisname} eingeplant")
         except Exception as e:
-            print(f"❌ Fehler beim Erstellen der Rechnung: {e}")
+            db.session.rollback()
+            print(f"❌ Fehler beim Einplanen der Rechnung: {e}")
             # Fehler beim Erstellen der Rechnung, aber keine Fehlermeldung für den Benutzer
     
     # Session-Variablen für den nächsten Schritt setzen
@@ -2296,32 +1901,33 @@ def zahlung_erfolgreich():
         flash(f"Willkommen! Ihr {format_paket}-Paket ist jetzt aktiv. Richten Sie Ihre Praxis ein.", "success")
         return redirect(url_for('zahnarzt_dashboard', page='landingpage'))
     
-    return render_template("zahlung_erfolgreich.html", methode=methode, paket=format_paket)
-
-def erstelle_rechnung_pdf(praxisname, email, paket, details, methode):
-    heute = datetime.now().strftime("%Y-%m-%d")
-    dateiname = f"rechnung_{praxisname.replace(' ', '_').lower()}_{heute}.pdf"
-    pfad = os.path.join("static/rechnungen", dateiname)
-    
-    # Erstelle Verzeichnis, falls es nicht existiert
-    os.makedirs(os.path.dirname(pfad), exist_ok=True)
+    return render_template("zahlung_erfolgreich.html", methode=methode, paket=format_paket, rechnungsnummer=rechnungsnummer)
 
-    # Lade HTML-Vorlage
-    env = Environment(loader=FileSystemLoader("templates"))
-    template = env.get_template("rechnung_vorlage.html")
 
-    html_content = template.render(
-        heute=heute,
-        praxisname=praxisname,
-        email=email,
-        paket=paket,
-        methode=methode,
-        details=details,
-        rechnungsnummer=f"R-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+@app.route("/rechnung/<rechnungsnummer>.pdf")
+def rechnung_herunterladen(rechnungsnummer):
+    """Rechnungs-PDF aus der Datenbank (für Admin, den zahlenden Browser oder den Zahnarzt mit derselben E-Mail)"""
+    rechnung = Rechnung.query.filter_by(rechnungsnummer=rechnungsnummer).first()
+    berechtigt = rechnung is not None and (
+        session.get("admin_eingeloggt")
+        or rechnungsnummer in (session.get('rechnungen') or [])
+        or (current_user.is_authenticated and getattr(current_user, 'email', None) == rechnung.email)
     )
+    if not berechtigt:
+        abort(404)
 
-    HTML(string=html_content).write_pdf(pfad)
-    print(f"📄 Rechnung erstellt: {pfad}")
+    if rechnung.pdf is None:
+        flash("Ihre Rechnung wird gerade erstellt. Bitte versuchen Sie es in einer Minute erneut.", "info")
+        return redirect(request.referrer or url_for('index'))
+
+    return Response(
+        rechnung.pdf,
+        mimetype='application/pdf',
+        headers={
+            'Content-Disposition': f'attachment; filename="{rechnung.dateiname}"',
+            'Cache-Control': 'private, no-store',
+        }
+    )
 
 
 # =====================================================
@@ -2945,11 +2551,24 @@ def admin_externe_jobs_sync():
         flash(f"TheirStack Sync fehlgeschlagen: {str(e)}", "danger")
     return redirect("/admin/stellenangebote")
 
+@app.route("/admin/job-alert-digest")
+@admin_required
+def admin_job_alert_digest():
+    """Versendet fällige Job-Alert Sammel-E-Mails manuell (sonst per Cronjob)"""
+    from services.job_alert_service import versende_job_alert_digests
+    try:
+        result = versende_job_alert_digests()
+        flash(f"Job-Alert Digest: {result['gesendet']} E-Mails mit {result['stellen']} Stellen versendet, {result['fehler']} Fehler", "success" if not result['fehler'] else "warning")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Job-Alert Digest fehlgeschlagen: {str(e)}", "danger")
+    return redirect("/admin/stellenangebote")
+
 @app.route("/admin/seo-texte")
 @admin_required
 def admin_seo_texte():
     """Übersicht der Stadt-SEO-Texte mit Paginierung und Suche"""
-    from models import StadtSEO
+    from models import StadtSEO, HintergrundJob
     
     search_query = request.args.get('search', '').strip()
     page = request.args.get('page', 1, type=int)
@@ -2985,6 +2604,7 @@ def admin_seo_texte():
                          search_query=search_query,
                          total_seo_count=total_seo_count,
                          staedte_ohne_seo=staedte_ohne_seo,
+                         aktive_jobs=HintergrundJob.query.filter_by(typ='stadt_seo').filter(HintergrundJob.status.in_(('wartend', 'laeuft'))).all(),
                          active_page='seo-texte')
 
 @app.route("/admin/seo-texte/generieren", methods=["POST"])
@@ -3034,94 +2654,20 @@ def admin_seo_generieren():
 @app.route("/admin/seo-texte/batch-generieren", methods=["POST"])
 @admin_required
 def admin_seo_batch_generieren():
-    """Generiert SEO-Texte für mehrere Städte - PARALLEL"""
-    from models import StadtSEO
-    from services.ai_service import generate_city_seo_texts
-    from concurrent.futures import ThreadPoolExecutor, as_completed
-    import json as json_lib
-    
-    anzahl = min(int(request.form.get('anzahl', 10)), 50)  # Max 50 mit paralleler Verarbeitung
-    
-    stadt_set = set()
-    with open("zahnaerzte.csv", newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            stadt = row.get("stadt", "").strip()
-            if stadt:
-                stadt_set.add(stadt)
+    """Legt einen Hintergrund-Job zur Generierung von Stadt-SEO-Texten an (Verarbeitung durch worker.py)"""
+    from services.seo_jobs import stadt_seo_items
+    from services.job_queue import erstelle_job
     
-    existierende_slugs = {s.stadt_slug for s in StadtSEO.query.all()}
+    anzahl_param = request.form.get('anzahl', '10')
+    anzahl = None if anzahl_param == 'alle' else int(anzahl_param)
     
-    staedte_zu_generieren = []
-    for stadt in sorted(stadt_set):
-        slug = stadt.lower().replace(' ', '-').replace('ü', 'ue').replace('ä', 'ae').replace('ö', 'oe').replace('ß', 'ss')
-        if slug not in existierende_slugs:
-            staedte_zu_generieren.append((stadt, slug))
-    
-    staedte_batch = staedte_zu_generieren[:anzahl]
-    
-    def generate_single(stadt_data):
-        stadt_name, stadt_slug = stadt_data
-        try:
-            seo_data = generate_city_seo_texts(stadt_name)
-            return {
-                'success': True,
-                'stadt_slug': stadt_slug,
-                'stadt_name': stadt_name,
-                'seo_data': seo_data
-            }
-        except Exception as e:
-            logging.error(f"Fehler bei {stadt_name}: {e}")
-            return {'success': False, 'stadt_name': stadt_name, 'error': str(e)}
-    
-    results = []
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = {executor.submit(generate_single, s): s for s in staedte_batch}
-        for future in as_completed(futures):
-            results.append(future.result())
-    
-    from sqlalchemy.exc import IntegrityError
-    
-    generiert = 0
-    skipped = 0
-    for result in results:
-        if result['success']:
-            try:
-                if StadtSEO.query.filter_by(stadt_slug=result['stadt_slug']).first():
-                    skipped += 1
-                    continue
-                    
-                seo_data = result['seo_data']
-                faq_json_str = json_lib.dumps(seo_data.get('faq', []), ensure_ascii=False) if seo_data.get('faq') else None
-                
-                new_seo = StadtSEO(
-                    stadt_slug=result['stadt_slug'],
-                    stadt_name=result['stadt_name'],
-                    meta_title=seo_data.get('meta_title', f"Zahnarzt {result['stadt_name']} | Top Zahnärzte finden - Dentalax"),
-                    meta_description=seo_data.get('meta_description', f"Finden Sie Ihren Zahnarzt in {result['stadt_name']}."),
-                    h1_titel=seo_data.get('h1_titel', f"Zahnarzt {result['stadt_name']}: Finden Sie Ihre ideale Praxis"),
-                    teaser_text=seo_data.get('teaser_text', f"Entdecken Sie qualifizierte Zahnärzte in {result['stadt_name']} und Umgebung."),
-                    h2_titel_1=seo_data.get('h2_titel_1'),
-                    seo_text_1=seo_data.get('seo_text_1'),
-                    h2_titel_2=seo_data.get('h2_titel_2'),
-                    seo_text_2=seo_data.get('seo_text_2'),
-                    faq_json=faq_json_str
-                )
-                db.session.add(new_seo)
-                db.session.commit()
-                generiert += 1
-            except IntegrityError:
-                db.session.rollback()
-                skipped += 1
-            except Exception as e:
-                logging.error(f"DB-Fehler bei {result['stadt_name']}: {e}")
-                db.session.rollback()
+    items = stadt_seo_items(anzahl)
+    if not items:
+        flash("Alle Städte haben bereits SEO-Texte.", "info")
+        return redirect("/admin/seo-texte")
     
-    msg = f"{generiert} SEO-Texte erfolgreich generiert!"
-    if skipped > 0:
-        msg += f" ({skipped} bereits vorhanden)"
-    flash(msg, "success")
-    return redirect("/admin/seo-texte")
+    job = erstelle_job('stadt_seo', f"Stadt-SEO-Texte ({len(items)} Städte)", items)
+    return redirect(f"/admin/hintergrund-jobs/{job.id}")
 
 @app.route("/admin/seo-texte/regenerieren/<int:seo_id>", methods=["POST"])
 @admin_required
@@ -3162,7 +2708,7 @@ def admin_seo_regenerieren(seo_id):
 @admin_required
 def admin_leistung_seo_texte():
     """Übersicht der Leistung+Stadt SEO-Texte mit Paginierung und Suche"""
-    from models import LeistungStadtSEO
+    from models import LeistungStadtSEO, HintergrundJob
     from leistungen_config import LEISTUNGEN
     
     selected_leistung = request.args.get('leistung', 'implantologie')
@@ -3216,6 +2762,7 @@ def admin_leistung_seo_texte():
                          staedte_liste=staedte_liste,
                          total_staedte=total_staedte,
                          offene_staedte=offene_staedte,
+                         aktive_jobs=HintergrundJob.query.filter_by(typ='leistung_stadt_seo').filter(HintergrundJob.status.in_(('wartend', 'laeuft'))).all(),
                          active_page='leistung-seo-texte')
 
 
@@ -3276,140 +2823,92 @@ def admin_leistung_seo_generieren():
 @app.route("/admin/leistung-seo-texte/batch-generieren", methods=["POST"])
 @admin_required
 def admin_leistung_seo_batch_generieren():
-    """Generiert SEO-Texte für mehrere Städte einer Leistung - PARALLEL"""
-    from models import LeistungStadtSEO
-    from services.ai_service import generate_leistung_stadt_seo_texts
+    """Legt einen Hintergrund-Job für Leistung+Stadt SEO-Texte an – eine oder alle Leistungen, beliebig viele Städte"""
+    from services.seo_jobs import leistung_stadt_seo_items
+    from services.job_queue import erstelle_job
     from leistungen_config import LEISTUNGEN
-    from concurrent.futures import ThreadPoolExecutor, as_completed
-    import json as json_lib
 
     leistung_slug = request.form.get('leistung_slug', '').strip()
     auto_continue = request.form.get('auto_continue', '0') == '1'
-    anzahl = min(int(request.form.get('anzahl', 10)), 8 if auto_continue else 50)
-
-    if not leistung_slug or leistung_slug not in LEISTUNGEN:
+    anzahl_param = request.form.get('anzahl', '10')
+    anzahl = None if (auto_continue or anzahl_param == 'alle') else int(anzahl_param)
+
+    if leistung_slug == 'alle':
+        leistung_slugs = list(LEISTUNGEN.keys())
+        titel = "Alle Leistungen"
+    elif leistung_slug in LEISTUNGEN:
+        leistung_slugs = [leistung_slug]
+        titel = LEISTUNGEN[leistung_slug]['name']
+    else:
         flash("Ungültige Leistung.", "danger")
         return redirect("/admin/leistung-seo-texte")
 
-    leistung_name = LEISTUNGEN[leistung_slug]['name']
+    items = leistung_stadt_seo_items(leistung_slugs, anzahl)
+    if not items:
+        flash(f"Fertig! Alle Städte für {titel} haben bereits SEO-Texte.", "success")
+        return redirect(f"/admin/leistung-seo-texte?leistung={leistung_slugs[0]}")
 
-    stadt_set = set()
-    with open("zahnaerzte.csv", newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            stadt = row.get("stadt", "").strip()
-            if stadt:
-                stadt_set.add(stadt)
+    job = erstelle_job('leistung_stadt_seo', f"Leistung-SEO-Texte: {titel} ({len(items)} Seiten)", items)
+    return redirect(f"/admin/hintergrund-jobs/{job.id}")
 
-    slug_to_stadt = {}
-    for stadt in stadt_set:
-        slug = stadt.lower().replace(' ', '-').replace('ü', 'ue').replace('ä', 'ae').replace('ö', 'oe').replace('ß', 'ss')
-        if slug not in slug_to_stadt:
-            slug_to_stadt[slug] = stadt
 
-    total_staedte = len(slug_to_stadt)
-    existing_slugs = {s.stadt_slug for s in LeistungStadtSEO.query.filter_by(leistung_slug=leistung_slug).all()}
+@app.route("/admin/hintergrund-jobs/<int:job_id>")
+@admin_required
+def admin_hintergrund_job(job_id):
+    """Fortschrittsseite eines Hintergrund-Jobs (aktualisiert sich per Polling)"""
+    from models import HintergrundJob
+    from services.job_queue import job_status_dict
 
-    staedte_ohne_seo = []
-    for slug in sorted(slug_to_stadt.keys()):
-        if slug not in existing_slugs:
-            staedte_ohne_seo.append(slug_to_stadt[slug])
+    job = HintergrundJob.query.get_or_404(job_id)
+    zurueck_url = "/admin/seo-texte" if job.typ == 'stadt_seo' else "/admin/leistung-seo-texte"
+    return render_template(
+        'admin_leistung_seo_progress.html',
+        job=job,
+        job_status=job_status_dict(job),
+        zurueck_url=zurueck_url,
+        active_page='seo-texte' if job.typ == 'stadt_seo' else 'leistung-seo-texte'
+    )
 
-    staedte_batch = staedte_ohne_seo[:anzahl]
 
-    def generate_single(stadt_name):
-        try:
-            stadt_slug = stadt_name.lower().replace(' ', '-').replace('ü', 'ue').replace('ä', 'ae').replace('ö', 'oe').replace('ß', 'ss')
-            seo_data = generate_leistung_stadt_seo_texts(leistung_name, leistung_slug, stadt_name)
-            return {'success': True, 'stadt_slug': stadt_slug, 'stadt_name': stadt_name, 'seo_data': seo_data}
-        except Exception as e:
-            logging.error(f"Fehler bei {leistung_name} {stadt_name}: {e}")
-            return {'success': False, 'stadt_name': stadt_name, 'error': str(e)}
+@app.route("/admin/ki-metriken")
+@admin_required
+def admin_ki_metriken():
+    """Latenz-, Token- und Throttling-Metriken des KI-Schedulers (dieser Prozess)"""
+    from services.ai_service import scheduler
+    return jsonify(scheduler.metriken())
 
-    results = []
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = {executor.submit(generate_single, s): s for s in staedte_batch}
-        for future in as_completed(futures):
-            results.append(future.result())
 
-    from sqlalchemy.exc import IntegrityError
+@app.route("/admin/hintergrund-jobs/<int:job_id>/status")
+@admin_required
+def admin_hintergrund_job_status(job_id):
+    """JSON-Fortschritt eines Hintergrund-Jobs"""
+    from models import HintergrundJob
+    from services.job_queue import job_status_dict
 
-    count = 0
-    skipped = 0
-    fehler = 0
-    batch_results = []
+    job = HintergrundJob.query.get_or_404(job_id)
+    return jsonify(job_status_dict(job))
 
-    for result in results:
-        if result['success']:
-            try:
-                if LeistungStadtSEO.query.filter_by(leistung_slug=leistung_slug, stadt_slug=result['stadt_slug']).first():
-                    skipped += 1
-                    batch_results.append({'stadt_name': result['stadt_name'], 'status': 'vorhanden'})
-                    continue
-
-                seo_data = result['seo_data']
-                faq_json_str = json_lib.dumps(seo_data.get('faq', []), ensure_ascii=False) if seo_data.get('faq') else None
-
-                new_seo = LeistungStadtSEO(
-                    leistung_slug=leistung_slug,
-                    leistung_name=leistung_name,
-                    stadt_slug=result['stadt_slug'],
-                    stadt_name=result['stadt_name'],
-                    meta_title=seo_data.get('meta_title'),
-                    meta_description=seo_data.get('meta_description'),
-                    h1_titel=seo_data.get('h1_titel'),
-                    teaser_text=seo_data.get('teaser_text'),
-                    h2_titel_1=seo_data.get('h2_titel_1'),
-                    seo_text_1=seo_data.get('seo_text_1'),
-                    h2_titel_2=seo_data.get('h2_titel_2'),
-                    seo_text_2=seo_data.get('seo_text_2'),
-                    faq_json=faq_json_str
-                )
-                db.session.add(new_seo)
-                db.session.commit()
-                count += 1
-                batch_results.append({'stadt_name': result['stadt_name'], 'status': 'erstellt'})
-            except IntegrityError:
-                db.session.rollback()
-                skipped += 1
-                batch_results.append({'stadt_name': result['stadt_name'], 'status': 'vorhanden'})
-            except Exception as e:
-                logging.error(f"DB-Fehler bei {result['stadt_name']}: {e}")
-                db.session.rollback()
-                fehler += 1
-                batch_results.append({'stadt_name': result['stadt_name'], 'status': 'fehler'})
-        else:
-            fehler += 1
-            batch_results.append({'stadt_name': result['stadt_name'], 'status': 'fehler', 'error': result.get('error', '')})
 
-    if auto_continue:
-        existing_slugs_neu = {s.stadt_slug for s in LeistungStadtSEO.query.filter_by(leistung_slug=leistung_slug).all()}
-        noch_offen = sum(1 for slug in slug_to_stadt if slug not in existing_slugs_neu)
-        bereits_generiert = total_staedte - noch_offen
+@app.route("/admin/hintergrund-jobs/<int:job_id>/abbrechen", methods=["POST"])
+@admin_required
+def admin_hintergrund_job_abbrechen(job_id):
+    """Bricht einen Hintergrund-Job ab; bereits generierte Texte bleiben erhalten"""
+    from services.job_queue import brich_job_ab
 
-        if noch_offen > 0:
-            return render_template(
-                'admin_leistung_seo_progress.html',
-                leistung_slug=leistung_slug,
-                leistung_name=leistung_name,
-                batch_results=sorted(batch_results, key=lambda x: x['stadt_name']),
-                count=count,
-                skipped=skipped,
-                fehler=fehler,
-                noch_offen=noch_offen,
-                bereits_generiert=bereits_generiert,
-                total_staedte=total_staedte,
-                active_page='leistung-seo-texte'
-            )
-        else:
-            flash(f"Fertig! Alle {total_staedte} Städte für {leistung_name} wurden mit SEO-Texten versorgt.", "success")
-            return redirect(f"/admin/leistung-seo-texte?leistung={leistung_slug}")
+    brich_job_ab(job_id)
+    flash("Job abgebrochen. Bereits generierte Texte bleiben erhalten.", "info")
+    return redirect(f"/admin/hintergrund-jobs/{job_id}")
 
-    msg = f"{count} SEO-Texte für {leistung_name} erfolgreich generiert!"
-    if skipped > 0:
-        msg += f" ({skipped} bereits vorhanden)"
-    flash(msg, "success")
-    return redirect(f"/admin/leistung-seo-texte?leistung={leistung_slug}")
+
+@app.route("/admin/hintergrund-jobs/<int:job_id>/wiederholen", methods=["POST"])
+@admin_required
+def admin_hintergrund_job_wiederholen(job_id):
+    """Reiht fehlgeschlagene Items eines Jobs erneut ein"""
+    from services.job_queue import wiederhole_fehler
+
+    wiederhole_fehler(job_id)
+    flash("Fehlgeschlagene Einträge werden erneut verarbeitet.", "info")
+    return redirect(f"/admin/hintergrund-jobs/{job_id}")
 
 
 @app.route("/admin/leistung-seo-texte/regenerieren/<int:seo_id>", methods=["POST"])
@@ -4004,7 +3503,8 @@ from leistungen_config import LEISTUNGEN, SEO_STAEDTE, stadt_zu_slug, slug_zu_st
 @app.route("/<path:full_slug>")
 def seo_leistung_stadt(full_slug):
     """SEO-Route für Leistung + Stadt Kombination, z.B. /implantologie-berlin oder /implantologie-aarbergen-kettenbach"""
-    from models import Praxis, LeistungStadtSEO
+    from models import LeistungStadtSEO
+    from services.praxis_suche import praxis_suche, SuchAnfrage
     import json
     
     # Parse: Finde bekannte Leistung am Anfang, Rest ist stadt_slug
@@ -4045,70 +3545,13 @@ def seo_leistung_stadt(full_slug):
         flash('Der Ort konnte nicht gefunden werden.', 'warning')
         return redirect(url_for('index'))
     
-    alle_praxen = lade_praxen("zahnaerzte.csv")
-    
-    # Datenbank-Praxen hinzufügen
-    db_praxen = Praxis.query.filter(Praxis.ist_demo != True).all()
-    for praxis in db_praxen:
-        if praxis.latitude and praxis.longitude:
-            alle_praxen.append({
-                'id': praxis.id,
-                'name': praxis.name,
-                'email': praxis.email or '',
-                'telefon': praxis.telefon or '',
-                'webseite': praxis.webseite or '',
-                'plz': praxis.plz or '',
-                'stadt': praxis.stadt or '',
-                'straße': praxis.strasse or '',
-                'lat': float(praxis.latitude),
-                'lng': float(praxis.longitude),
-                'slug': praxis.slug,
-                'aus_datenbank': True,
-                'paket': praxis.paket,
-                'beansprucht': 'ja' if praxis.ist_verifiziert else 'nein',
-                'leistungsschwerpunkte': praxis.leistungsschwerpunkte or ''
-            })
-    
-    gefilterte_praxen = []
-    for praxis in alle_praxen:
-        distanz = entfernung_km(lat, lng, praxis['lat'], praxis['lng'])
-        if distanz <= umkreis:
-            praxis['entfernung'] = distanz
-            gefilterte_praxen.append(praxis)
-    
-    # Hilfsfunktion: Prüft ob Praxis die gesuchte Leistung anbietet
-    def hat_leistung(praxis, leistung):
-        schwerpunkte = praxis.get('leistungsschwerpunkte', '') or ''
-        return leistung in schwerpunkte.lower()
-    
-    # Premium-Praxen zuerst, dann nach Entfernung
-    premium_praxen = [p for p in gefilterte_praxen if p.get('paket', '').lower() in ('premium', 'premiumplus')]
-    standard_praxen = [p for p in gefilterte_praxen if p.get('paket', '').lower() not in ('premium', 'premiumplus')]
-    
-    # Innerhalb Premium: Praxen mit passender Leistung zuerst
-    premium_mit_leistung = [p for p in premium_praxen if hat_leistung(p, leistung_slug)]
-    premium_ohne_leistung = [p for p in premium_praxen if not hat_leistung(p, leistung_slug)]
-    
-    # Innerhalb Standard: Praxen mit passender Leistung zuerst
-    standard_mit_leistung = [p for p in standard_praxen if hat_leistung(p, leistung_slug)]
-    standard_ohne_leistung = [p for p in standard_praxen if not hat_leistung(p, leistung_slug)]
-    
-    import hashlib
-    heute = datetime.now().strftime('%Y-%m-%d')
-    hash_input = f"{heute}-{stadt.lower()}-{leistung_slug}".encode('utf-8')
-    rotation_seed = int(hashlib.sha256(hash_input).hexdigest(), 16) % (2**32)
-    rng = Random(rotation_seed)
-    rng.shuffle(premium_mit_leistung)
-    rng.shuffle(premium_ohne_leistung)
-    
-    standard_mit_leistung.sort(key=lambda p: p['entfernung'])
-    standard_ohne_leistung.sort(key=lambda p: p['entfernung'])
-    
-    # Reihenfolge: Premium mit Leistung > Premium ohne > Standard mit > Standard ohne
-    gefilterte_praxen = premium_mit_leistung + premium_ohne_leistung + standard_mit_leistung + standard_ohne_leistung
-    
-    ergebnisse = gefilterte_praxen[:eintraege_pro_seite]
-    gesamt_seiten = math.ceil(len(gefilterte_praxen) / eintraege_pro_seite)
+    # Premium vor Standard, jeweils Praxen mit passender Leistung zuerst
+    ergebnis = praxis_suche.suche(SuchAnfrage(
+        lat, lng, umkreis, seite, eintraege_pro_seite, leistung=leistung_slug,
+        rotation=f"{stadt.lower()}-{leistung_slug}", details=False
+    ))
+    ergebnisse = ergebnis.eintraege
+    gesamt_seiten = ergebnis.gesamt_seiten
     
     # Template-Variablen vorbereiten - KI-generierte Texte bevorzugen
     template_vars = {
@@ -4300,47 +3743,30 @@ def stellenangebote():
     if request.args.get('ausbildung') == 'on':
         anstellungsarten.append('ausbildung')
     
-    from sqlalchemy import or_
-    
     # Premium Jobs (Dentalax Inserate)
     jobs_query = Stellenangebot.query.filter_by(ist_aktiv=True)
     
-    if query:
-        jobs_query = jobs_query.filter(
-            or_(
-                Stellenangebot.titel.ilike(f'%{query}%'),
-                Stellenangebot.position.ilike(f'%{query}%'),
-                Stellenangebot.tags.ilike(f'%{query}%')
-            )
-        )
-    
     if position:
         jobs_query = jobs_query.filter(Stellenangebot.position == position)
     
     if anstellungsarten:
         jobs_query = jobs_query.filter(Stellenangebot.anstellungsart.in_(anstellungsarten))
     
-    all_premium_jobs = jobs_query.order_by(Stellenangebot.ist_premium.desc(), Stellenangebot.erstellt_am.desc()).all()
+    jobs_query = jobs_query.order_by(Stellenangebot.ist_premium.desc(), Stellenangebot.erstellt_am.desc())
+    # Volltextsuche (tsvector/GIN auf PostgreSQL, sonst Index im Prozess); setzt job.such_rang
+    all_premium_jobs = job_treffer(jobs_query, Stellenangebot, query) if query else jobs_query.all()
     
     # Externe Jobs von TheirStack
     externe_query = ExternesInserat.query.filter_by(ist_aktiv=True)
     
-    if query:
-        externe_query = externe_query.filter(
-            or_(
-                ExternesInserat.titel.ilike(f'%{query}%'),
-                ExternesInserat.unternehmen.ilike(f'%{query}%'),
-                ExternesInserat.beschreibung.ilike(f'%{query}%')
-            )
-        )
-    
     if position:
         externe_query = externe_query.filter(ExternesInserat.position_kategorie == position)
     
     if anstellungsarten:
         externe_query = externe_query.filter(ExternesInserat.anstellungsart.in_(anstellungsarten))
     
-    all_externe_jobs = externe_query.order_by(ExternesInserat.veroeffentlicht_am.desc()).all()
+    externe_query = externe_query.order_by(ExternesInserat.veroeffentlicht_am.desc())
+    all_externe_jobs = job_treffer(externe_query, ExternesInserat, query) if query else externe_query.all()
     
     # Standortfilter anwenden
     if ort:
@@ -4398,8 +3824,9 @@ def stellenangebote():
         premium_jobs.sort(key=lambda x: (getattr(x, 'distanz', 999) or 999))
         externe_jobs.sort(key=lambda x: (getattr(x, 'distanz', 999) or 999))
     elif sortierung == 'relevanz':
-        # Sortiere nach Premium-Status und Suchrelevanz
-        premium_jobs.sort(key=lambda x: (not x.ist_premium, -(x.id or 0)))
+        # Sortiere nach Premium-Status und Suchrelevanz (Rang der Volltextsuche, ohne Suchbegriff 0)
+        premium_jobs.sort(key=lambda x: (not x.ist_premium, -getattr(x, 'such_rang', 0), -(x.id or 0)))
+        externe_jobs.sort(key=lambda x: -getattr(x, 'such_rang', 0))
     # Default: neuste zuerst (bereits so sortiert)
     
     # Premium Jobs zuerst, dann externe Jobs
@@ -4795,8 +4222,13 @@ def job_alert_anmelden():
     position = request.form.get('position', '').strip()
     ort = request.form.get('ort', '').strip()
     datenschutz = request.form.get('datenschutz')
+    digest_modus = request.form.get('digest_modus', 'sofort').strip()
     is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
     
+    from services.job_alert_service import DIGEST_MODI
+    if digest_modus not in DIGEST_MODI:
+        digest_modus = 'sofort'
+    
     if not email or not ort or not datenschutz:
         if is_ajax:
             return jsonify({'success': False, 'message': 'Bitte füllen Sie alle Pflichtfelder aus und akzeptieren Sie die Datenschutzbestimmungen.'}), 400
@@ -4817,6 +4249,7 @@ def job_alert_anmelden():
     if existing:
         existing.bestaetigungs_token = token
         existing.ist_aktiv = False
+        existing.digest_modus = digest_modus
         db.session.commit()
     else:
         alert = JobAlert(
@@ -4825,7 +4258,8 @@ def job_alert_anmelden():
             ort=ort,
             latitude=latitude,
             longitude=longitude,
-            bestaetigungs_token=token
+            bestaetigungs_token=token,
+            digest_modus=digest_modus
         )
         db.session.add(alert)
         db.session.commit()
@@ -4876,8 +4310,13 @@ def job_alert_abmelden(token):
 def notify_matching_job_alerts(stellenangebot):
     """Benachrichtigt alle aktiven Job-Alert Abonnenten, die zur neuen Stelle passen (Position + 50km Umkreis)"""
     import math
+    from sqlalchemy import or_
     
-    matching_alerts = JobAlert.query.filter_by(ist_aktiv=True).all()
+    # Alerts im Digest-Modus werden gesammelt über versende_job_alert_digests() verschickt
+    matching_alerts = JobAlert.query.filter(
+        JobAlert.ist_aktiv == True,
+        or_(JobAlert.digest_modus == None, JobAlert.digest_modus == 'sofort')
+    ).all()
     
     if not matching_alerts:
         return
@@ -5153,17 +4592,18 @@ def api_subscription_cancel():
 
 from main import csrf
 
-@csrf.exempt
-@app.route("/api/chat/match", methods=["POST"])
-def dental_match_chat():
-    """API-Endpoint für den Dental Match KI-Chatbot"""
-    from services.ai_service import get_dental_match_response
-    from models import Bewertung
-    from sqlalchemy import func as sql_func
+def _dental_match_kontext(data):
+    """
+    Gemeinsame Vorbereitung für /api/chat/match und /api/chat/match/stream:
+    Standort erkennen, Antwort-Cache prüfen und passende Praxen ermitteln.
+    
+    Returns:
+        (kontext, None) oder (None, Fehler-Response)
+    """
+    from services.ai_service import dental_match_cache, dental_match_cache_key
     
-    data = request.get_json()
     if not data:
-        return jsonify({'error': 'Keine Daten empfangen'}), 400
+        return None, (jsonify({'error': 'Keine Daten empfangen'}), 400)
     
     user_message = data.get('message', '').strip()
     location = data.get('location', '').strip()
@@ -5171,51 +4611,11 @@ def dental_match_chat():
     conversation_history = data.get('history', [])
     
     if not user_message:
-        return jsonify({'error': 'Nachricht fehlt'}), 400
+        return None, (jsonify({'error': 'Nachricht fehlt'}), 400)
     
     # Standort aus Nachricht extrahieren falls nicht explizit angegeben
-    import re
-    
-    db_staedte = db.session.query(Praxis.stadt).distinct().all()
-    db_staedte_list = [s[0].strip().lower() for s in db_staedte if s[0]]
-    
-    bekannte_staedte = ['berlin', 'hamburg', 'münchen', 'muenchen', 'köln', 'koeln', 'frankfurt', 
-                       'stuttgart', 'düsseldorf', 'duesseldorf', 'dortmund', 'essen', 'leipzig', 
-                       'bremen', 'dresden', 'hannover', 'nürnberg', 'nuernberg', 'duisburg', 
-                       'bochum', 'wuppertal', 'bielefeld', 'bonn', 'münster', 'muenster', 
-                       'karlsruhe', 'mannheim', 'augsburg', 'wiesbaden', 'mainz', 'aachen']
-    
-    alle_staedte = set(db_staedte_list) | set(bekannte_staedte)
-    
-    def extract_location_from_text(text):
-        text_lower = text.lower()
-        found = None
-        
-        naehe_match = re.search(r'(?:in\s+der\s+)?n[äa]he\s+(?:von\s+)?([A-ZÄÖÜa-zäöüß][A-ZÄÖÜa-zäöüß\-]+)', text, re.IGNORECASE)
-        if naehe_match:
-            kandidat = naehe_match.group(1).strip().lower()
-            if kandidat in alle_staedte:
-                original = next((s[0].strip() for s in db_staedte if s[0] and s[0].strip().lower() == kandidat), None)
-                found = original if original else kandidat.title()
-        
-        if not found:
-            pattern = r'\b(?:in|aus|bei|nach|wohne|lebe|komme)\s+(?:in\s+)?([A-ZÄÖÜa-zäöüß][A-ZÄÖÜa-zäöüß\-]+)\b'
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for kandidat in matches:
-                kandidat_lower = kandidat.strip().lower()
-                if kandidat_lower in alle_staedte:
-                    original = next((s[0].strip() for s in db_staedte if s[0] and s[0].strip().lower() == kandidat_lower), None)
-                    found = original if original else kandidat.title()
-                    break
-        
-        if not found:
-            for stadt in alle_staedte:
-                if stadt in text_lower:
-                    original = next((s[0].strip() for s in db_staedte if s[0] and s[0].strip().lower() == stadt), None)
-                    found = original if original else stadt.title()
-                    break
-        
-        return found
+    from services.praxis_snapshot import stadt_matcher
+    extract_location_from_text = stadt_matcher().finde
     
     if not location:
         location = extract_location_from_text(user_message)
@@ -5228,202 +4628,37 @@ def dental_match_chat():
                     location = found
                     break
     
+    # Antwort-Cache: gleiche Frage + Standort + Filter bei unverändertem Praxis-Bestand
+    cache_key = dental_match_cache_key(user_message, location, filters, conversation_history)
+    daten_version = snapshot_version()
+    cached = dental_match_cache.get(cache_key, daten_version)
+    if cached is not None:
+        return {'cached': cached}, None
+    
     praxen_data = []
-    user_lat, user_lng = None, None
-    max_radius_km = 25  # Maximaler Umkreis in km
     
     if location:
         # Versuche Koordinaten für den Standort zu ermitteln
+        user_lat, user_lng = None, None
         try:
             user_lat, user_lng = get_coordinates_from_address(f"{location}, Deutschland")
         except Exception as e:
             logging.warning(f"Geocoding fehlgeschlagen für {location}: {e}")
         
-        # Bewertungsdaten vorladen
-        bewertung_stats = db.session.query(
-            Bewertung.praxis_id,
-            sql_func.avg(Bewertung.sterne).label('avg_sterne'),
-            sql_func.count(Bewertung.id).label('anzahl')
-        ).filter(Bewertung.bestaetigt == True).group_by(Bewertung.praxis_id).all()
-        chatbot_bewertung_map = {b.praxis_id: {'avg': round(float(b.avg_sterne), 1), 'anzahl': int(b.anzahl)} for b in bewertung_stats}
-        
-        # 1. DATENBANK-PRAXEN durchsuchen
-        query = Praxis.query.filter(Praxis.ist_demo != True)
-        
-        # Filter anwenden
-        if filters.get('angstpatienten'):
-            query = query.filter(Praxis.angstpatientenfreundlich == True)
-        if filters.get('kinder'):
-            query = query.filter(Praxis.kinderfreundlich == True)
-        if filters.get('barrierefrei'):
-            query = query.filter(Praxis.barrierefrei == True)
-        if filters.get('abendsprechstunde'):
-            query = query.filter(Praxis.abendsprechstunde == True)
-        if filters.get('samstag'):
-            query = query.filter(Praxis.samstagssprechstunde == True)
-        
-        db_praxen_mit_distanz = []
-        
-        # Wenn wir Koordinaten haben, nutze Geo-Filter für DB-Praxen
-        if user_lat and user_lng:
-            alle_db_praxen = query.filter(
-                Praxis.latitude.isnot(None),
-                Praxis.longitude.isnot(None)
-            ).all()
-            
-            for p in alle_db_praxen:
-                distanz = haversine_distance(user_lat, user_lng, p.latitude, p.longitude)
-                if distanz <= max_radius_km:
-                    bew = chatbot_bewertung_map.get(p.id, {'avg': 0, 'anzahl': 0})
-                    db_praxen_mit_distanz.append({
-                        'name': p.name,
-                        'strasse': p.strasse,
-                        'plz': p.plz,
-                        'stadt': p.stadt,
-                        'telefon': p.telefon,
-                        'paket': p.paket or 'basic',
-                        'leistungsschwerpunkte': p.leistungsschwerpunkte,
-                        'angstpatientenfreundlich': p.angstpatientenfreundlich,
-                        'kinderfreundlich': p.kinderfreundlich,
-                        'barrierefrei': p.barrierefrei,
-                        'abendsprechstunde': p.abendsprechstunde,
-                        'samstagssprechstunde': p.samstagssprechstunde,
-                        'sprachen': p.sprachen,
-                        'slug': p.slug,
-                        'ist_verifiziert': p.ist_verifiziert,
-                        'distanz': distanz,
-                        'quelle': 'db',
-                        'bewertung_avg': bew['avg'],
-                        'bewertung_anzahl': bew['anzahl'],
-                        'google_rating': p.google_rating,
-                        'google_review_count': p.google_review_count or 0
-                    })
-        else:
-            # Fallback: Stadtname-basierte Suche
-            db_praxen = query.filter(Praxis.stadt.ilike(f'%{location}%')).all()
-            for p in db_praxen:
-                bew = chatbot_bewertung_map.get(p.id, {'avg': 0, 'anzahl': 0})
-                db_praxen_mit_distanz.append({
-                    'name': p.name,
-                    'strasse': p.strasse,
-                    'plz': p.plz,
-                    'stadt': p.stadt,
-                    'telefon': p.telefon,
-                    'paket': p.paket or 'basic',
-                    'leistungsschwerpunkte': p.leistungsschwerpunkte,
-                    'angstpatientenfreundlich': p.angstpatientenfreundlich,
-                    'kinderfreundlich': p.kinderfreundlich,
-                    'barrierefrei': p.barrierefrei,
-                    'abendsprechstunde': p.abendsprechstunde,
-                    'samstagssprechstunde': p.samstagssprechstunde,
-                    'sprachen': p.sprachen,
-                    'slug': p.slug,
-                    'ist_verifiziert': p.ist_verifiziert,
-                    'distanz': 0,
-                    'quelle': 'db',
-                    'bewertung_avg': bew['avg'],
-                    'bewertung_anzahl': bew['anzahl'],
-                    'google_rating': p.google_rating,
-                    'google_review_count': p.google_review_count or 0
-                })
-        
-        # 2. CSV-PRAXEN durchsuchen (zahnaerzte.csv)
-        csv_praxen_mit_distanz = []
+        # Top 10 aus dem Praxis-Snapshot (Umkreis 25 km, ohne Koordinaten über den Städtenamen)
+        from services.praxis_snapshot import finde_praxis_kandidaten
         try:
-            csv_praxen = lade_praxen("zahnaerzte.csv")
-            location_lower = location.lower()
-            
-            for p in csv_praxen:
-                csv_lat = p.get('lat')
-                csv_lng = p.get('lng')
-                csv_stadt = (p.get('stadt') or '').lower()
-                
-                # Geo-basierte Filterung wenn möglich
-                if user_lat and user_lng and csv_lat and csv_lng:
-                    try:
-                        distanz = haversine_distance(user_lat, user_lng, float(csv_lat), float(csv_lng))
-                        if distanz <= max_radius_km:
-                            csv_praxen_mit_distanz.append({
-                                'name': p.get('name', ''),
-                                'strasse': p.get('straße', ''),
-                                'plz': p.get('plz', ''),
-                                'stadt': p.get('stadt', ''),
-                                'telefon': p.get('telefon', ''),
-                                'paket': 'basis',
-                                'leistungsschwerpunkte': p.get('leistungsschwerpunkte', ''),
-                                'angstpatientenfreundlich': False,
-                                'kinderfreundlich': False,
-                                'barrierefrei': False,
-                                'abendsprechstunde': False,
-                                'samstagssprechstunde': False,
-                                'sprachen': '',
-                                'slug': None,
-                                'ist_verifiziert': False,
-                                'distanz': distanz,
-                                'quelle': 'csv',
-                                'csv_id': p.get('csv_id')
-                            })
-                    except (ValueError, TypeError):
-                        pass
-                # Fallback: Stadtname-Match (nur wenn Stadt vorhanden)
-                elif csv_stadt and (location_lower in csv_stadt or csv_stadt in location_lower):
-                    csv_praxen_mit_distanz.append({
-                        'name': p.get('name', ''),
-                        'strasse': p.get('straße', ''),
-                        'plz': p.get('plz', ''),
-                        'stadt': p.get('stadt', ''),
-                        'telefon': p.get('telefon', ''),
-                        'paket': 'basis',
-                        'leistungsschwerpunkte': p.get('leistungsschwerpunkte', ''),
-                        'angstpatientenfreundlich': False,
-                        'kinderfreundlich': False,
-                        'barrierefrei': False,
-                        'abendsprechstunde': False,
-                        'samstagssprechstunde': False,
-                        'sprachen': '',
-                        'slug': None,
-                        'ist_verifiziert': False,
-                        'distanz': 0,
-                        'quelle': 'csv',
-                        'csv_id': p.get('csv_id')
-                    })
+            praxen_data = finde_praxis_kandidaten(
+                lat=user_lat if user_lat and user_lng else None,
+                lng=user_lng if user_lat and user_lng else None,
+                stadt=location,
+                filter=filters,
+                radius_km=25,
+                k=10
+            )
         except Exception as e:
-            logging.warning(f"CSV-Praxen laden fehlgeschlagen: {e}")
-        
-        # 3. Ergebnisse kombinieren und sortieren
-        alle_ergebnisse = db_praxen_mit_distanz + csv_praxen_mit_distanz
-        
-        def sort_key(item):
-            paket_prio = {'premiumplus': 1, 'premium': 2, 'basis': 3, 'basic': 3}.get((item.get('paket') or 'basis').lower(), 4)
-            verifiziert = -1 if item.get('ist_verifiziert') else 0
-            distanz = item.get('distanz', 999)
-            return (paket_prio, verifiziert, distanz)
-        
-        alle_ergebnisse.sort(key=sort_key)
-        
-        # Top 10 Ergebnisse für KI vorbereiten
-        for item in alle_ergebnisse[:10]:
-            praxen_data.append({
-                'name': item.get('name'),
-                'strasse': item.get('strasse'),
-                'plz': item.get('plz'),
-                'stadt': item.get('stadt'),
-                'telefon': item.get('telefon'),
-                'paket': item.get('paket'),
-                'leistungsschwerpunkte': item.get('leistungsschwerpunkte'),
-                'angstpatientenfreundlich': item.get('angstpatientenfreundlich'),
-                'kinderfreundlich': item.get('kinderfreundlich'),
-                'barrierefrei': item.get('barrierefrei'),
-                'abendsprechstunde': item.get('abendsprechstunde'),
-                'samstagssprechstunde': item.get('samstagssprechstunde'),
-                'sprachen': item.get('sprachen'),
-                'slug': item.get('slug'),
-                'quelle': item.get('quelle', 'db'),
-                'bewertung_avg': item.get('bewertung_avg', 0),
-                'bewertung_anzahl': item.get('bewertung_anzahl', 0),
-                'google_rating': item.get('google_rating'),
-                'google_review_count': item.get('google_review_count', 0)
-            })
+            db.session.rollback()
+            logging.warning(f"Praxis-Kandidaten konnten nicht ermittelt werden: {e}")
     
     # Premium-Praxen für Frontend-Karten extrahieren
     premium_praxen = []
@@ -5446,14 +4681,41 @@ def dental_match_chat():
                 'google_review_count': p.get('google_review_count', 0)
             })
     
+    return {
+        'cached': None,
+        'user_message': user_message,
+        'conversation_history': conversation_history,
+        'location': location,
+        'praxen_data': praxen_data,
+        'premium_praxen': premium_praxen[:3],  # Max 3 Premium-Karten
+        'cache_key': cache_key,
+        'daten_version': daten_version,
+    }, None
+
+
+@csrf.exempt
+@app.route("/api/chat/match", methods=["POST"])
+def dental_match_chat():
+    """API-Endpoint für den Dental Match KI-Chatbot"""
+    from services.ai_service import get_dental_match_response, dental_match_cache, DENTAL_MATCH_FALLBACK
+    
+    kontext, fehler = _dental_match_kontext(request.get_json())
+    if fehler:
+        return fehler
+    if kontext['cached'] is not None:
+        return jsonify(kontext['cached'])
+    
     try:
-        response = get_dental_match_response(user_message, praxen_data, conversation_history)
-        return jsonify({
+        response = get_dental_match_response(kontext['user_message'], kontext['praxen_data'], kontext['conversation_history'])
+        ergebnis = {
             'response': response,
-            'praxen_count': len(praxen_data),
-            'location_detected': location if location else None,
-            'premium_praxen': premium_praxen[:3]  # Max 3 Premium-Karten
-        })
+            'praxen_count': len(kontext['praxen_data']),
+            'location_detected': kontext['location'] if kontext['location'] else None,
+            'premium_praxen': kontext['premium_praxen']
+        }
+        if response != DENTAL_MATCH_FALLBACK:
+            dental_match_cache.set(kontext['cache_key'], ergebnis, kontext['daten_version'])
+        return jsonify(ergebnis)
     except Exception as e:
         logging.error(f"Dental Match Chat Fehler: {e}")
         return jsonify({
@@ -5462,6 +4724,95 @@ def dental_match_chat():
         }), 500
 
 
+# Gestreamte Antworten belegen einen gthread-Thread für die gesamte Generierung (höchstens
+# max_dauer, bei Verbindungsabbruch endet sie vorher). Höchstens so viele Streams gleichzeitig,
+# damit immer Threads für normale Seiten frei bleiben. CHAT_STREAM_MAX_PARALLEL gilt für den
+# ganzen Service und wird auf die Worker aufgeteilt (render.yaml: 4 → 2 von 4 Threads je Worker)
+_chat_stream_slots = threading.BoundedSemaphore(anteil_pro_prozess(os.environ.get("CHAT_STREAM_MAX_PARALLEL", 3)))
+
+
+def _belege_chat_stream_slot():
+    """Reserviert einen Stream-Slot; liefert die (mehrfach aufrufbare) Freigabe oder None, wenn alle belegt sind"""
+    if not _chat_stream_slots.acquire(blocking=False):
+        return None
+    lock = threading.Lock()
+    belegt = [True]
+
+    def freigeben():
+        with lock:
+            if not belegt:
+                return
+            belegt.clear()
+        _chat_stream_slots.release()
+
+    return freigeben
+
+
+def _sse(event, daten):
+    return f"event: {event}\ndata: {json.dumps(daten, ensure_ascii=False)}\n\n"
+
+
+@csrf.exempt
+@app.route("/api/chat/match/stream", methods=["POST"])
+def dental_match_chat_stream():
+    """Streaming-Variante des Dental Match Chatbots (Server-Sent Events)"""
+    from services.ai_service import stream_dental_match_response, dental_match_cache, DENTAL_MATCH_FALLBACK
+    
+    kontext, fehler = _dental_match_kontext(request.get_json())
+    if fehler:
+        return fehler
+    
+    sse_headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    
+    if kontext['cached'] is not None:
+        cached = kontext['cached']
+        def aus_cache():
+            yield _sse('meta', {k: v for k, v in cached.items() if k != 'response'})
+            yield _sse('token', {'t': cached['response']})
+            yield _sse('done', {'cached': True})
+        return Response(aus_cache(), mimetype='text/event-stream', headers=sse_headers)
+    
+    freigeben = _belege_chat_stream_slot()
+    if freigeben is None:
+        # Alle Stream-Slots belegt: Client fällt auf /api/chat/match zurück
+        return jsonify({'error': 'Stream ausgelastet', 'fallback': True}), 503
+    
+    meta = {
+        'praxen_count': len(kontext['praxen_data']),
+        'location_detected': kontext['location'] if kontext['location'] else None,
+        'premium_praxen': kontext['premium_praxen']
+    }
+    
+    def generate():
+        teile = []
+        status = {}
+        try:
+            yield _sse('meta', meta)
+            for teil in stream_dental_match_response(kontext['user_message'], kontext['praxen_data'], kontext['conversation_history'], status=status):
+                teile.append(teil)
+                yield _sse('token', {'t': teil})
+            antwort = ''.join(teile)
+            # Abgeschnittene Antworten (Zeitlimit/Token-Limit) nicht für spätere Anfragen cachen
+            if antwort and antwort != DENTAL_MATCH_FALLBACK and not status.get('abgebrochen'):
+                dental_match_cache.set(kontext['cache_key'], dict(meta, response=antwort), kontext['daten_version'])
+            yield _sse('done', {'cached': False, 'abgebrochen': bool(status.get('abgebrochen'))})
+        except Exception as e:
+            logging.error(f"Dental Match Stream Fehler: {e}")
+            yield _sse('error', {'message': 'Entschuldigung, es ist ein Fehler aufgetreten. Bitte versuchen Sie es erneut.'})
+        finally:
+            freigeben()
+    
+    # generate() startet erst mit dem ersten abgerufenen Chunk – wird die Antwort vorher
+    # geschlossen oder verworfen (z.B. durch eine 500 aus after_request ersetzt), läuft
+    # dessen finally nie. Dann geben call_on_close bzw. der Finalizer des Generators frei
+    # (spätestens bei der nächsten Garbage Collection).
+    stream = generate()
+    weakref.finalize(stream, freigeben)
+    antwort = Response(stream_with_context(stream), mimetype='text/event-stream', headers=sse_headers)
+    antwort.call_on_close(freigeben)
+    return antwort
+
+
 @csrf.exempt
 @app.route("/api/ai/generate-text", methods=["POST"])
 @login_required
@@ -6520,6 +5871,7 @@ def dashboard_stellenangebot_erstellen():
     
     db.session.add(neues_stellenangebot)
     db.session.commit()
+    invalidiere_job_index()
     
     try:
         notify_matching_job_alerts(neues_stellenangebot)
@@ -6545,6 +5897,7 @@ def dashboard_stellenangebot_toggle(job_id):
     
     job.ist_aktiv = not job.ist_aktiv
     db.session.commit()
+    invalidiere_job_index()
     
     status = 'aktiviert' if job.ist_aktiv else 'deaktiviert'
     flash(f'Stellenangebot {status}.', 'success')
@@ -6566,6 +5919,7 @@ def dashboard_stellenangebot_loeschen(job_id):
     
     db.session.delete(job)
     db.session.commit()
+    invalidiere_job_index()
     
     flash('Stellenangebot gelöscht.', 'success')
     return redirect(url_for('zahnarzt_dashboard', page='stellenangebote'))
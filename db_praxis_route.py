@@ -9,6 +9,8 @@ from werkzeug.utils import secure_filename
 from datetime import datetime, timedelta, date, time
 import json
 from flask_wtf import FlaskForm
+# Ersetzte Bilder werden nicht direkt gelöscht (Inhalte können von mehreren Praxen geteilt sein),
+# verwaiste Dateien räumt services/bild_speicher.py auf
 from image_utils import optimize_and_save
 
 # Doppelte Slugify-Import entfernt
@@ -539,8 +541,6 @@ def praxis_daten_speichern_db():
             if pfad:
                 logo_bild = PraxisBild.query.filter_by(praxis_id=praxis.id, typ='logo').first()
                 if logo_bild:
-                    if os.path.exists(os.path.join(os.getcwd(), logo_bild.pfad.lstrip('/'))):
-                        os.remove(os.path.join(os.getcwd(), logo_bild.pfad.lstrip('/')))
                     logo_bild.pfad = pfad
                 else:
                     neues_logo = PraxisBild(
@@ -556,8 +556,6 @@ def praxis_daten_speichern_db():
             if pfad:
                 titelbild = PraxisBild.query.filter_by(praxis_id=praxis.id, typ='titelbild').first()
                 if titelbild:
-                    if os.path.exists(os.path.join(os.getcwd(), titelbild.pfad.lstrip('/'))):
-                        os.remove(os.path.join(os.getcwd(), titelbild.pfad.lstrip('/')))
                     titelbild.pfad = pfad
                 else:
                     neues_titelbild = PraxisBild(
@@ -573,8 +571,6 @@ def praxis_daten_speichern_db():
             if pfad:
                 teamfoto = PraxisBild.query.filter_by(praxis_id=praxis.id, typ='team_foto').first()
                 if teamfoto:
-                    if os.path.exists(os.path.join(os.getcwd(), teamfoto.pfad.lstrip('/'))):
-                        os.remove(os.path.join(os.getcwd(), teamfoto.pfad.lstrip('/')))
                     teamfoto.pfad = pfad
                 else:
                     neues_teamfoto = PraxisBild(
@@ -590,8 +586,6 @@ def praxis_daten_speichern_db():
             if pfad:
                 portrait = PraxisBild.query.filter_by(praxis_id=praxis.id, typ='portrait').first()
                 if portrait:
-                    if os.path.exists(os.path.join(os.getcwd(), portrait.pfad.lstrip('/'))):
-                        os.remove(os.path.join(os.getcwd(), portrait.pfad.lstrip('/')))
                     portrait.pfad = pfad
                 else:
                     neues_portrait = PraxisBild(
@@ -786,8 +780,6 @@ def praxis_daten_speichern_db():
             if pfad:
                 logo_bild = PraxisBild.query.filter_by(praxis_id=praxis.id, typ='logo').first()
                 if logo_bild:
-                    if os.path.exists(os.path.join(os.getcwd(), logo_bild.pfad.lstrip('/'))):
-                        os.remove(os.path.join(os.getcwd(), logo_bild.pfad.lstrip('/')))
                     logo_bild.pfad = pfad
                 else:
                     neues_logo = PraxisBild(typ='logo', pfad=pfad, praxis_id=praxis.id)
@@ -801,8 +793,6 @@ def praxis_daten_speichern_db():
             if pfad:
                 titelbild = PraxisBild.query.filter_by(praxis_id=praxis.id, typ='titelbild').first()
                 if titelbild:
-                    if os.path.exists(os.path.join(os.getcwd(), titelbild.pfad.lstrip('/'))):
-                        os.remove(os.path.join(os.getcwd(), titelbild.pfad.lstrip('/')))
                     titelbild.pfad = pfad
                 else:
                     neues_titelbild = PraxisBild(typ='titelbild', pfad=pfad, praxis_id=praxis.id)
@@ -816,8 +806,6 @@ def praxis_daten_speichern_db():
             if pfad:
                 teamfoto = PraxisBild.query.filter_by(praxis_id=praxis.id, typ='team_foto').first()
                 if teamfoto:
-                    if os.path.exists(os.path.join(os.getcwd(), teamfoto.pfad.lstrip('/'))):
-                        os.remove(os.path.join(os.getcwd(), teamfoto.pfad.lstrip('/')))
                     teamfoto.pfad = pfad
                 else:
                     neues_teamfoto = PraxisBild(typ='team_foto', pfad=pfad, praxis_id=praxis.id)
@@ -831,8 +819,6 @@ def praxis_daten_speichern_db():
             if pfad:
                 portrait = PraxisBild.query.filter_by(praxis_id=praxis.id, typ='portrait').first()
                 if portrait:
-                    if os.path.exists(os.path.join(os.getcwd(), portrait.pfad.lstrip('/'))):
-                        os.remove(os.path.join(os.getcwd(), portrait.pfad.lstrip('/')))
                     portrait.pfad = pfad
                 else:
                     neues_portrait = PraxisBild(typ='portrait', pfad=pfad, praxis_id=praxis.id)
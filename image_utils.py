@@ -1,20 +1,238 @@
 import os
-from PIL import Image
-from werkzeug.utils import secure_filename
-from datetime import datetime
+import json
+import time
+import hashlib
+import importlib
+import logging
+import threading
+import multiprocessing
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
 
 UPLOAD_FOLDER = os.path.join(os.getcwd(), 'static', 'uploads', 'praxis')
+UPLOAD_URL = '/static/uploads/praxis/'
+# Inhaltsadressierte Ablage: cas/<2 Zeichen>/<sha256-Präfix des Uploads>.webp – gleiche Bilder werden nur einmal gespeichert
+CAS_ORDNER = 'cas'
+CAS_HASH_LAENGE = 32
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+ERLAUBTE_FORMATE = {'PNG', 'JPEG', 'GIF', 'WEBP', 'MPO'}
 MAX_FILE_SIZE = 10 * 1024 * 1024
+# Schutz vor Dekompressionsbomben: 40 MP entsprechen dekodiert ca. 120 MB (RGB).
+# Größere Bilder werden schon beim Upload anhand des Headers abgelehnt.
+MAX_BILD_PIXEL = int(os.environ.get('MAX_BILD_PIXEL', 40_000_000))
 MAX_WIDTH = 1600
 WEBP_QUALITY = 85
+AVIF_QUALITY = 60
+
+# Breiten der responsiven Varianten (srcset); größere als das Original werden nicht erzeugt
+VARIANTEN_BREITEN = (480, 960, MAX_WIDTH)
+# Bildverarbeitung braucht viel RAM – standardmäßig nur ein Prozess neben dem Webserver
+BILD_POOL_WORKER = int(os.environ.get('BILD_POOL_WORKER', 1))
+# Nicht vorhandene Varianten werden nach dieser Zeit erneut auf der Platte gesucht
+MANIFEST_NEUPRUEFUNG_SEK = 10
+
+_pool = None
+_pool_lock = threading.Lock()
+_manifest_cache = {}  # {pfad: (geprueft, manifest oder None)}
+
+
+@lru_cache(maxsize=1)
+def _pil():
+    """
+    Lädt Pillow beim ersten Bild-Upload bzw. im Prozess-Pool – nicht schon beim
+    Import von main/app (die Templates brauchen nur die Manifest-Funktionen).
+    """
+    from PIL import Image
+    try:
+        # Optionales AVIF-Plugin für Pillow-Versionen ohne eingebautes AVIF; registriert sich beim Import
+        importlib.import_module('pillow_avif')
+    except ImportError:
+        pass
+    Image.MAX_IMAGE_PIXELS = MAX_BILD_PIXEL
+    Image.init()
+    return Image
+
+
+def avif_verfuegbar():
+    return 'AVIF' in _pil().SAVE
 
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def _hole_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn statt fork: der Webprozess hat Threads und offene DB-Verbindungen
+            _pool = ProcessPoolExecutor(
+                max_workers=BILD_POOL_WORKER,
+                mp_context=multiprocessing.get_context('spawn'),
+                max_tasks_per_child=20
+            )
+        return _pool
+
+
+def _verwerfe_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=False)
+        _pool = None
+
+
+def _varianten_fertig(future):
+    try:
+        logger.info(f"Bildvarianten erzeugt: {future.result()}")
+    except Exception as e:
+        logger.error(f"Bildvarianten fehlgeschlagen: {e}")
+
+
+def plane_varianten(dateipfad):
+    """Übergibt die Variantenerzeugung an den Prozess-Pool (kehrt sofort zurück)"""
+    for versuch in range(2):
+        try:
+            _hole_pool().submit(erzeuge_varianten, dateipfad).add_done_callback(_varianten_fertig)
+            return True
+        except (BrokenProcessPool, RuntimeError) as e:
+            logger.warning(f"Bild-Pool nicht verfügbar ({e}), starte neu")
+            _verwerfe_pool()
+    return False
+
+
+def dekodiere_reduziert(dateipfad, max_breite):
+    """
+    Dekodiert ein Bild möglichst nah an der benötigten Breite.
+
+    JPEGs werden per Draft-Modus direkt in 1/2, 1/4 oder 1/8 der Größe dekodiert
+    (DCT-Skalierung), andere Formate vor dem LANCZOS-Resize ganzzahlig per reduce()
+    verkleinert. Bilder über MAX_BILD_PIXEL werden nicht dekodiert.
+
+    Returns:
+        Bild im Modus RGB oder RGBA, mindestens `max_breite` breit (sofern das Original so breit ist)
+    """
+    from PIL import ImageOps
+    Image = _pil()
+
+    with Image.open(dateipfad) as original:
+        if original.width * original.height > MAX_BILD_PIXEL:
+            raise ValueError(f"Bild zu groß: {original.width}x{original.height}")
+
+        # EXIF-Orientierung 5-8 vertauscht Breite und Höhe
+        gedreht = original.getexif().get(0x0112, 1) in (5, 6, 7, 8)
+        breite, hoehe = (original.height, original.width) if gedreht else original.size
+        if breite > max_breite:
+            ziel = (max_breite, max(1, round(hoehe * max_breite / breite)))
+            original.draft(None, ziel[::-1] if gedreht else ziel)
+
+        # In-place statt Kopie: sonst läge das volle Bild zweimal im Speicher
+        ImageOps.exif_transpose(original, in_place=True)
+
+        img = original
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+        modus = 'RGBA' if has_alpha else 'RGB'
+        if img.mode != modus:
+            img = img.convert(modus)
+
+        faktor = img.width // max_breite
+        if faktor >= 2:
+            img = img.reduce(faktor)
+
+        # Das Original wird beim Verlassen des with-Blocks geschlossen
+        if img is original:
+            img = original.copy()
+    return img
+
+
+def erzeuge_varianten(dateipfad):
+    """
+    Erzeugt WEBP- (und falls verfügbar AVIF-)Varianten in mehreren Breiten und
+    schreibt ein Manifest daneben. Läuft im Prozess-Pool.
+
+    Returns:
+        Dateiname und erzeugte Breiten
+    """
+    Image = _pil()
+    avif = avif_verfuegbar()
+    basis = os.path.splitext(dateipfad)[0]
+    img = dekodiere_reduziert(dateipfad, max(VARIANTEN_BREITEN))
+
+    breiten = sorted({min(breite, img.width) for breite in VARIANTEN_BREITEN}, reverse=True)
+    formate = ['avif', 'webp'] if avif else ['webp']
+
+    # Absteigend verkleinern: jede Variante entsteht aus der nächstgrößeren
+    quelle = img
+    for breite in breiten:
+        if breite != quelle.width:
+            quelle = quelle.resize((breite, max(1, round(quelle.height * breite / quelle.width))), Image.LANCZOS)
+        quelle.save(f"{basis}-{breite}w.webp", 'WEBP', quality=WEBP_QUALITY, method=4)
+        if avif:
+            quelle.save(f"{basis}-{breite}w.avif", 'AVIF', quality=AVIF_QUALITY)
+
+    manifest = {'breiten': sorted(breiten), 'formate': formate, 'hoehe': img.height, 'breite': img.width}
+    tmp_pfad = f"{basis}.json.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_pfad, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_pfad, f"{basis}.json")
+    return os.path.basename(dateipfad), manifest['breiten']
+
+
+def _speichere_mit_hash(file_storage, tmp_pfad):
+    """Schreibt den Upload blockweise in eine Temp-Datei und berechnet dabei den Inhalts-Hash (ein Durchlauf)"""
+    sha = hashlib.sha256()
+    with open(tmp_pfad, 'wb') as ziel:
+        for block in iter(lambda: file_storage.read(1024 * 1024), b''):
+            sha.update(block)
+            ziel.write(block)
+    return sha.hexdigest()[:CAS_HASH_LAENGE]
+
+
+def ist_unveraenderlich(url_pfad):
+    """Inhaltsadressierte URLs (inkl. Varianten) ändern ihren Inhalt nie"""
+    return url_pfad.startswith(f"{UPLOAD_URL}{CAS_ORDNER}/")
+
+
+def _speichere_vorschau(quell_pfad, ziel_pfad):
+    """
+    Schreibt die öffentliche Fassung eines Uploads: höchstens MAX_WIDTH breit,
+    nach EXIF-Orientierung gedreht und als WEBP ohne EXIF/XMP/ICC – GPS-Position,
+    Kamera-Seriennummer und Aufnahmezeit des Originals werden nie ausgeliefert.
+    JPEGs werden dabei per Draft-Modus verkleinert dekodiert (dekodiere_reduziert).
+    """
+    Image = _pil()
+    img = dekodiere_reduziert(quell_pfad, MAX_WIDTH)
+    if img.width > MAX_WIDTH:
+        img = img.resize((MAX_WIDTH, max(1, round(img.height * MAX_WIDTH / img.width))), Image.LANCZOS)
+    # Eindeutig je Prozess und Thread: gleichzeitige Uploads desselben Bildes haben denselben Zielpfad
+    tmp_pfad = f"{ziel_pfad}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        # method=0: schnellster Encoder – die srcset-Varianten entstehen danach im Pool
+        img.save(tmp_pfad, 'WEBP', quality=WEBP_QUALITY, method=0)
+        os.replace(tmp_pfad, ziel_pfad)
+    finally:
+        if os.path.exists(tmp_pfad):
+            os.remove(tmp_pfad)
+
+
 def optimize_and_save(file_storage, prefix, praxis_id):
+    """
+    Speichert ein hochgeladenes Bild inhaltsadressiert und plant die Erzeugung
+    der responsiven Varianten.
+
+    Im Request wird das Bild auf MAX_WIDTH verkleinert und ohne Metadaten als
+    WEBP abgelegt (_speichere_vorschau); diese Fassung liefern die Templates aus,
+    bis die Varianten fertig sind. Das hochgeladene Original wird nicht
+    gespeichert. Skalieren auf die srcset-Breiten und AVIF laufen im Prozess-Pool.
+    Ist derselbe Inhalt schon vorhanden, wird die Datei wiederverwendet. Nicht
+    mehr referenzierte Dateien räumt services/bild_speicher.py auf.
+
+    Returns:
+        URL-Pfad der öffentlichen Fassung oder None bei ungültiger Datei
+    """
     if not file_storage or not file_storage.filename or not allowed_file(file_storage.filename):
         return None
 
@@ -25,27 +243,75 @@ def optimize_and_save(file_storage, prefix, praxis_id):
     if file_size > MAX_FILE_SIZE:
         return None
 
+    tmp_pfad = None
     try:
-        img = Image.open(file_storage)
+        # Liest nur den Header – Dekompressionsbomben (> 2x MAX_BILD_PIXEL) lösen hier bereits eine Exception aus.
+        with _pil().open(file_storage) as img:
+            if img.format not in ERLAUBTE_FORMATE or img.width * img.height > MAX_BILD_PIXEL:
+                return None
+        file_storage.seek(0)
 
-        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+        cas_ordner = os.path.join(UPLOAD_FOLDER, CAS_ORDNER)
+        os.makedirs(cas_ordner, exist_ok=True)
+        tmp_pfad = os.path.join(cas_ordner, f".upload.{os.getpid()}.{threading.get_ident()}.tmp")
+        inhalts_hash = _speichere_mit_hash(file_storage, tmp_pfad)
+        relativ = f"{CAS_ORDNER}/{inhalts_hash[:2]}/{inhalts_hash}.webp"
+        filepath = os.path.join(UPLOAD_FOLDER, relativ)
 
-        if has_alpha:
-            img = img.convert('RGBA')
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
+        if os.path.exists(filepath):
+            # Dublette: Zeitstempel erneuern, damit der Sweeper die Datei nicht vor dem Commit entfernt
+            os.utime(filepath)
+            if not os.path.exists(os.path.splitext(filepath)[0] + '.json'):
+                plane_varianten(filepath)
+        else:
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            _speichere_vorschau(tmp_pfad, filepath)
+            plane_varianten(filepath)
 
-        if img.width > MAX_WIDTH:
-            ratio = MAX_WIDTH / img.width
-            new_height = int(img.height * ratio)
-            img = img.resize((MAX_WIDTH, new_height), Image.LANCZOS)
+        return f"{UPLOAD_URL}{relativ}"
+    except Exception as e:
+        logger.warning(f"Bild-Upload abgelehnt: {e}")
+        return None
+    finally:
+        if tmp_pfad and os.path.exists(tmp_pfad):
+            os.remove(tmp_pfad)
 
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        filename = secure_filename(f"{prefix}_{praxis_id}_{timestamp}.webp")
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        img.save(filepath, 'WEBP', quality=WEBP_QUALITY, method=4)
 
-        return f"/static/uploads/praxis/{filename}"
-    except Exception:
+def _lade_manifest(pfad):
+    if not pfad or not pfad.startswith(UPLOAD_URL):
         return None
+
+    jetzt = time.monotonic()
+    cached = _manifest_cache.get(pfad)
+    if cached and (cached[1] is not None or jetzt - cached[0] < MANIFEST_NEUPRUEFUNG_SEK):
+        return cached[1]
+
+    manifest_pfad = os.path.join(UPLOAD_FOLDER, os.path.splitext(pfad[len(UPLOAD_URL):])[0] + '.json')
+    try:
+        with open(manifest_pfad) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    _manifest_cache[pfad] = (jetzt, manifest)
+    return manifest
+
+
+def _varianten_url(pfad, breite, format):
+    return f"{os.path.splitext(pfad)[0]}-{breite}w.{format}"
+
+
+def bild_srcset(pfad, format='webp'):
+    """srcset-Angabe für ein hochgeladenes Bild ('' solange keine Varianten existieren)"""
+    manifest = _lade_manifest(pfad)
+    if not manifest or format not in manifest['formate']:
+        return ''
+    return ', '.join(f"{_varianten_url(pfad, b, format)} {b}w" for b in manifest['breiten'])
+
+
+def bild_variante(pfad, breite, format='webp'):
+    """URL der kleinsten Variante, die mindestens `breite` Pixel breit ist (sonst das Original)"""
+    manifest = _lade_manifest(pfad)
+    if not manifest or format not in manifest['formate']:
+        return pfad
+    passend = [b for b in manifest['breiten'] if b >= breite]
+    return _varianten_url(pfad, passend[0] if passend else manifest['breiten'][-1], format)
@@ -5,6 +5,7 @@ from flask import Flask, flash, redirect, request
 from flask_wtf.csrf import CSRFProtect, CSRFError
 from werkzeug.middleware.proxy_fix import ProxyFix
 from database import db
+from image_utils import bild_srcset, bild_variante
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -31,6 +32,8 @@ db.init_app(app)
 csrf.init_app(app)
 
 app.jinja_env.globals['now'] = datetime.now
+app.jinja_env.globals['bild_srcset'] = bild_srcset
+app.jinja_env.globals['bild_variante'] = bild_variante
 
 @app.errorhandler(CSRFError)
 def handle_csrf_error(e):
@@ -51,45 +54,10 @@ csrf.exempt(zahnarzt_passwort_reset)
 # Datenbank-Models importieren
 with app.app_context():
     from models import *
-    db.create_all()
 
-    # Schema-Migration: fehlende Spalten hinzufügen (produktionssicher)
-    try:
-        db.session.execute(db.text('ALTER TABLE praxis ADD COLUMN IF NOT EXISTS ist_demo BOOLEAN DEFAULT FALSE'))
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        print(f"⚠️ Schema-Migration ist_demo übersprungen: {e}")
-
-    # Schema-Migration: E-Mail-Verifizierungs-Token für Zahnarzt
-    try:
-        db.session.execute(db.text('ALTER TABLE zahnarzt ADD COLUMN IF NOT EXISTS email_verify_token VARCHAR(100)'))
-        db.session.execute(db.text('ALTER TABLE zahnarzt ADD COLUMN IF NOT EXISTS email_verify_expires TIMESTAMP'))
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        print(f"⚠️ Schema-Migration email_verify_token übersprungen: {e}")
-
-    # Demo-Praxen als Demo markieren + Slug korrigieren (einmalige Migration)
-    try:
-        from models import Praxis
-        # Testpraxis auf kanonischen Demo-Slug umbenennen
-        testpraxis = Praxis.query.filter_by(slug='testpraxis-bodenheim').first()
-        if testpraxis:
-            testpraxis.slug = 'praxis-mustermann-mainz'
-            testpraxis.ist_demo = True
-        # Zweite Testpraxis ebenfalls als Demo markieren
-        dr_muste = Praxis.query.filter_by(slug='zahnarztpraxis-dr-muste-mainz').first()
-        if dr_muste and not dr_muste.ist_demo:
-            dr_muste.ist_demo = True
-        # Kanonische Demo-Praxis per neuem Slug markieren
-        mustermann = Praxis.query.filter_by(slug='praxis-mustermann-mainz').first()
-        if mustermann and not mustermann.ist_demo:
-            mustermann.ist_demo = True
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        print(f"⚠️ Demo-Migration übersprungen: {e}")
+    # Schema-Migrationen laufen beim Deploy (migrations.py); hier nur Versionsprüfung
+    from migrations import pruefe_schema
+    pruefe_schema()
 
     # Neue Routen importieren
     try:
@@ -98,5 +66,9 @@ with app.app_context():
     except Exception as e:
         print(f"❌ Fehler beim Laden der Praxis-Routen: {e}")
 
+# Verwaiste Bilddateien regelmäßig aufräumen (nur Webservice, BILD_SWEEPER=1)
+from services.bild_speicher import starte_bild_sweeper
+starte_bild_sweeper(app)
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
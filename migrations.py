@@ -1,11 +1,230 @@
+"""
+Schema- und Datenmigrationen.
+
+Schema-Migrationen sind versioniert: jede Funktion in SCHEMA_MIGRATIONEN läuft
+genau einmal, die angewendeten Versionen stehen in der Tabelle schema_version.
+Sie laufen beim Deploy (`python migrations.py --schema`, preDeployCommand in
+render.yaml); beim Start der App prüft main.py nur die Version und warnt, wenn
+die Datenbank nicht aktuell ist. Nur mit MIGRATIONEN_BEIM_START=1 (lokale
+Entwicklung ohne Deploy-Schritt, gesetzt in .replit) werden fehlende Migrationen
+beim Start nachgeholt – Worker- und Cron-Dienste führen so nie DDL beim Import aus.
+
+Neue Tabellen oder Spalten: Funktion anhängen und neue Versionsnummer vergeben –
+bestehende Einträge nie ändern oder umnummerieren.
+
+Aufruf:
+    python migrations.py --schema    # nur ausstehende Schema-Migrationen
+    python migrations.py --status    # angewendete Versionen anzeigen
+    python migrations.py             # Schema + Datenübernahme aus den CSV-Dateien
+"""
 import os
 import csv
+import time
 from datetime import datetime
-from main import app
+from sqlalchemy import inspect
 from database import db
 import models
 from werkzeug.security import generate_password_hash
 
+# Beliebige, projektweit feste Kennung für pg_advisory_xact_lock
+MIGRATIONS_LOCK_ID = 7246135
+# Zeilen pro INSERT-Block (executemany) und Commit beim Praxis-Import
+PRAXEN_CHUNK_GROESSE = 1000
+
+
+def _ergaenze_spalte(tabelle, spalte, definition):
+    spalten = {s['name'] for s in inspect(db.engine).get_columns(tabelle)}
+    if spalte not in spalten:
+        db.session.execute(db.text(f'ALTER TABLE {tabelle} ADD COLUMN {spalte} {definition}'))
+
+
+def _m001_basisschema():
+    db.create_all()
+
+
+def _m002_praxis_ist_demo():
+    _ergaenze_spalte('praxis', 'ist_demo', 'BOOLEAN DEFAULT FALSE')
+
+
+def _m003_zahnarzt_email_verify():
+    _ergaenze_spalte('zahnarzt', 'email_verify_token', 'VARCHAR(100)')
+    _ergaenze_spalte('zahnarzt', 'email_verify_expires', 'TIMESTAMP')
+
+
+def _m004_job_alert_digest():
+    _ergaenze_spalte('job_alert', 'digest_modus', "VARCHAR(20) DEFAULT 'sofort'")
+    _ergaenze_spalte('job_alert', 'letzter_digest_am', 'TIMESTAMP')
+
+
+def _m005_demo_praxen():
+    # Testpraxis auf kanonischen Demo-Slug umbenennen
+    testpraxis = models.Praxis.query.filter_by(slug='testpraxis-bodenheim').first()
+    if testpraxis:
+        testpraxis.slug = 'praxis-mustermann-mainz'
+        testpraxis.ist_demo = True
+    # Zweite Testpraxis ebenfalls als Demo markieren
+    dr_muste = models.Praxis.query.filter_by(slug='zahnarztpraxis-dr-muste-mainz').first()
+    if dr_muste and not dr_muste.ist_demo:
+        dr_muste.ist_demo = True
+    # Kanonische Demo-Praxis per neuem Slug markieren
+    mustermann = models.Praxis.query.filter_by(slug='praxis-mustermann-mainz').first()
+    if mustermann and not mustermann.ist_demo:
+        mustermann.ist_demo = True
+
+
+def _m006_csv_praxis_status():
+    models.CsvPraxisStatus.__table__.create(db.engine, checkfirst=True)
+
+
+def _m007_geocode_cache():
+    models.GeocodeCache.__table__.create(db.engine, checkfirst=True)
+
+
+# Gewichtete deutsche tsvector-Ausdrücke je Tabelle (siehe services/job_suche.py)
+JOB_SUCHVEKTOREN = {
+    'stellenangebot': (
+        "setweight(to_tsvector('german', coalesce(titel, '')), 'A') || "
+        "setweight(to_tsvector('german', coalesce(\"position\", '')), 'A') || "
+        "setweight(to_tsvector('german', coalesce(tags, '')), 'B')"
+    ),
+    'externes_inserat': (
+        "setweight(to_tsvector('german', coalesce(titel, '')), 'A') || "
+        "setweight(to_tsvector('german', coalesce(unternehmen, '')), 'B') || "
+        "setweight(to_tsvector('german', coalesce(beschreibung, '')), 'C')"
+    ),
+}
+
+
+def _m008_job_volltext():
+    # Nur PostgreSQL; andere Datenbanken nutzen den Index im Prozess
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for tabelle, ausdruck in JOB_SUCHVEKTOREN.items():
+        _ergaenze_spalte(tabelle, 'such_vektor', f'tsvector GENERATED ALWAYS AS ({ausdruck}) STORED')
+        db.session.execute(db.text(
+            f'CREATE INDEX IF NOT EXISTS ix_{tabelle}_such_vektor ON {tabelle} USING GIN (such_vektor)'
+        ))
+
+
+def _m009_rechnung():
+    models.Rechnung.__table__.create(db.engine, checkfirst=True)
+
+
+# Tabelle -> Titel-/Positionsfelder, die per ILIKE '%…%' (Wortteile) durchsucht werden
+JOB_TRIGRAMM_FELDER = {
+    'stellenangebot': ('titel', 'position'),
+    'externes_inserat': ('titel',),
+}
+
+
+def _m010_job_trigramm():
+    # Nur PostgreSQL: GIN-Trigramm-Index, damit ILIKE '%arzt%' nicht die ganze Tabelle liest
+    if db.engine.dialect.name != 'postgresql':
+        return
+    db.session.execute(db.text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    for tabelle, felder in JOB_TRIGRAMM_FELDER.items():
+        for feld in felder:
+            db.session.execute(db.text(
+                f'CREATE INDEX IF NOT EXISTS ix_{tabelle}_{feld}_trgm ON {tabelle} USING GIN ("{feld}" gin_trgm_ops)'
+            ))
+
+
+# (version, beschreibung, funktion) – aufsteigend, nur anhängen
+SCHEMA_MIGRATIONEN = [
+    (1, 'Basisschema (create_all)', _m001_basisschema),
+    (2, 'praxis.ist_demo', _m002_praxis_ist_demo),
+    (3, 'zahnarzt.email_verify_token/-expires', _m003_zahnarzt_email_verify),
+    (4, 'job_alert.digest_modus/letzter_digest_am', _m004_job_alert_digest),
+    (5, 'Demo-Praxen markieren und Slug korrigieren', _m005_demo_praxen),
+    (6, 'csv_praxis_status (Overlay für zahnaerzte.csv)', _m006_csv_praxis_status),
+    (7, 'geocode_cache (dauerhafter Geocoding-Cache)', _m007_geocode_cache),
+    (8, 'Volltextsuche für Stellenangebote (tsvector + GIN)', _m008_job_volltext),
+    (9, 'rechnung (Rechnungs-PDFs in der Datenbank)', _m009_rechnung),
+    (10, 'Trigramm-Index für Titel/Position der Stellenangebote (pg_trgm)', _m010_job_trigramm),
+]
+ZIEL_VERSION = SCHEMA_MIGRATIONEN[-1][0]
+
+
+def _erstelle_versionstabelle():
+    db.session.execute(db.text(
+        'CREATE TABLE IF NOT EXISTS schema_version ('
+        'version INTEGER PRIMARY KEY, beschreibung VARCHAR(200), angewendet_am TIMESTAMP)'
+    ))
+    db.session.commit()
+
+
+def aktuelle_schema_version():
+    """Höchste angewendete Version (0, wenn die Tabelle noch nicht existiert)"""
+    try:
+        return db.session.execute(db.text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+    except Exception:
+        db.session.rollback()
+        return 0
+    finally:
+        db.session.commit()
+
+
+def fuehre_schema_migrationen_aus():
+    """
+    Wendet alle ausstehenden Schema-Migrationen an, jede in einer eigenen Transaktion.
+
+    Auf PostgreSQL serialisiert ein Advisory-Lock parallele Aufrufe (Webservice und
+    Worker starten gleichzeitig); wer wartet, sieht danach die Version als erledigt.
+
+    Returns:
+        Liste der angewendeten Versionen
+    """
+    _erstelle_versionstabelle()
+    ist_postgres = db.engine.dialect.name == 'postgresql'
+    angewendet = []
+
+    for version, beschreibung, funktion in SCHEMA_MIGRATIONEN:
+        try:
+            if ist_postgres:
+                db.session.execute(db.text('SELECT pg_advisory_xact_lock(:id)'), {'id': MIGRATIONS_LOCK_ID})
+            if db.session.execute(db.text('SELECT 1 FROM schema_version WHERE version = :v'), {'v': version}).first():
+                db.session.rollback()
+                continue
+
+            print(f"🔧 Schema-Migration {version}: {beschreibung}")
+            funktion()
+            db.session.execute(
+                db.text('INSERT INTO schema_version (version, beschreibung, angewendet_am) VALUES (:v, :b, :t)'),
+                {'v': version, 'b': beschreibung, 't': datetime.utcnow()}
+            )
+            db.session.commit()
+            angewendet.append(version)
+        except Exception:
+            db.session.rollback()
+            raise
+
+    return angewendet
+
+
+def pruefe_schema():
+    """
+    Versionsprüfung beim Start der App (eine Abfrage). Ausstehende Migrationen
+    werden nur mit MIGRATIONEN_BEIM_START=1 nachgeholt (lokale Entwicklung).
+
+    Returns:
+        Aktuelle Schema-Version
+    """
+    aktuell = aktuelle_schema_version()
+    if aktuell >= ZIEL_VERSION:
+        return aktuell
+
+    if os.environ.get('MIGRATIONEN_BEIM_START', '0') != '1':
+        print(f"⚠️ Datenbankschema veraltet (Version {aktuell}, erwartet {ZIEL_VERSION}) – python migrations.py --schema ausführen")
+        return aktuell
+
+    print(f"⚠️ Datenbankschema Version {aktuell}, erwartet {ZIEL_VERSION} – hole Migrationen nach")
+    try:
+        fuehre_schema_migrationen_aus()
+    except Exception as e:
+        print(f"❌ Schema-Migration fehlgeschlagen: {e}")
+    return aktuelle_schema_version()
+
+
 def lade_csv_daten(datei_pfad):
     daten = []
     if os.path.exists(datei_pfad):
@@ -15,77 +234,103 @@ def lade_csv_daten(datei_pfad):
                 daten.append(row)
     return daten
 
-def migriere_praxen():
+def _csv_koordinate(roh):
+    try:
+        roh = (roh or '').replace(',', '').replace('.', '')
+        return int(roh) / 1e7 if roh else None
+    except ValueError as e:
+        print(f"Fehler bei Koordinaten-Konvertierung: {e}")
+        return None
+
+
+def _eindeutiger_slug(base_slug, vergeben, naechster_zaehler):
+    """Erster freier Slug base, base-1, base-2, ...; merkt sich pro Basis die zuletzt geprüfte Nummer"""
+    slug = base_slug
+    counter = naechster_zaehler.get(base_slug, 1)
+    if slug in vergeben:
+        slug = f"{base_slug}-{counter}"
+        while slug in vergeben:
+            counter += 1
+            slug = f"{base_slug}-{counter}"
+        naechster_zaehler[base_slug] = counter + 1
+    vergeben.add(slug)
+    return slug
+
+
+def migriere_praxen(csv_datei="zahnaerzte.csv", chunk_groesse=PRAXEN_CHUNK_GROESSE):
+    """
+    Übernimmt die Praxen aus der CSV in die Datenbank (Bulk-Import).
+
+    Vorhandene Adressen (PLZ + Straße) und vergebene Slugs werden einmal geladen
+    und im Speicher geprüft – auch Dubletten innerhalb der CSV werden erkannt.
+    Eingefügt wird per executemany in Blöcken, mit Commit und Fortschritt pro Block.
+
+    Returns:
+        dict mit gesamt, importiert, uebersprungen, sekunden
+    """
+    from app import slugify
+
     print("Migriere Zahnarztpraxen...")
-    zahnaerzte_csv = lade_csv_daten("zahnaerzte.csv")
-    
-    # Zähler für die Protokollierung
+    start = time.perf_counter()
+    zahnaerzte_csv = lade_csv_daten(csv_datei)
     count_total = len(zahnaerzte_csv)
+
+    praxis_tabelle = models.Praxis.__table__
+    adressen = set(db.session.query(models.Praxis.plz, models.Praxis.strasse).all())
+    slugs = {slug for (slug,) in db.session.query(models.Praxis.slug).all()}
+    naechster_zaehler = {}
+
     count_imported = 0
     count_skipped = 0
-    
+    block = []
+
+    def schreibe_block():
+        nonlocal count_imported
+        if not block:
+            return
+        db.session.execute(praxis_tabelle.insert(), block)
+        db.session.commit()
+        count_imported += len(block)
+        block.clear()
+        dauer = time.perf_counter() - start
+        print(f"  {count_imported + count_skipped}/{count_total} Zeilen, {count_imported} importiert "
+              f"({count_imported / dauer:.0f} Zeilen/s)")
+
     for praxis_data in zahnaerzte_csv:
-        # Überprüfen, ob die Praxis bereits in der Datenbank existiert
-        existierende_praxis = models.Praxis.query.filter_by(
-            plz=praxis_data.get('plz', ''),
-            strasse=praxis_data.get('straße', '')
-        ).first()
-        
-        if existierende_praxis:
+        adresse = (praxis_data.get('plz', ''), praxis_data.get('straße', ''))
+        if adresse in adressen:
             count_skipped += 1
-            print(f"Praxis wird übersprungen (existiert bereits): {praxis_data.get('name', '')}")
             continue
-        
-        # Slug generieren
-        from app import slugify
+        adressen.add(adresse)
+
         praxis_name = praxis_data.get('name', 'Zahnarztpraxis')
-        stadt = praxis_data.get('stadt', '')
-        base_slug = slugify(f"{praxis_name}-{stadt}")
-        
-        # Eindeutigen Slug erstellen, falls nötig
-        slug = base_slug
-        counter = 1
-        while models.Praxis.query.filter_by(slug=slug).first() is not None:
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        
-        # Latitude und Longitude umwandeln
-        try:
-            raw_lat = praxis_data.get('lat', '0').replace(',', '').replace('.', '')
-            raw_lng = praxis_data.get('lng', '0').replace(',', '').replace('.', '')
-            lat = int(raw_lat) / 1e7 if raw_lat else None
-            lng = int(raw_lng) / 1e7 if raw_lng else None
-        except Exception as e:
-            print(f"Fehler bei Koordinaten-Konvertierung: {e}")
-            lat = None
-            lng = None
-        
-        # Neue Praxis erstellen
-        neue_praxis = models.Praxis(
-            name=praxis_data.get('name', 'Zahnarztpraxis'),
-            slug=slug,
-            strasse=praxis_data.get('straße', ''),
-            plz=praxis_data.get('plz', ''),
-            stadt=praxis_data.get('stadt', ''),
-            telefon=praxis_data.get('telefon', ''),
-            email=praxis_data.get('email', ''),
-            webseite=praxis_data.get('webseite', ''),
-            beschreibung='',
-            latitude=lat,
-            longitude=lng,
-            paket='basic',
-            terminbuchung_aktiv=True,
-            terminbuchung_modus='dashboard',
-            ist_verifiziert=(praxis_data.get('beansprucht', 'nein').lower() == 'ja')
-        )
-        
-        # Zur Datenbank hinzufügen
-        db.session.add(neue_praxis)
-        count_imported += 1
-    
-    # Nach dem Durchlauf speichern
-    db.session.commit()
-    print(f"Migration abgeschlossen: {count_imported} Praxen importiert, {count_skipped} übersprungen (von {count_total} gesamt)")
+        base_slug = slugify(f"{praxis_name}-{praxis_data.get('stadt', '')}")
+
+        block.append({
+            'name': praxis_name,
+            'slug': _eindeutiger_slug(base_slug, slugs, naechster_zaehler),
+            'strasse': praxis_data.get('straße', ''),
+            'plz': praxis_data.get('plz', ''),
+            'stadt': praxis_data.get('stadt', ''),
+            'telefon': praxis_data.get('telefon', ''),
+            'email': praxis_data.get('email', ''),
+            'webseite': praxis_data.get('webseite', ''),
+            'beschreibung': '',
+            'latitude': _csv_koordinate(praxis_data.get('lat', '0')),
+            'longitude': _csv_koordinate(praxis_data.get('lng', '0')),
+            'paket': 'basic',
+            'terminbuchung_aktiv': True,
+            'terminbuchung_modus': 'dashboard',
+            'ist_verifiziert': praxis_data.get('beansprucht', 'nein').lower() == 'ja',
+        })
+        if len(block) >= chunk_groesse:
+            schreibe_block()
+    schreibe_block()
+
+    dauer = time.perf_counter() - start
+    print(f"Migration abgeschlossen: {count_imported} Praxen importiert, {count_skipped} übersprungen "
+          f"(von {count_total} gesamt) in {dauer:.1f} s")
+    return {'gesamt': count_total, 'importiert': count_imported, 'uebersprungen': count_skipped, 'sekunden': dauer}
 
 def migriere_zahnaerzte():
     print("Migriere Zahnarzt-Konten...")
@@ -289,12 +534,30 @@ def migriere_patienten():
     print(f"Migration abgeschlossen: {count_imported} Patienten importiert.")
 
 if __name__ == "__main__":
-    print("Starte Datenmigration...")
-    
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Schema- und Datenmigrationen")
+    parser.add_argument('--schema', action='store_true', help="Nur ausstehende Schema-Migrationen ausführen (Deploy)")
+    parser.add_argument('--status', action='store_true', help="Angewendete Schema-Versionen anzeigen")
+    args = parser.parse_args()
+
+    # Die Migrationen laufen hier explizit, nicht nebenbei beim Import der App
+    os.environ['MIGRATIONEN_BEIM_START'] = '0'
+    from main import app
+
     with app.app_context():
-        # Alle Tabellen erstellen
-        db.create_all()
-        
+        if args.status:
+            print(f"Schema-Version {aktuelle_schema_version()} von {ZIEL_VERSION}")
+            sys.exit(0)
+
+        angewendet = fuehre_schema_migrationen_aus()
+        print(f"✅ Schema aktuell (Version {ZIEL_VERSION}, neu angewendet: {angewendet or 'keine'})")
+        if args.schema:
+            sys.exit(0)
+
+        print("Starte Datenmigration...")
+
         # Daten migrieren
         migriere_praxen()
         migriere_zahnaerzte()
@@ -569,6 +569,8 @@ class JobAlert(db.Model):
     bestaetigt_am = db.Column(db.DateTime)
     erstellt_am = db.Column(db.DateTime, default=datetime.utcnow)
     bestaetigungs_token = db.Column(db.String(100), unique=True)
+    digest_modus = db.Column(db.String(20), default='sofort')  # sofort, taeglich, woechentlich
+    letzter_digest_am = db.Column(db.DateTime)  # Zeitpunkt des letzten Sammel-Versands
     
     def __repr__(self):
         return f'<JobAlert {self.email} - {self.position}>'
@@ -737,4 +739,117 @@ class SiteSettings(db.Model):
         db.session.commit()
     
     def __repr__(self):
-        return f'<SiteSettings {self.key}={self.value}>'
\ No newline at end of file
+        return f'<SiteSettings {self.key}={self.value}>'
+
+class HintergrundJob(db.Model):
+    """Persistenter Hintergrund-Job (z.B. SEO-Batch-Generierung), abgearbeitet von worker.py"""
+    id = db.Column(db.Integer, primary_key=True)
+    typ = db.Column(db.String(50), nullable=False)  # z.B. "stadt_seo", "leistung_stadt_seo"
+    titel = db.Column(db.String(200))  # Anzeige im Admin-Bereich
+    status = db.Column(db.String(20), default='wartend', index=True)  # wartend, laeuft, fertig, abgebrochen
+    
+    # Fortschritt (wird nach jedem Batch aus den Items aktualisiert)
+    gesamt = db.Column(db.Integer, default=0)
+    erstellt = db.Column(db.Integer, default=0)
+    vorhanden = db.Column(db.Integer, default=0)
+    fehler = db.Column(db.Integer, default=0)
+    
+    erstellt_am = db.Column(db.DateTime, default=datetime.utcnow)
+    gestartet_am = db.Column(db.DateTime)
+    beendet_am = db.Column(db.DateTime)
+    
+    items = db.relationship('HintergrundJobItem', backref='job', lazy='dynamic', cascade="all, delete-orphan")
+    
+    @property
+    def verarbeitet(self):
+        return (self.erstellt or 0) + (self.vorhanden or 0) + (self.fehler or 0)
+    
+    @property
+    def prozent(self):
+        return round(self.verarbeitet / self.gesamt * 100, 1) if self.gesamt else 0
+    
+    def __repr__(self):
+        return f'<HintergrundJob {self.id} {self.typ} {self.status}>'
+
+
+class HintergrundJobItem(db.Model):
+    """Einzelner Arbeitsschritt eines Hintergrund-Jobs (z.B. eine Stadt) mit eigenem Status"""
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('hintergrund_job.id'), nullable=False)
+    schluessel = db.Column(db.String(200), nullable=False)  # eindeutig je Job, z.B. "implantologie/muenchen"
+    bezeichnung = db.Column(db.String(200))  # z.B. "Implantologie – München"
+    parameter_json = db.Column(db.Text)  # JSON mit den Parametern für den Job-Handler
+    status = db.Column(db.String(20), default='offen')  # offen, laeuft, erstellt, vorhanden, fehler
+    versuche = db.Column(db.Integer, default=0)
+    fehlermeldung = db.Column(db.Text)
+    aktualisiert_am = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('job_id', 'schluessel', name='unique_job_item'),
+        db.Index('ix_job_item_status', 'job_id', 'status'),
+    )
+    
+    def __repr__(self):
+        return f'<HintergrundJobItem {self.schluessel} {self.status}>'
+
+
+class CsvPraxisStatus(db.Model):
+    """
+    Veränderlicher Zustand einer Zeile aus zahnaerzte.csv (Overlay). Die CSV selbst
+    bleibt unverändert; Übernahmen, E-Mail-/Namensänderungen und Ausblendungen
+    stehen hier, Schlüssel ist der Hash aus Name, PLZ und Straße der CSV-Zeile.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    schluessel = db.Column(db.String(40), unique=True, nullable=False, index=True)
+    beansprucht = db.Column(db.Boolean, default=False)
+    email = db.Column(db.String(120))  # überschreibt die E-Mail aus der CSV
+    name = db.Column(db.String(200))  # überschreibt den Praxisnamen aus der CSV
+    versteckt = db.Column(db.Boolean, default=False)  # Zeile nicht mehr in der Suche anzeigen
+    praxis_id = db.Column(db.Integer, db.ForeignKey('praxis.id'))  # übernehmende Praxis
+    aktualisiert_am = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CsvPraxisStatus {self.schluessel} beansprucht={self.beansprucht}>'
+
+
+class Rechnung(db.Model):
+    """
+    Rechnung zu einer Paketbuchung. Der Eintrag entsteht beim Einplanen
+    (services/rechnung_jobs.plane_rechnung); das PDF schreibt der Hintergrund-Worker
+    hier hinein – Web- und Worker-Service teilen kein Dateisystem.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    rechnungsnummer = db.Column(db.String(30), unique=True, nullable=False, index=True)
+    praxisname = db.Column(db.String(200))
+    email = db.Column(db.String(120), index=True)
+    paket = db.Column(db.String(50))
+    methode = db.Column(db.String(50))
+    pdf = db.Column(db.LargeBinary)  # leer, bis der Worker das PDF erstellt hat
+    inhalts_hash = db.Column(db.String(16))
+    erstellt_am = db.Column(db.DateTime, default=datetime.utcnow)
+    pdf_erstellt_am = db.Column(db.DateTime)
+
+    @property
+    def dateiname(self):
+        return f"rechnung_{self.rechnungsnummer}.pdf"
+
+    def __repr__(self):
+        return f'<Rechnung {self.rechnungsnummer}>'
+
+
+class GeocodeCache(db.Model):
+    """
+    Dauerhafter Cache für Geocoding-Ergebnisse (Google Geocoding API), Schlüssel ist
+    die normalisierte Adresse. Auch "nicht gefunden" wird gespeichert (lat/lng leer),
+    damit dieselbe Adresse nicht erneut abgefragt wird.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    schluessel = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    adresse = db.Column(db.String(300), nullable=False)
+    lat = db.Column(db.Float)
+    lng = db.Column(db.Float)
+    status = db.Column(db.String(30), nullable=False)  # OK, ZERO_RESULTS
+    erstellt_am = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<GeocodeCache {self.adresse} {self.status}>'
@@ -1,33 +1,379 @@
 import os
+import re
+import time
+import random
+import hashlib
 import logging
-from openai import AzureOpenAI
+import threading
+import unicodedata
+from collections import deque
+from utils.ttl_cache import TTLCache
+from utils.prozesse import anzahl_prozesse, anteil_pro_prozess
+from services.prompt_budget import baue_nachrichten
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 AZURE_DEPLOYMENT = os.environ.get("AZURE_OPENAI_DEPLOYMENT", "gpt-4.1-mini")
 
-client = AzureOpenAI(
-    api_key=os.environ.get("AZURE_OPENAI_API_KEY"),
-    azure_endpoint=os.environ.get("AZURE_OPENAI_ENDPOINT", "https://dentalax.openai.azure.com/"),
-    api_version=os.environ.get("AZURE_OPENAI_API_VERSION", "2024-12-01-preview"),
-    timeout=25
+_client = None
+_client_lock = threading.Lock()
+
+
+def hole_client():
+    """
+    Azure-OpenAI-Client, erst beim ersten KI-Aufruf erzeugt.
+
+    Das openai-SDK (inkl. httpx und pydantic) wird damit nicht schon beim
+    Import dieses Moduls geladen.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import AzureOpenAI
+                _client = AzureOpenAI(
+                    api_key=os.environ.get("AZURE_OPENAI_API_KEY"),
+                    azure_endpoint=os.environ.get("AZURE_OPENAI_ENDPOINT", "https://dentalax.openai.azure.com/"),
+                    api_version=os.environ.get("AZURE_OPENAI_API_VERSION", "2024-12-01-preview"),
+                    timeout=25
+                )
+    return _client
+
+
+class KIPausiert(Exception):
+    """Interaktiver Aufruf während einer 429-Pause: der Aufrufer liefert sofort seinen Fallback"""
+
+    def __init__(self, restzeit):
+        super().__init__(f"Azure OpenAI pausiert noch {restzeit:.1f}s (Retry-After)")
+        self.restzeit = restzeit
+
+
+class AIScheduler:
+    """
+    Gemeinsamer Scheduler für alle Azure OpenAI Aufrufe eines Prozesses.
+
+    - Token-Bucket auf Basis des TPM-Kontingents der Deployment (Prompt + max_tokens,
+      so rechnet auch Azure das Kontingent ab)
+    - Adaptive Parallelität (AIMD): +1/n pro erfolgreichem Aufruf, Halbierung bei 429
+    - Bei 429 wird Retry-After respektiert und alle Aufrufe pausieren gemeinsam
+    - Exponentielles Backoff mit Jitter bei Timeouts und 5xx
+    - Latenz und Token-Verbrauch pro Aufruf werden für Metriken gespeichert
+
+    Interaktive Aufrufe (Chatbot, Dashboard-Texte) warten nicht auf einen freien
+    Parallelitäts-Slot und werden höchstens einmal wiederholt, belasten aber den
+    Token-Bucket – Batch-Aufrufe weichen dadurch automatisch aus. Während einer
+    429-Pause warten sie auch nicht auf deren Ende (bis zu 60 s in einem
+    gthread-Thread), sondern scheitern sofort mit KIPausiert.
+    """
+
+    def __init__(self, tpm_limit, max_parallel, min_parallel=1):
+        self.tpm_limit = tpm_limit
+        self.max_parallel = max_parallel
+        self.min_parallel = min_parallel
+        self.parallel_limit = float(max_parallel)
+
+        self._tokens = float(tpm_limit)
+        self._letzte_auffuellung = time.monotonic()
+        self._laufend = 0
+        self._pause_bis = 0.0
+        self._cond = threading.Condition()
+
+        self._aufrufe = deque(maxlen=500)
+        self._summen = {'aufrufe': 0, 'fehler': 0, 'throttles': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+    def _fuelle_auf(self):
+        jetzt = time.monotonic()
+        self._tokens = min(self.tpm_limit, self._tokens + (jetzt - self._letzte_auffuellung) * self.tpm_limit / 60.0)
+        self._letzte_auffuellung = jetzt
+
+    def _reserviere(self, tokens, interaktiv):
+        """
+        Wartet auf Slot und Token-Budget; gibt die tatsächlich reservierten Tokens zurück.
+
+        Raises:
+            KIPausiert: interaktiver Aufruf während einer 429-Pause
+        """
+        tokens = min(tokens, self.tpm_limit)
+        with self._cond:
+            while True:
+                self._fuelle_auf()
+                wartezeit = self._pause_bis - time.monotonic()
+                if wartezeit > 0 and interaktiv:
+                    raise KIPausiert(wartezeit)
+                if wartezeit <= 0:
+                    if interaktiv:
+                        break
+                    slot_frei = self._laufend < max(self.min_parallel, int(self.parallel_limit))
+                    if slot_frei and self._tokens >= tokens:
+                        break
+                    if slot_frei:
+                        wartezeit = (tokens - self._tokens) * 60.0 / self.tpm_limit
+                    else:
+                        wartezeit = 1.0
+                self._cond.wait(timeout=min(max(wartezeit, 0.05), 5.0))
+            self._tokens -= tokens
+            self._laufend += 1
+        return tokens
+
+    def _freigeben(self, reserviert, verbraucht=None, remaining_tokens=None):
+        with self._cond:
+            self._laufend -= 1
+            if verbraucht is not None:
+                # Schätzung (Zeichen/3) durch Azures Abrechnung (Prompt-Tokens + max_tokens) ersetzen
+                self._tokens = min(self.tpm_limit, self._tokens + reserviert - verbraucht)
+            if remaining_tokens is not None:
+                self._tokens = min(self._tokens, float(remaining_tokens))
+            self._cond.notify_all()
+
+    def _erfolg(self):
+        with self._cond:
+            self.parallel_limit = min(self.max_parallel, self.parallel_limit + 1.0 / max(self.parallel_limit, 1.0))
+
+    def _throttle(self, retry_after):
+        with self._cond:
+            self._summen['throttles'] += 1
+            self.parallel_limit = max(float(self.min_parallel), self.parallel_limit / 2)
+            self._pause_bis = max(self._pause_bis, time.monotonic() + retry_after)
+            self._tokens = min(self._tokens, 0.0)
+            self._cond.notify_all()
+
+    @staticmethod
+    def _retry_after(exc):
+        response = getattr(exc, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        try:
+            if headers.get('retry-after-ms'):
+                return float(headers['retry-after-ms']) / 1000.0
+            if headers.get('retry-after'):
+                return float(headers['retry-after'])
+        except (TypeError, ValueError):
+            pass
+        return None
+
+    def _protokolliere(self, label, start, versuche, status, usage=None):
+        latenz_ms = int((time.monotonic() - start) * 1000)
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        with self._cond:
+            self._summen['aufrufe'] += 1
+            if status != 'ok':
+                self._summen['fehler'] += 1
+            self._summen['prompt_tokens'] += prompt_tokens
+            self._summen['completion_tokens'] += completion_tokens
+            self._aufrufe.append({
+                'label': label, 'status': status, 'latenz_ms': latenz_ms, 'versuche': versuche,
+                'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+            })
+        logger.debug(f"KI-Aufruf {label}: {status} in {latenz_ms} ms, {versuche} Versuch(e), {prompt_tokens}+{completion_tokens} Tokens")
+
+    def chat_completion(self, messages, max_tokens, temperature, label='chat', interaktiv=False, max_versuche=None):
+        """
+        Führt einen Chat-Completion-Aufruf über den Scheduler aus.
+
+        Args:
+            messages: Nachrichten für die API
+            max_tokens: Maximale Antwortlänge
+            temperature: Sampling-Temperatur
+            label: Bezeichnung für Metriken/Logs
+            interaktiv: True für Nutzeranfragen (kein Warten auf Slots, max. 2 Versuche)
+            max_versuche: Überschreibt die Anzahl Versuche
+
+        Returns:
+            ChatCompletion-Response der OpenAI-SDK
+        """
+        from openai import RateLimitError, APITimeoutError, APIConnectionError, APIStatusError
+
+        if max_versuche is None:
+            max_versuche = 2 if interaktiv else 6
+        prompt_zeichen = sum(len(m.get('content') or '') for m in messages)
+        geschaetzt = prompt_zeichen // 3 + max_tokens
+
+        start = time.monotonic()
+        letzter_fehler = None
+        for versuch in range(1, max_versuche + 1):
+            try:
+                reserviert = self._reserviere(geschaetzt, interaktiv)
+            except KIPausiert:
+                self._protokolliere(label, start, versuch, 'pausiert')
+                raise
+            try:
+                raw = hole_client().with_options(max_retries=0).chat.completions.with_raw_response.create(
+                    model=AZURE_DEPLOYMENT,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature
+                )
+                response = raw.parse()
+            except RateLimitError as e:
+                self._freigeben(reserviert)
+                letzter_fehler = e
+                wartezeit = self._retry_after(e) or min(60.0, 2 ** versuch)
+                self._throttle(wartezeit)
+                logger.warning(f"KI-Aufruf {label}: 429, pausiere {wartezeit:.1f}s (Parallelität {self.parallel_limit:.1f})")
+                continue
+            except (APITimeoutError, APIConnectionError) as e:
+                self._freigeben(reserviert)
+                letzter_fehler = e
+            except APIStatusError as e:
+                self._freigeben(reserviert)
+                letzter_fehler = e
+                if e.status_code < 500:
+                    break
+            else:
+                usage = getattr(response, 'usage', None)
+                verbraucht = (usage.prompt_tokens or 0) + max_tokens if usage else None
+                remaining = raw.headers.get('x-ratelimit-remaining-tokens')
+                self._freigeben(reserviert, verbraucht, remaining)
+                self._erfolg()
+                self._protokolliere(label, start, versuch, 'ok', usage)
+                return response
+
+            if versuch < max_versuche:
+                # Full Jitter: zufällige Wartezeit zwischen 0 und dem exponentiellen Backoff
+                time.sleep(random.uniform(0, min(30.0, 2 ** versuch)))
+
+        self._protokolliere(label, start, max_versuche, type(letzter_fehler).__name__)
+        raise letzter_fehler
+
+    def chat_completion_stream(self, messages, max_tokens, temperature, label='chat_stream', max_dauer=60, status=None):
+        """
+        Gestreamter Chat-Completion-Aufruf (immer interaktiv).
+
+        Ein 429 vor dem ersten Token wird einmal nach Retry-After wiederholt;
+        nach dem ersten Token wird nicht mehr wiederholt.
+
+        Args:
+            max_dauer: Obergrenze in Sekunden für die gesamte Generierung
+            status: optionales Dict; erhält 'abgebrochen' = True, wenn die Antwort
+                unvollständig ist (max_dauer erreicht oder max_tokens ausgeschöpft)
+
+        Yields:
+            Text-Fragmente in der Reihenfolge der Generierung
+        """
+        from openai import RateLimitError
+
+        prompt_zeichen = sum(len(m.get('content') or '') for m in messages)
+        geschaetzt = prompt_zeichen // 3 + max_tokens
+        start = time.monotonic()
+
+        for versuch in (1, 2):
+            try:
+                reserviert = self._reserviere(geschaetzt, interaktiv=True)
+            except KIPausiert:
+                self._protokolliere(label, start, versuch, 'pausiert')
+                raise
+            usage = None
+            try:
+                stream = hole_client().with_options(max_retries=0).chat.completions.create(
+                    model=AZURE_DEPLOYMENT,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+            except RateLimitError as e:
+                self._freigeben(reserviert)
+                wartezeit = self._retry_after(e) or 2.0
+                self._throttle(wartezeit)
+                if versuch == 2 or wartezeit > 10:
+                    self._protokolliere(label, start, versuch, type(e).__name__)
+                    raise
+                time.sleep(wartezeit)
+                continue
+            except Exception as e:
+                self._freigeben(reserviert)
+                self._protokolliere(label, start, versuch, type(e).__name__)
+                raise
+
+            try:
+                for chunk in stream:
+                    if getattr(chunk, 'usage', None):
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].finish_reason == 'length' and status is not None:
+                        status['abgebrochen'] = True
+                    if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                    if time.monotonic() - start > max_dauer:
+                        logger.warning(f"KI-Stream {label}: nach {max_dauer}s abgebrochen")
+                        if status is not None:
+                            status['abgebrochen'] = True
+                        break
+            except Exception as e:
+                self._protokolliere(label, start, versuch, type(e).__name__)
+                raise
+            finally:
+                stream.close()
+                verbraucht = (usage.prompt_tokens or 0) + max_tokens if usage else None
+                self._freigeben(reserviert, verbraucht)
+            self._erfolg()
+            self._protokolliere(label, start, versuch, 'ok', usage)
+            return
+
+    def metriken(self):
+        """Zusammenfassung der letzten Aufrufe (Latenz, Tokens, Throttling)"""
+        with self._cond:
+            aufrufe = list(self._aufrufe)
+            summen = dict(self._summen)
+            parallel = round(self.parallel_limit, 2)
+            tokens_verfuegbar = int(self._tokens)
+        latenzen = sorted(a['latenz_ms'] for a in aufrufe if a['status'] == 'ok')
+        return {
+            **summen,
+            'parallel_limit': parallel,
+            'tokens_verfuegbar': tokens_verfuegbar,
+            'tpm_limit': self.tpm_limit,
+            'prozesse': anzahl_prozesse(),
+            'latenz_ms_median': latenzen[len(latenzen) // 2] if latenzen else None,
+            'latenz_ms_p95': latenzen[int(len(latenzen) * 0.95)] if latenzen else None,
+            'letzte_aufrufe': aufrufe[-20:],
+        }
+
+
+# AZURE_OPENAI_TPM und AZURE_OPENAI_MAX_PARALLEL sind das Budget des ganzen Services
+# (render.yaml teilt das Kontingent zwischen Web und Worker auf); jeder gunicorn-Worker
+# bekommt seinen Anteil, damit N Prozesse zusammen nicht das N-fache zulassen
+scheduler = AIScheduler(
+    tpm_limit=anteil_pro_prozess(os.environ.get("AZURE_OPENAI_TPM", 100000)),
+    max_parallel=anteil_pro_prozess(os.environ.get("AZURE_OPENAI_MAX_PARALLEL", 8))
 )
 
-def get_dental_match_response(user_message: str, praxen_data: list, conversation_history: list = None) -> str:
+DENTAL_MATCH_FALLBACK = "Entschuldigung, ich habe gerade technische Schwierigkeiten. Bitte versuchen Sie es in einem Moment erneut oder nutzen Sie unsere Suchfunktion auf der Startseite."
+
+# Antwort-Cache für den Chatbot; Einträge sind an die Praxis-Snapshot-Version gebunden
+dental_match_cache = TTLCache(
+    max_eintraege=int(os.environ.get("CHAT_CACHE_MAX", 500)),
+    ttl_sekunden=int(os.environ.get("CHAT_CACHE_TTL", 6 * 3600))
+)
+
+
+def _normalisiere_nachricht(text):
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+
+def dental_match_cache_key(user_message, location, filters, conversation_history=None):
     """
-    Generiert eine KI-Antwort für den Dental Match Chatbot.
-    
-    Args:
-        user_message: Die Nachricht des Nutzers
-        praxen_data: Liste von Praxis-Dictionaries mit relevanten Informationen
-        conversation_history: Bisherige Konversation als Liste von {"role": "user/assistant", "content": "..."}
-    
-    Returns:
-        Die Antwort des Chatbots als String
+    Cache-Key aus normalisierter Nachricht, aufgelöstem Standort, aktiven Filtern
+    und (normalisiertem) Gesprächsverlauf.
     """
-    
-    system_prompt = """Du bist der Dentalberater von Dentalax, ein freundlicher und kompetenter KI-Zahnarztberater.
+    aktive_filter = ','.join(sorted(k for k, v in (filters or {}).items() if v))
+    verlauf = '|'.join(
+        f"{m.get('role')}:{_normalisiere_nachricht(m.get('content', ''))}"
+        for m in (conversation_history or [])
+    )
+    roh = '\n'.join([
+        _normalisiere_nachricht(user_message),
+        (location or '').strip().lower(),
+        aktive_filter,
+        verlauf,
+    ])
+    return hashlib.sha256(roh.encode('utf-8')).hexdigest()
+
+
+DENTAL_MATCH_SYSTEM_PROMPT = """Du bist der Dentalberater von Dentalax, ein freundlicher und kompetenter KI-Zahnarztberater.
 Deine Aufgabe ist es, Patienten bei zahnmedizinischen Fragen zu helfen und sie mit passenden Zahnarztpraxen zu verbinden.
 
 DEINE FÄHIGKEITEN:
@@ -72,11 +418,9 @@ Hebe diese besonders hervor. Wenn Google-Bewertungen (google_rating, google_revi
 Wenn interne Bewertungsdaten vorhanden sind (bewertung_avg, bewertung_anzahl), erwähne auch diese.
 Verwende NUR die Daten, die dir in der aktuellen Nachricht übergeben werden - niemals eigene Informationen ergänzen."""
 
-    messages = [{"role": "system", "content": system_prompt}]
-    
-    if conversation_history:
-        messages.extend(conversation_history)
-    
+
+def _dental_match_messages(user_message: str, praxen_data: list, conversation_history: list = None) -> list:
+    """Baut die Nachrichtenliste (fester System-Prompt, gekürzter Verlauf, Nutzernachricht + Praxen) für den Chatbot"""
     praxen_info = ""
     if praxen_data:
         praxen_info = "\n\nVerfügbare Praxen in der Nähe:\n"
@@ -108,43 +452,64 @@ Verwende NUR die Daten, die dir in der aktuellen Nachricht übergeben werden - n
     else:
         user_content += "\n\n[SYSTEM-HINWEIS: Es wurden KEINE Praxen für diese Anfrage gefunden. Nenne dem Patienten KEINE Praxis-Details. Erfinde KEINE Adressen, Telefonnummern oder Webseiten.]"
     
-    messages.append({"role": "user", "content": user_content})
+    return baue_nachrichten(DENTAL_MATCH_SYSTEM_PROMPT, user_content, conversation_history)
+
+
+def get_dental_match_response(user_message: str, praxen_data: list, conversation_history: list = None) -> str:
+    """
+    Generiert eine KI-Antwort für den Dental Match Chatbot.
+    
+    Args:
+        user_message: Die Nachricht des Nutzers
+        praxen_data: Liste von Praxis-Dictionaries mit relevanten Informationen
+        conversation_history: Bisherige Konversation als Liste von {"role": "user/assistant", "content": "..."}
+    
+    Returns:
+        Die Antwort des Chatbots als String
+    """
+    messages = _dental_match_messages(user_message, praxen_data, conversation_history)
     
     try:
-        response = client.chat.completions.create(
-            model=AZURE_DEPLOYMENT,
-            messages=messages,
-            max_tokens=800,
-            temperature=0.3
-        )
+        response = scheduler.chat_completion(messages, max_tokens=800, temperature=0.3, label='dental_match', interaktiv=True)
         return response.choices[0].message.content
     except Exception as e:
         logger.error(f"Azure OpenAI API Fehler: {e}")
-        return "Entschuldigung, ich habe gerade technische Schwierigkeiten. Bitte versuchen Sie es in einem Moment erneut oder nutzen Sie unsere Suchfunktion auf der Startseite."
+        return DENTAL_MATCH_FALLBACK
 
 
-def generate_praxis_text(text_type: str, praxis_data: dict, additional_info: str = "") -> str:
+def stream_dental_match_response(user_message: str, praxen_data: list, conversation_history: list = None, status: dict = None):
     """
-    Generiert Texte für die Praxis-Landingpage (Über uns, Team-Beschreibungen, etc.)
+    Streaming-Variante von get_dental_match_response.
     
     Args:
-        text_type: Art des Textes - "ueber_uns", "team_mitglied", "bewertung_antwort", "hero"
-        praxis_data: Dictionary mit Praxis-Informationen
-        additional_info: Zusätzliche Informationen (z.B. Mitarbeitername, Bewertungstext)
+        status: optionales Dict; 'abgebrochen' = True, wenn die Antwort
+            unvollständig ist (siehe AIScheduler.chat_completion_stream)
     
-    Returns:
-        Der generierte Text
+    Yields:
+        Text-Fragmente der Antwort; bei einem Fehler vor dem ersten Fragment
+        stattdessen die Fallback-Antwort
     """
+    messages = _dental_match_messages(user_message, praxen_data, conversation_history)
     
-    prompts = {
-        "ueber_uns": f"""Schreibe einen professionellen, einladenden Willkommenstext für eine Zahnarztpraxis.
+    gesendet = False
+    try:
+        for teil in scheduler.chat_completion_stream(messages, max_tokens=800, temperature=0.3, label='dental_match_stream', status=status):
+            gesendet = True
+            yield teil
+    except Exception as e:
+        logger.error(f"Azure OpenAI API Fehler (Stream): {e}")
+        if not gesendet:
+            yield DENTAL_MATCH_FALLBACK
+        else:
+            raise
 
-Praxis-Informationen:
-- Name: {praxis_data.get('name', 'Zahnarztpraxis')}
-- Stadt: {praxis_data.get('stadt', '')}
-- Leistungen: {praxis_data.get('leistungsschwerpunkte', 'Allgemeine Zahnheilkunde')}
 
-Zusätzliche Infos vom Zahnarzt: {additional_info if additional_info else 'Keine weiteren Angaben'}
+PRAXIS_TEXT_SYSTEM_PROMPT = "Du bist ein professioneller Texter für Zahnarztpraxen in Deutschland. Schreibe authentische, einladende Texte ohne Übertreibungen."
+
+# Feste Arbeitsanweisungen je Texttyp (Teil des System-Prompts, damit der Präfix gecacht werden kann);
+# die Praxisdaten folgen in der Nutzernachricht
+PRAXIS_TEXT_AUFGABEN = {
+    "ueber_uns": """Schreibe einen professionellen, einladenden Willkommenstext für eine Zahnarztpraxis anhand der Praxis-Informationen in der Nachricht.
 
 WICHTIG - Der Text soll:
 - KEINE Überschrift enthalten (kein "Über uns", kein "Willkommen", keine Markdown-Formatierung wie ** oder ##)
@@ -157,10 +522,7 @@ WICHTIG - Der Text soll:
 - Professionell aber warmherzig formuliert sein
 - Nur reinen Fließtext liefern, ohne jegliche Formatierung""",
 
-        "team_mitglied": f"""Schreibe eine kurze, sympathische Beschreibung für ein Teammitglied einer Zahnarztpraxis.
-
-Name: {additional_info if additional_info else 'Teammitglied'}
-Praxis: {praxis_data.get('name', 'Zahnarztpraxis')}
+    "team_mitglied": """Schreibe eine kurze, sympathische Beschreibung für das in der Nachricht genannte Teammitglied einer Zahnarztpraxis.
 
 Die Beschreibung soll:
 - 2-3 Sätze lang sein (ca. 40-60 Wörter)
@@ -168,10 +530,7 @@ Die Beschreibung soll:
 - Allgemein gehalten sein (keine erfundenen Qualifikationen)
 - Das Engagement für Patienten betonen""",
 
-        "bewertung_antwort": f"""Schreibe eine professionelle Antwort auf eine Patientenbewertung.
-
-Praxis: {praxis_data.get('name', 'Zahnarztpraxis')}
-Bewertungstext: {additional_info}
+    "bewertung_antwort": """Schreibe eine professionelle Antwort auf die Patientenbewertung in der Nachricht.
 
 Die Antwort soll:
 - Höflich und dankbar sein
@@ -180,103 +539,89 @@ Die Antwort soll:
 - Bei kritischer Bewertung: Verständnis zeigen, sich entschuldigen und Besserung versprechen
 - Mit "Ihr Praxisteam" enden""",
 
-        "hero": f"""Schreibe einen kurzen, einprägsamen Untertitel für die Startseite einer Zahnarztpraxis.
-
-Praxis: {praxis_data.get('name', 'Zahnarztpraxis')}
-Stadt: {praxis_data.get('stadt', '')}
+    "hero": """Schreibe einen kurzen, einprägsamen Untertitel für die Startseite der Zahnarztpraxis in der Nachricht.
 
 Der Text soll:
 - Maximal 15 Wörter
 - Einladend und vertrauensbildend sein
-- Die Patientenorientierung betonen"""
-    }
-    
-    prompt = prompts.get(text_type)
-    if not prompt:
-        return "Unbekannter Texttyp"
-    
-    try:
-        response = client.chat.completions.create(
-            model=AZURE_DEPLOYMENT,
-            messages=[
-                {"role": "system", "content": "Du bist ein professioneller Texter für Zahnarztpraxen in Deutschland. Schreibe authentische, einladende Texte ohne Übertreibungen."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=400,
-            temperature=0.7
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        logger.error(f"Azure OpenAI API Fehler bei Textgenerierung: {e}")
-        return "Textgenerierung fehlgeschlagen. Bitte versuchen Sie es erneut."
+- Die Patientenorientierung betonen""",
+}
 
 
-def generate_stellenangebot_text(field_type: str, position: str, anstellungsart: str, praxis_data: dict, existing_fields: dict = None) -> str:
+def generate_praxis_text(text_type: str, praxis_data: dict, additional_info: str = "") -> str:
     """
-    Generiert Texte für Stellenangebote basierend auf Position und Praxisdaten.
+    Generiert Texte für die Praxis-Landingpage (Über uns, Team-Beschreibungen, etc.)
     
     Args:
-        field_type: "ueber_uns", "aufgaben", "anforderungen", "wir_bieten", "tags"
-        position: Position (z.B. "zfa", "zahnarzt", "zmp")
-        anstellungsart: Anstellungsart (z.B. "vollzeit", "teilzeit")
-        praxis_data: Dictionary mit Praxis-Informationen (name, stadt, beschreibung, leistungsschwerpunkte)
-        existing_fields: Bereits ausgefüllte Felder als Dictionary
+        text_type: Art des Textes - "ueber_uns", "team_mitglied", "bewertung_antwort", "hero"
+        praxis_data: Dictionary mit Praxis-Informationen
+        additional_info: Zusätzliche Informationen (z.B. Mitarbeitername, Bewertungstext)
     
     Returns:
         Der generierte Text
     """
-    if existing_fields is None:
-        existing_fields = {}
-    
-    position_namen = {
-        'zfa': 'Zahnmedizinische/r Fachangestellte/r (ZFA)',
-        'zmf': 'Zahnmedizinische Fachassistentin (ZMF)',
-        'zmv': 'Zahnmedizinische Verwaltungsassistentin (ZMV)',
-        'zmp': 'Zahnmedizinische Prophylaxeassistentin (ZMP)',
-        'dh': 'Dentalhygieniker/in (DH)',
-        'prophylaxe': 'Prophylaxe-Assistent/in',
-        'zahnarzt': 'Zahnarzt/Zahnärztin',
-        'kfo': 'Kieferorthopäde/in',
-        'oralchirurg': 'Oralchirurg/in / MKG-Chirurg/in',
-        'implantologe': 'Implantologe/in',
-        'endodontologe': 'Endodontologe/in',
-        'parodontologe': 'Parodontologe/in',
-        'zahntechniker': 'Zahntechniker/in',
-        'praxismanager': 'Praxismanager/in',
-        'rezeption': 'Rezeption / Empfang',
-        'abrechnung': 'Abrechnungskraft',
-        'verwaltung': 'Verwaltungskraft',
-        'azubi': 'Auszubildende/r zur ZFA',
-        'sonstige': 'Mitarbeiter/in'
-    }
     
-    position_display = position_namen.get(position, position)
+    aufgabe = PRAXIS_TEXT_AUFGABEN.get(text_type)
+    if not aufgabe:
+        return "Unbekannter Texttyp"
     
     praxis_name = praxis_data.get('name', 'Zahnarztpraxis')
-    praxis_stadt = praxis_data.get('stadt', '')
-    praxis_beschreibung = praxis_data.get('beschreibung', '')
-    praxis_leistungen = praxis_data.get('leistungsschwerpunkte', '')
-    
-    context = f"""Position: {position_display}
-Anstellungsart: {anstellungsart}
-Praxis: {praxis_name}
-Stadt: {praxis_stadt}
-Leistungsschwerpunkte: {praxis_leistungen}"""
-    
-    if praxis_beschreibung:
-        context += f"\nPraxisbeschreibung (von der Landingpage): {praxis_beschreibung}"
-    
-    already_filled = ""
-    for key, val in existing_fields.items():
-        if val and val.strip():
-            already_filled += f"\n{key}: {val}"
-    if already_filled:
-        context += f"\n\nBereits ausgefüllte Felder:{already_filled}"
+    daten = {
+        "ueber_uns": f"""Praxis-Informationen:
+- Name: {praxis_name}
+- Stadt: {praxis_data.get('stadt', '')}
+- Leistungen: {praxis_data.get('leistungsschwerpunkte', 'Allgemeine Zahnheilkunde')}
+
+Zusätzliche Infos vom Zahnarzt: {additional_info if additional_info else 'Keine weiteren Angaben'}""",
+        "team_mitglied": f"""Name: {additional_info if additional_info else 'Teammitglied'}
+Praxis: {praxis_name}""",
+        "bewertung_antwort": f"""Praxis: {praxis_name}
+Bewertungstext: {additional_info}""",
+        "hero": f"""Praxis: {praxis_name}
+Stadt: {praxis_data.get('stadt', '')}""",
+    }[text_type]
     
-    prompts = {
-        "ueber_uns": f"""{context}
+    try:
+        response = scheduler.chat_completion(
+            baue_nachrichten(PRAXIS_TEXT_SYSTEM_PROMPT + "\n\n" + aufgabe, daten),
+            max_tokens=400,
+            temperature=0.7,
+            label='praxis_text',
+            interaktiv=True
+        )
+        return response.choices[0].message.content
+    except Exception as e:
+        logger.error(f"Azure OpenAI API Fehler bei Textgenerierung: {e}")
+        return "Textgenerierung fehlgeschlagen. Bitte versuchen Sie es erneut."
+
 
-Schreibe einen kurzen, attraktiven "Über uns"-Text für dieses Stellenangebot.
+STELLENANGEBOT_SYSTEM_PROMPT = "Du bist ein erfahrener HR-Texter für Zahnarztpraxen in Deutschland. Schreibe professionelle, attraktive Stellenangebote, die qualifizierte Bewerber ansprechen. Formuliere jeden Text individuell und einzigartig - nicht generisch. Antworte NUR mit dem angefragten Text, ohne Überschriften, Labels oder Erklärungen."
+
+STELLEN_POSITION_NAMEN = {
+    'zfa': 'Zahnmedizinische/r Fachangestellte/r (ZFA)',
+    'zmf': 'Zahnmedizinische Fachassistentin (ZMF)',
+    'zmv': 'Zahnmedizinische Verwaltungsassistentin (ZMV)',
+    'zmp': 'Zahnmedizinische Prophylaxeassistentin (ZMP)',
+    'dh': 'Dentalhygieniker/in (DH)',
+    'prophylaxe': 'Prophylaxe-Assistent/in',
+    'zahnarzt': 'Zahnarzt/Zahnärztin',
+    'kfo': 'Kieferorthopäde/in',
+    'oralchirurg': 'Oralchirurg/in / MKG-Chirurg/in',
+    'implantologe': 'Implantologe/in',
+    'endodontologe': 'Endodontologe/in',
+    'parodontologe': 'Parodontologe/in',
+    'zahntechniker': 'Zahntechniker/in',
+    'praxismanager': 'Praxismanager/in',
+    'rezeption': 'Rezeption / Empfang',
+    'abrechnung': 'Abrechnungskraft',
+    'verwaltung': 'Verwaltungskraft',
+    'azubi': 'Auszubildende/r zur ZFA',
+    'sonstige': 'Mitarbeiter/in'
+}
+
+# Feste Arbeitsanweisungen je Feld (Teil des System-Prompts); Position und Praxisdaten folgen in der Nutzernachricht
+STELLENANGEBOT_AUFGABEN = {
+    "ueber_uns": """Schreibe einen kurzen, attraktiven "Über uns"-Text für dieses Stellenangebot.
 Basiere dich auf der Praxisbeschreibung von der Landingpage (falls vorhanden) und optimiere den Text für den Jobmarkt.
 
 Der Text soll:
@@ -287,9 +632,7 @@ Der Text soll:
 - Wenn Praxisbeschreibung vorhanden: diese als Grundlage nehmen und für Bewerber optimieren
 - NUR den Text ausgeben, keine Überschriften oder Labels""",
 
-        "aufgaben": f"""{context}
-
-Erstelle eine Bulletpoint-Liste typischer Aufgaben für die Position {position_display}.
+    "aufgaben": """Erstelle eine Bulletpoint-Liste typischer Aufgaben für die in der Nachricht genannte Position.
 
 Die Liste soll:
 - 5-8 konkrete Aufgabenpunkte enthalten
@@ -304,9 +647,7 @@ Beispielformat:
 • Professionelle Zahnreinigung durchführen
 • Patienten über Mundhygiene beraten""",
 
-        "anforderungen": f"""{context}
-
-Erstelle eine Bulletpoint-Liste von Anforderungen/Qualifikationen für die Position {position_display}.
+    "anforderungen": """Erstelle eine Bulletpoint-Liste von Anforderungen/Qualifikationen für die in der Nachricht genannte Position.
 
 Die Liste soll:
 - 5-7 Anforderungspunkte enthalten
@@ -321,9 +662,7 @@ Beispielformat:
 • Abgeschlossene Ausbildung als ZFA
 • Freundliches und einfühlsames Auftreten""",
 
-        "wir_bieten": f"""{context}
-
-Erstelle eine Bulletpoint-Liste von Benefits/Vorteilen, die die Praxis Bewerbern bietet.
+    "wir_bieten": """Erstelle eine Bulletpoint-Liste von Benefits/Vorteilen, die die Praxis Bewerbern bietet.
 
 Die Liste soll:
 - 5-8 attraktive Benefits enthalten
@@ -338,9 +677,7 @@ Beispielformat:
 • Überdurchschnittliche Vergütung
 • Regelmäßige Fort- und Weiterbildungen""",
 
-        "tags": f"""{context}
-
-Erstelle 5-8 relevante Tags/Schlagwörter für dieses Stellenangebot, kommasepariert.
+    "tags": """Erstelle 5-8 relevante Tags/Schlagwörter für dieses Stellenangebot, kommasepariert.
 
 Die Tags sollen:
 - Relevant für die Position und Praxis sein
@@ -349,21 +686,60 @@ Die Tags sollen:
 - Mix aus Position, Fachgebiet, Benefits und Arbeitsmodell
 - Kommasepariert in einer Zeile, OHNE # oder sonstige Zeichen
 - Beispiel: Prophylaxe, Moderne Praxis, Fortbildung, Teamarbeit, Work-Life-Balance"""
-    }
+}
+
+
+def generate_stellenangebot_text(field_type: str, position: str, anstellungsart: str, praxis_data: dict, existing_fields: dict = None) -> str:
+    """
+    Generiert Texte für Stellenangebote basierend auf Position und Praxisdaten.
+    
+    Args:
+        field_type: "ueber_uns", "aufgaben", "anforderungen", "wir_bieten", "tags"
+        position: Position (z.B. "zfa", "zahnarzt", "zmp")
+        anstellungsart: Anstellungsart (z.B. "vollzeit", "teilzeit")
+        praxis_data: Dictionary mit Praxis-Informationen (name, stadt, beschreibung, leistungsschwerpunkte)
+        existing_fields: Bereits ausgefüllte Felder als Dictionary
     
-    prompt = prompts.get(field_type)
-    if not prompt:
+    Returns:
+        Der generierte Text
+    """
+    if existing_fields is None:
+        existing_fields = {}
+    
+    position_display = STELLEN_POSITION_NAMEN.get(position, position)
+    
+    praxis_name = praxis_data.get('name', 'Zahnarztpraxis')
+    praxis_stadt = praxis_data.get('stadt', '')
+    praxis_beschreibung = praxis_data.get('beschreibung', '')
+    praxis_leistungen = praxis_data.get('leistungsschwerpunkte', '')
+    
+    context = f"""Position: {position_display}
+Anstellungsart: {anstellungsart}
+Praxis: {praxis_name}
+Stadt: {praxis_stadt}
+Leistungsschwerpunkte: {praxis_leistungen}"""
+    
+    if praxis_beschreibung:
+        context += f"\nPraxisbeschreibung (von der Landingpage): {praxis_beschreibung}"
+    
+    already_filled = ""
+    for key, val in existing_fields.items():
+        if val and val.strip():
+            already_filled += f"\n{key}: {val}"
+    if already_filled:
+        context += f"\n\nBereits ausgefüllte Felder:{already_filled}"
+    
+    aufgabe = STELLENANGEBOT_AUFGABEN.get(field_type)
+    if not aufgabe:
         return "Unbekannter Feldtyp"
     
     try:
-        response = client.chat.completions.create(
-            model=AZURE_DEPLOYMENT,
-            messages=[
-                {"role": "system", "content": "Du bist ein erfahrener HR-Texter für Zahnarztpraxen in Deutschland. Schreibe professionelle, attraktive Stellenangebote, die qualifizierte Bewerber ansprechen. Formuliere jeden Text individuell und einzigartig - nicht generisch. Antworte NUR mit dem angefragten Text, ohne Überschriften, Labels oder Erklärungen."},
-                {"role": "user", "content": prompt}
-            ],
+        response = scheduler.chat_completion(
+            baue_nachrichten(STELLENANGEBOT_SYSTEM_PROMPT + "\n\n" + aufgabe, context),
             max_tokens=600,
-            temperature=0.8
+            temperature=0.8,
+            label='stellenangebot_text',
+            interaktiv=True
         )
         result = response.choices[0].message.content.strip()
         lines = result.split('\n')
@@ -390,12 +766,13 @@ Die Tags sollen:
         return "Textgenerierung fehlgeschlagen. Bitte versuchen Sie es erneut."
 
 
-def generate_city_seo_texts(stadt_name: str) -> dict:
+def generate_city_seo_texts(stadt_name: str, fallback: bool = True) -> dict:
     """
     Generiert SEO-Texte für eine Stadtseite.
     
     Args:
         stadt_name: Name der Stadt (z.B. "München")
+        fallback: Bei Fehlern Standardtexte liefern statt die Exception weiterzugeben
     
     Returns:
         Dictionary mit allen SEO-Feldern inkl. FAQ und Meta-Tags
@@ -449,14 +826,14 @@ Erstelle:
 Antworte NUR mit dem JSON-Objekt, ohne Markdown-Backticks."""
 
     try:
-        response = client.chat.completions.create(
-            model=AZURE_DEPLOYMENT,
-            messages=[
+        response = scheduler.chat_completion(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             max_tokens=2000,
-            temperature=0.8
+            temperature=0.8,
+            label='stadt_seo'
         )
         
         import json
@@ -470,6 +847,8 @@ Antworte NUR mit dem JSON-Objekt, ohne Markdown-Backticks."""
         return json.loads(result_text)
     except Exception as e:
         logger.error(f"Azure OpenAI API Fehler bei SEO-Generierung für {stadt_name}: {e}")
+        if not fallback:
+            raise
         return {
             "meta_title": f"Zahnarzt {stadt_name} | Top Zahnärzte finden - Dentalax",
             "meta_description": f"Finden Sie Ihren Zahnarzt in {stadt_name}. Vergleichen Sie Bewertungen, Leistungen und Öffnungszeiten der besten Zahnarztpraxen.",
@@ -488,7 +867,7 @@ Antworte NUR mit dem JSON-Objekt, ohne Markdown-Backticks."""
         }
 
 
-def generate_leistung_stadt_seo_texts(leistung_name: str, leistung_slug: str, stadt_name: str) -> dict:
+def generate_leistung_stadt_seo_texts(leistung_name: str, leistung_slug: str, stadt_name: str, fallback: bool = True) -> dict:
     """
     Generiert SEO-Texte für eine Leistung+Stadt-Kombinationsseite.
     
@@ -496,6 +875,7 @@ def generate_leistung_stadt_seo_texts(leistung_name: str, leistung_slug: str, st
         leistung_name: Name der Leistung (z.B. "Implantologie")
         leistung_slug: Slug der Leistung (z.B. "implantologie")
         stadt_name: Name der Stadt (z.B. "München")
+        fallback: Bei Fehlern Standardtexte liefern statt die Exception weiterzugeben
     
     Returns:
         Dictionary mit allen SEO-Feldern inkl. FAQ und Meta-Tags
@@ -575,14 +955,14 @@ Erstelle:
 Antworte NUR mit dem JSON-Objekt, ohne Markdown-Backticks."""
 
     try:
-        response = client.chat.completions.create(
-            model=AZURE_DEPLOYMENT,
-            messages=[
+        response = scheduler.chat_completion(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             max_tokens=2000,
-            temperature=0.8
+            temperature=0.8,
+            label='leistung_stadt_seo'
         )
         
         import json
@@ -596,6 +976,8 @@ Antworte NUR mit dem JSON-Objekt, ohne Markdown-Backticks."""
         return json.loads(result_text)
     except Exception as e:
         logger.error(f"Azure OpenAI API Fehler bei Leistung-SEO-Generierung für {leistung_name} {stadt_name}: {e}")
+        if not fallback:
+            raise
         return {
             "meta_title": f"{leistung_name} {stadt_name} | Spezialisten finden - Dentalax",
             "meta_description": f"Finden Sie Spezialisten für {leistung_name} in {stadt_name}. Vergleichen Sie Bewertungen, Leistungen und Öffnungszeiten.",
@@ -0,0 +1,163 @@
+"""
+Referenzzählung und Aufräumen der Bildablage (static/uploads/praxis).
+
+Bilder werden inhaltsadressiert gespeichert (image_utils.optimize_and_save) und
+können daher von mehreren Praxen oder Teammitgliedern gleichzeitig genutzt werden.
+Statt beim Ersetzen direkt zu löschen, zählt der Sweeper regelmäßig die Referenzen
+aus PraxisBild.pfad und TeamMitglied.bild_pfad und entfernt Dateien (Original,
+Varianten, Manifest), die nicht mehr referenziert und älter als die Karenzzeit sind.
+"""
+import os
+import time
+import logging
+import threading
+from collections import Counter, defaultdict
+from sqlalchemy import func
+from models import PraxisBild, TeamMitglied
+from database import db
+from image_utils import UPLOAD_FOLDER, UPLOAD_URL, _manifest_cache
+
+logger = logging.getLogger(__name__)
+
+# Frisch hochgeladene Dateien sind bis zum Commit der Route noch nicht referenziert
+KARENZ_SEK = int(os.environ.get('BILD_SWEEPER_KARENZ_STD', 24)) * 3600
+SWEEPER_INTERVALL_SEK = int(os.environ.get('BILD_SWEEPER_INTERVALL_STD', 6)) * 3600
+SWEEPER_START_VERZOEGERUNG_SEK = 600
+SPERR_DATEI = '.sweeper.lock'
+
+_sweeper_thread = None
+_sperr_datei = None
+
+
+def _stamm(relativ):
+    """Gemeinsamer Schlüssel für Original, Varianten (-480w.webp), Manifest und Temp-Dateien"""
+    ordner, name = os.path.split(relativ)
+    basis = name.split('.', 1)[0]
+    teile = basis.rsplit('-', 1)
+    if len(teile) == 2 and teile[1].endswith('w') and teile[1][:-1].isdigit():
+        basis = teile[0]
+    return f"{ordner}/{basis}" if ordner else basis
+
+
+def referenz_zaehler():
+    """Anzahl Referenzen je Bild (Schlüssel: Stamm relativ zum Upload-Ordner)"""
+    zaehler = Counter()
+    abfragen = (
+        db.session.query(PraxisBild.pfad, func.count(PraxisBild.id)).group_by(PraxisBild.pfad),
+        db.session.query(TeamMitglied.bild_pfad, func.count(TeamMitglied.id))
+        .filter(TeamMitglied.bild_pfad.isnot(None)).group_by(TeamMitglied.bild_pfad),
+    )
+    for abfrage in abfragen:
+        for pfad, anzahl in abfrage.all():
+            if pfad and pfad.startswith(UPLOAD_URL):
+                zaehler[_stamm(pfad[len(UPLOAD_URL):])] += anzahl
+    return zaehler
+
+
+def raeume_verwaiste_bilder(karenz_sek=KARENZ_SEK, trockenlauf=False):
+    """
+    Löscht nicht mehr referenzierte Bilddateien.
+
+    Ein Bild wird nur entfernt, wenn keine seiner Dateien jünger als die Karenzzeit
+    ist – so bleiben gerade hochgeladene oder per Dublette wiederverwendete Bilder erhalten.
+
+    Args:
+        karenz_sek: Mindestalter in Sekunden
+        trockenlauf: Nur zählen, nichts löschen
+
+    Returns:
+        dict mit Anzahl Bilder, referenzierter Bilder, gelöschter Dateien und freigegebener Bytes
+    """
+    referenzen = referenz_zaehler()
+    grenze = time.time() - karenz_sek
+
+    dateien_je_bild = defaultdict(list)
+    for ordner, _, namen in os.walk(UPLOAD_FOLDER):
+        for name in namen:
+            if name == SPERR_DATEI:
+                continue
+            voll = os.path.join(ordner, name)
+            relativ = os.path.relpath(voll, UPLOAD_FOLDER).replace(os.sep, '/')
+            dateien_je_bild[_stamm(relativ)].append(voll)
+
+    ergebnis = {'bilder': len(dateien_je_bild), 'referenziert': 0, 'geloescht': 0, 'bytes': 0}
+    for stamm, dateien in dateien_je_bild.items():
+        if referenzen.get(stamm):
+            ergebnis['referenziert'] += 1
+            continue
+        try:
+            stats = [os.stat(d) for d in dateien]
+        except OSError:
+            continue
+        if max(st.st_mtime for st in stats) > grenze:
+            continue
+
+        for datei, st in zip(dateien, stats):
+            if not trockenlauf:
+                try:
+                    os.remove(datei)
+                except OSError as e:
+                    logger.warning(f"Bild-Sweeper: {datei} konnte nicht gelöscht werden: {e}")
+                    continue
+            ergebnis['geloescht'] += 1
+            ergebnis['bytes'] += st.st_size
+
+        if not trockenlauf:
+            for url in [u for u in _manifest_cache if u.startswith(UPLOAD_URL) and _stamm(u[len(UPLOAD_URL):]) == stamm]:
+                _manifest_cache.pop(url, None)
+
+    logger.info(
+        f"Bild-Sweeper: {ergebnis['bilder']} Bilder, {ergebnis['referenziert']} referenziert, "
+        f"{ergebnis['geloescht']} Dateien ({ergebnis['bytes'] / 1024 / 1024:.1f} MB) {'würden gelöscht' if trockenlauf else 'gelöscht'}"
+    )
+    return ergebnis
+
+
+def _sweeper_sperre():
+    """
+    Dateisperre im Upload-Ordner: bei mehreren Workern räumt nur einer auf. Die
+    Sperre bleibt bis zum Prozessende gehalten (wird ein Worker ersetzt, übernimmt
+    ein anderer beim nächsten Intervall).
+    """
+    global _sperr_datei
+    import fcntl
+    try:
+        if _sperr_datei is None:
+            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+            _sperr_datei = open(os.path.join(UPLOAD_FOLDER, SPERR_DATEI), 'a')
+        fcntl.flock(_sperr_datei, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def starte_bild_sweeper(app):
+    """
+    Startet den Sweeper als Hintergrund-Thread im Webprozess (der Upload-Ordner
+    liegt auf der Disk des Webservice). Aktivierung über BILD_SWEEPER=1.
+    """
+    global _sweeper_thread
+    if os.environ.get('BILD_SWEEPER') != '1' or (_sweeper_thread and _sweeper_thread.is_alive()):
+        return
+
+    stop = threading.Event()
+
+    def _run():
+        stop.wait(SWEEPER_START_VERZOEGERUNG_SEK)
+        while not stop.is_set():
+            if not _sweeper_sperre():
+                # Ein anderer gunicorn-Worker räumt bereits auf
+                stop.wait(SWEEPER_INTERVALL_SEK)
+                continue
+            with app.app_context():
+                try:
+                    raeume_verwaiste_bilder()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Bild-Sweeper fehlgeschlagen: {e}")
+                finally:
+                    db.session.remove()
+            stop.wait(SWEEPER_INTERVALL_SEK)
+
+    _sweeper_thread = threading.Thread(target=_run, name='bild-sweeper', daemon=True)
+    _sweeper_thread.start()
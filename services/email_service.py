@@ -988,3 +988,78 @@ Stellenangebot ansehen: {job_url}
 Job-Alert abbestellen: {abmelde_url}"""
 
     return send_email(to_email, subject, html_body, text_body)
+
+
+def send_job_alert_digest(to_email, jobs, abmelde_links, zeitraum='heute'):
+    """Sammel-E-Mail mit allen neuen Stellenangeboten eines Abonnenten.
+
+    Args:
+        to_email: Empfänger-Adresse
+        jobs: Liste von Dicts mit titel, position_display, praxis_name, standort, job_url
+        abmelde_links: Liste von (Beschreibung, URL) je Job-Alert des Abonnenten
+        zeitraum: Anzeige-Text für das Zeitfenster (z.B. "heute", "diese Woche")
+    """
+    anzahl = len(jobs)
+    if anzahl == 1:
+        subject = "1 neues Stellenangebot passend zu Ihrem Job-Alert | Dentalax"
+    else:
+        subject = f"{anzahl} neue Stellenangebote passend zu Ihrem Job-Alert | Dentalax"
+
+    jobs_html = ""
+    jobs_text = ""
+    for job in jobs:
+        jobs_html += f"""
+    <div style="background-color: #f8f9fa; border-left: 4px solid #17a2b8; padding: 15px 20px; margin: 15px 0; border-radius: 4px;">
+        <h3 style="color: #17a2b8; margin: 0 0 8px 0; font-size: 16px;"><a href="{job['job_url']}" style="color: #17a2b8; text-decoration: none;">{job['titel']}</a></h3>
+        <p style="margin: 3px 0; font-size: 14px;"><strong>Praxis:</strong> {job['praxis_name']}</p>
+        <p style="margin: 3px 0; font-size: 14px;"><strong>Standort:</strong> {job['standort']}</p>
+        <p style="margin: 3px 0; font-size: 14px;"><strong>Position:</strong> {job['position_display']}</p>
+    </div>"""
+        jobs_text += f"""
+{job['titel']}
+Praxis: {job['praxis_name']}
+Standort: {job['standort']}
+Position: {job['position_display']}
+Ansehen: {job['job_url']}
+"""
+
+    abmelde_html = "<br>".join(
+        f'<a href="{url}" style="color: #17a2b8;">Job-Alert „{beschreibung}“ abbestellen</a>'
+        for beschreibung, url in abmelde_links
+    )
+    abmelde_text = "\n".join(
+        f"Job-Alert „{beschreibung}“ abbestellen: {url}"
+        for beschreibung, url in abmelde_links
+    )
+
+    html_body = f"""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"></head>
+<body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px; color: #333;">
+    <div style="text-align: center; margin-bottom: 30px;">
+        <h1 style="color: #17a2b8; margin: 0;">Dentalax</h1>
+        <p style="color: #666; margin-top: 5px;">Ihr Zahnarzt-Portal</p>
+    </div>
+
+    <h2 style="color: #333;">Ihre neuen Stellenangebote {zeitraum}</h2>
+
+    <p>Seit unserer letzten E-Mail wurden {anzahl} neue Stellenangebote veröffentlicht, die zu Ihrem Job-Alert passen:</p>
+{jobs_html}
+
+    <hr style="border: none; border-top: 1px solid #eee; margin: 30px 0;">
+
+    <p style="font-size: 12px; color: #999; text-align: center;">
+        Sie erhalten diese E-Mail, weil Sie einen Job-Alert auf Dentalax eingerichtet haben.<br>
+        {abmelde_html}
+    </p>
+</body>
+</html>"""
+
+    text_body = f"""Ihre neuen Stellenangebote {zeitraum}
+
+Seit unserer letzten E-Mail wurden {anzahl} neue Stellenangebote veröffentlicht, die zu Ihrem Job-Alert passen:
+{jobs_text}
+---
+{abmelde_text}"""
+
+    return send_email(to_email, subject, html_body, text_body)
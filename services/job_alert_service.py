@@ -0,0 +1,176 @@
+import os
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from math import radians, sin, cos, sqrt, atan2
+from sqlalchemy import and_, or_, func
+from models import JobAlert, Stellenangebot, Praxis
+from database import db
+
+logger = logging.getLogger(__name__)
+
+DIGEST_MODI = ('sofort', 'taeglich', 'woechentlich')
+
+# Mindestabstand zwischen zwei Sammel-Mails. Eine Stunde Toleranz, damit ein
+# täglicher Cronjob, der ein paar Sekunden früher startet, keinen Tag auslässt.
+DIGEST_INTERVALLE = {
+    'taeglich': timedelta(hours=23),
+    'woechentlich': timedelta(days=6, hours=23),
+}
+
+DIGEST_ZEITRAUM_TEXT = {
+    'taeglich': 'von heute',
+    'woechentlich': 'dieser Woche',
+}
+
+POSITION_NAMEN = {
+    'zfa': 'Zahnmedizinische/r Fachangestellte/r (ZFA)',
+    'zmf': 'Zahnmedizinische Fachassistentin (ZMF)',
+    'zmp': 'Zahnmedizinische Prophylaxeassistentin (ZMP)',
+    'dh': 'Dentalhygieniker/in (DH)',
+    'zahnarzt': 'Zahnarzt/Zahnärztin',
+}
+
+# Grobe Umrechnung km -> Grad für den Bounding-Box-Vorfilter in SQL.
+# Längengrade werden für Deutschland (bis 55° N) konservativ mit 63 km/° gerechnet.
+KM_PRO_GRAD_BREITE = 111.0
+KM_PRO_GRAD_LAENGE = 63.0
+
+
+def _distanz_km(lat1, lon1, lat2, lon2):
+    """Haversine-Distanz in Kilometern"""
+    delta_lat = radians(lat2 - lat1)
+    delta_lon = radians(lon2 - lon1)
+    a = sin(delta_lat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(delta_lon / 2) ** 2
+    return 6371 * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+
+def _base_url():
+    domain = os.environ.get('REPLIT_DOMAINS', os.environ.get('REPLIT_DEV_DOMAIN', 'localhost:5000'))
+    return f"https://{domain}"
+
+
+def _faellige_treffer(modus, jetzt):
+    """
+    Ermittelt alle (Alert, Stelle)-Paare eines Digest-Modus in einer einzigen Abfrage.
+
+    Neue Stellen werden per Join gegen die fälligen Alerts gematcht (Position +
+    Bounding-Box um den Alert-Standort). Die exakte Umkreisprüfung erfolgt danach
+    in Python auf der bereits stark reduzierten Treffermenge.
+    """
+    seit = func.coalesce(JobAlert.letzter_digest_am, JobAlert.bestaetigt_am, JobAlert.erstellt_am)
+    umkreis = func.coalesce(JobAlert.umkreis_km, 50)
+
+    return db.session.query(
+        JobAlert.id, JobAlert.email, JobAlert.position, JobAlert.ort,
+        JobAlert.latitude, JobAlert.longitude, JobAlert.umkreis_km, JobAlert.bestaetigungs_token,
+        Stellenangebot.id, Stellenangebot.slug, Stellenangebot.titel, Stellenangebot.position,
+        Stellenangebot.standort_plz, Stellenangebot.standort_stadt,
+        Praxis.name, Praxis.latitude, Praxis.longitude,
+    ).join(
+        Stellenangebot, and_(
+            Stellenangebot.ist_aktiv == True,
+            Stellenangebot.veroeffentlicht_am > seit,
+            Stellenangebot.veroeffentlicht_am <= jetzt,
+            or_(JobAlert.position == None, JobAlert.position == '', JobAlert.position == Stellenangebot.position),
+        )
+    ).join(
+        Praxis, Praxis.id == Stellenangebot.praxis_id
+    ).filter(
+        JobAlert.ist_aktiv == True,
+        JobAlert.digest_modus == modus,
+        seit <= jetzt - DIGEST_INTERVALLE[modus],
+        or_(
+            Praxis.latitude == None,
+            Praxis.longitude == None,
+            and_(
+                JobAlert.latitude != None,
+                JobAlert.longitude != None,
+                func.abs(Praxis.latitude - JobAlert.latitude) <= umkreis / KM_PRO_GRAD_BREITE,
+                func.abs(Praxis.longitude - JobAlert.longitude) <= umkreis / KM_PRO_GRAD_LAENGE,
+            ),
+        ),
+    ).order_by(JobAlert.email, Stellenangebot.veroeffentlicht_am.desc()).all()
+
+
+def versende_job_alert_digests(jetzt=None):
+    """
+    Versendet die Sammel-E-Mails für alle fälligen Job-Alerts im Digest-Modus.
+
+    Pro Abonnent (E-Mail-Adresse) wird genau eine E-Mail verschickt, auch wenn
+    mehrere Alerts passen. Stellen, die zu mehreren Alerts passen, erscheinen nur einmal.
+
+    Args:
+        jetzt: Referenzzeitpunkt (Standard: datetime.now())
+
+    Returns:
+        dict mit Anzahl Empfänger, gesendeter E-Mails, Stellen und Fehlern
+    """
+    from services.email_service import send_job_alert_digest
+
+    jetzt = jetzt or datetime.now()
+    base_url = _base_url()
+    ergebnis = {'empfaenger': 0, 'gesendet': 0, 'stellen': 0, 'fehler': 0}
+
+    for modus in DIGEST_INTERVALLE:
+        empfaenger = OrderedDict()
+
+        for (alert_id, email, alert_position, alert_ort, alert_lat, alert_lng, umkreis_km, token,
+             job_id, job_slug, job_titel, job_position, job_plz, job_stadt,
+             praxis_name, job_lat, job_lng) in _faellige_treffer(modus, jetzt):
+
+            if job_lat and job_lng:
+                if not alert_lat or not alert_lng:
+                    continue
+                if _distanz_km(job_lat, job_lng, alert_lat, alert_lng) > (umkreis_km or 50):
+                    continue
+
+            eintrag = empfaenger.setdefault(email, {'alert_ids': set(), 'abmelde_links': OrderedDict(), 'jobs': OrderedDict()})
+            eintrag['alert_ids'].add(alert_id)
+            if alert_id not in eintrag['abmelde_links']:
+                beschreibung = f"{(alert_position or 'Alle Positionen').upper()} in {alert_ort}"
+                eintrag['abmelde_links'][alert_id] = (beschreibung, f"{base_url}/job-alert/abmelden/{token}")
+            if job_id not in eintrag['jobs']:
+                eintrag['jobs'][job_id] = {
+                    'titel': job_titel,
+                    'position_display': POSITION_NAMEN.get(job_position, job_position),
+                    'praxis_name': praxis_name or '',
+                    'standort': f"{job_plz or ''} {job_stadt or ''}".strip(),
+                    'job_url': f"{base_url}/stellenangebot/{job_slug}",
+                }
+
+        fehlgeschlagene_alerts = set()
+        for email, eintrag in empfaenger.items():
+            ergebnis['empfaenger'] += 1
+            try:
+                ok = send_job_alert_digest(
+                    email,
+                    list(eintrag['jobs'].values()),
+                    list(eintrag['abmelde_links'].values()),
+                    DIGEST_ZEITRAUM_TEXT[modus],
+                )
+            except Exception as e:
+                logger.error(f"Job-Alert Digest Fehler für {email}: {e}")
+                ok = False
+            if ok:
+                ergebnis['gesendet'] += 1
+                ergebnis['stellen'] += len(eintrag['jobs'])
+            else:
+                ergebnis['fehler'] += 1
+                fehlgeschlagene_alerts |= eintrag['alert_ids']
+
+        # Zeitfenster aller fälligen Alerts in einem Schritt weiterschieben –
+        # auch ohne Treffer, fehlgeschlagene Versände werden beim nächsten Lauf wiederholt.
+        seit = func.coalesce(JobAlert.letzter_digest_am, JobAlert.bestaetigt_am, JobAlert.erstellt_am)
+        faellig = JobAlert.query.filter(
+            JobAlert.ist_aktiv == True,
+            JobAlert.digest_modus == modus,
+            seit <= jetzt - DIGEST_INTERVALLE[modus],
+        )
+        if fehlgeschlagene_alerts:
+            faellig = faellig.filter(~JobAlert.id.in_(fehlgeschlagene_alerts))
+        faellig.update({JobAlert.letzter_digest_am: jetzt}, synchronize_session=False)
+        db.session.commit()
+
+    logger.info(f"Job-Alert Digest: {ergebnis['gesendet']} E-Mails mit {ergebnis['stellen']} Stellen versendet, {ergebnis['fehler']} Fehler")
+    return ergebnis
@@ -0,0 +1,365 @@
+"""
+Persistente Job-Queue für lang laufende Admin-Aufgaben (z.B. KI-SEO-Generierung).
+
+Jobs und ihre Einzelschritte (Items) liegen in der Datenbank. Der Worker-Prozess
+(worker.py) holt sich Items per SELECT ... FOR UPDATE SKIP LOCKED, verarbeitet sie
+parallel und schreibt den Status pro Item zurück. Während der Generierung
+erneuert der Worker alle HERZSCHLAG_SEK den Zeitstempel seiner Items. Bricht er
+ab (Deploy, Neustart), gibt jeder laufende Worker die Items ohne Herzschlag nach
+VERWAIST_NACH wieder frei – ein Job läuft also dort weiter, wo er aufgehört hat.
+"""
+import os
+import json
+import time
+import signal
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from sqlalchemy import func
+from models import HintergrundJob, HintergrundJobItem
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Anzahl paralleler Items pro Batch (KI-Aufrufe sind I/O-gebunden)
+WORKER_PARALLEL = int(os.environ.get('JOB_WORKER_PARALLEL', 8))
+POLL_INTERVALL_SEK = 5
+MAX_VERSUCHE = 3
+# Laufende Items bekommen während der Generierung alle HERZSCHLAG_SEK einen neuen Zeitstempel
+HERZSCHLAG_SEK = 30
+# Items im Status "laeuft", die länger nicht aktualisiert wurden, gelten als verwaist
+VERWAIST_NACH = timedelta(minutes=2)
+# So oft prüft die Worker-Schleife auf verwaiste Items
+VERWAIST_PRUEF_INTERVALL = 60
+
+AKTIVE_STATUS = ('wartend', 'laeuft')
+
+# typ -> {'generiere': fn(params) -> ergebnis, 'speichere': fn(params, ergebnis) -> status}
+JOB_TYPEN = {}
+
+_stop_event = threading.Event()
+_inline_worker = None
+_inline_lock = threading.Lock()
+
+
+def registriere_job_typ(typ, generiere, speichere):
+    """
+    Registriert einen Job-Typ.
+
+    Args:
+        typ: Name des Job-Typs
+        generiere: Funktion ohne DB-Zugriff, läuft parallel in Threads
+        speichere: Funktion mit DB-Zugriff, läuft im Worker-Thread; gibt "erstellt" oder "vorhanden" zurück
+    """
+    JOB_TYPEN[typ] = {'generiere': generiere, 'speichere': speichere}
+
+
+def erstelle_job(typ, titel, items):
+    """
+    Legt einen neuen Job mit allen Items an.
+
+    Args:
+        typ: Registrierter Job-Typ
+        titel: Anzeige-Titel
+        items: Liste von Dicts mit schluessel, bezeichnung, parameter
+
+    Returns:
+        HintergrundJob
+    """
+    job = HintergrundJob(typ=typ, titel=titel, status='wartend', gesamt=len(items))
+    db.session.add(job)
+    db.session.flush()
+
+    jetzt = datetime.utcnow()
+    if items:
+        db.session.execute(HintergrundJobItem.__table__.insert(), [
+            {
+                'job_id': job.id,
+                'schluessel': item['schluessel'],
+                'bezeichnung': item.get('bezeichnung'),
+                'parameter_json': json.dumps(item.get('parameter', {}), ensure_ascii=False),
+                'status': 'offen',
+                'versuche': 0,
+                'aktualisiert_am': jetzt,
+            }
+            for item in items
+        ])
+    else:
+        job.status = 'fertig'
+        job.beendet_am = jetzt
+    db.session.commit()
+
+    if os.environ.get('JOB_WORKER_INLINE') == '1':
+        starte_inline_worker()
+
+    return job
+
+
+def aktualisiere_fortschritt(job_id):
+    """Zählt die Item-Status eines Jobs und schließt ihn ab, wenn nichts mehr offen ist"""
+    job = HintergrundJob.query.get(job_id)
+    if not job:
+        return None
+
+    zaehler = dict(
+        db.session.query(HintergrundJobItem.status, func.count(HintergrundJobItem.id))
+        .filter(HintergrundJobItem.job_id == job_id)
+        .group_by(HintergrundJobItem.status)
+        .all()
+    )
+    job.erstellt = zaehler.get('erstellt', 0)
+    job.vorhanden = zaehler.get('vorhanden', 0)
+    job.fehler = zaehler.get('fehler', 0)
+
+    if job.status in AKTIVE_STATUS and not zaehler.get('offen') and not zaehler.get('laeuft'):
+        job.status = 'fertig'
+        job.beendet_am = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def job_status_dict(job, letzte_items=50):
+    """JSON-Darstellung eines Jobs für das Polling im Admin-Bereich"""
+    items = (
+        job.items.filter(HintergrundJobItem.status.in_(('erstellt', 'vorhanden', 'fehler')))
+        .order_by(HintergrundJobItem.aktualisiert_am.desc())
+        .limit(letzte_items)
+        .all()
+    )
+    return {
+        'id': job.id,
+        'titel': job.titel,
+        'status': job.status,
+        'gesamt': job.gesamt,
+        'verarbeitet': job.verarbeitet,
+        'erstellt': job.erstellt,
+        'vorhanden': job.vorhanden,
+        'fehler': job.fehler,
+        'prozent': job.prozent,
+        'items': [
+            {'bezeichnung': i.bezeichnung, 'status': i.status, 'error': i.fehlermeldung or ''}
+            for i in items
+        ],
+    }
+
+
+def brich_job_ab(job_id):
+    """Bricht einen Job ab; bereits erzeugte Ergebnisse bleiben erhalten"""
+    job = HintergrundJob.query.get(job_id)
+    if job and job.status in AKTIVE_STATUS:
+        job.status = 'abgebrochen'
+        job.beendet_am = datetime.utcnow()
+        db.session.commit()
+    return job
+
+
+def wiederhole_fehler(job_id):
+    """Setzt fehlgeschlagene Items eines Jobs zurück und reiht den Job wieder ein"""
+    job = HintergrundJob.query.get(job_id)
+    if not job:
+        return None
+    job.items.filter(HintergrundJobItem.status == 'fehler').update(
+        {'status': 'offen', 'versuche': 0, 'fehlermeldung': None, 'aktualisiert_am': datetime.utcnow()},
+        synchronize_session=False
+    )
+    job.status = 'wartend'
+    job.beendet_am = None
+    db.session.commit()
+    aktualisiere_fortschritt(job_id)
+
+    if os.environ.get('JOB_WORKER_INLINE') == '1':
+        starte_inline_worker()
+    return job
+
+
+def gib_verwaiste_items_frei():
+    """Gibt Items frei, deren Worker abgestürzt oder neu gestartet ist"""
+    grenze = datetime.utcnow() - VERWAIST_NACH
+    anzahl = HintergrundJobItem.query.filter(
+        HintergrundJobItem.status == 'laeuft',
+        HintergrundJobItem.aktualisiert_am < grenze
+    ).update({'status': 'offen'}, synchronize_session=False)
+    db.session.commit()
+    if anzahl:
+        logger.info(f"Job-Queue: {anzahl} verwaiste Items wieder freigegeben")
+    return anzahl
+
+
+def _hole_items(anzahl):
+    """Reserviert bis zu `anzahl` offene Items aktiver Jobs (ältester Job zuerst)"""
+    items = (
+        HintergrundJobItem.query
+        .join(HintergrundJob, HintergrundJob.id == HintergrundJobItem.job_id)
+        .filter(HintergrundJob.status.in_(AKTIVE_STATUS), HintergrundJobItem.status == 'offen')
+        .order_by(HintergrundJobItem.job_id, HintergrundJobItem.id)
+        .limit(anzahl)
+        .with_for_update(skip_locked=True, of=HintergrundJobItem)
+        .all()
+    )
+    if not items:
+        db.session.commit()
+        return []
+
+    jetzt = datetime.utcnow()
+    jobs = {job.id: job for job in HintergrundJob.query.filter(HintergrundJob.id.in_({i.job_id for i in items})).all()}
+    reserviert = []
+    for item in items:
+        item.status = 'laeuft'
+        item.versuche = (item.versuche or 0) + 1
+        item.aktualisiert_am = jetzt
+        reserviert.append((item.id, item.job_id, jobs[item.job_id].typ, json.loads(item.parameter_json or '{}')))
+
+    for job in jobs.values():
+        if job.status == 'wartend':
+            job.status = 'laeuft'
+            job.gestartet_am = job.gestartet_am or jetzt
+    db.session.commit()
+
+    return reserviert
+
+
+def verarbeite_batch(anzahl=WORKER_PARALLEL):
+    """
+    Verarbeitet einen Batch offener Items.
+
+    Die KI-Generierung läuft parallel in Threads, das Speichern anschließend
+    sequentiell im aufrufenden Thread (die DB-Session ist nicht thread-safe).
+
+    Returns:
+        Anzahl verarbeiteter Items (0 = nichts zu tun)
+    """
+    reserviert = _hole_items(anzahl)
+    if not reserviert:
+        return 0
+
+    def generiere(eintrag):
+        item_id, job_id, typ, params = eintrag
+        handler = JOB_TYPEN.get(typ)
+        if not handler:
+            return eintrag, None, f"Unbekannter Job-Typ: {typ}"
+        try:
+            return eintrag, handler['generiere'](params), None
+        except Exception as e:
+            logger.error(f"Job-Queue: Fehler bei Item {item_id}: {e}")
+            return eintrag, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=min(anzahl, len(reserviert))) as executor:
+        futures = [executor.submit(generiere, eintrag) for eintrag in reserviert]
+        offen = set(futures)
+        while offen:
+            _, offen = wait(offen, timeout=HERZSCHLAG_SEK)
+            if offen:
+                _herzschlag([eintrag[0] for eintrag, future in zip(reserviert, futures) if future in offen])
+        ergebnisse = [future.result() for future in futures]
+
+    job_ids = set()
+    for (item_id, job_id, typ, params), ergebnis, fehler in ergebnisse:
+        job_ids.add(job_id)
+        item = HintergrundJobItem.query.get(item_id)
+        if fehler is None:
+            try:
+                item.status = JOB_TYPEN[typ]['speichere'](params, ergebnis)
+                item.fehlermeldung = None
+            except Exception as e:
+                db.session.rollback()
+                item = HintergrundJobItem.query.get(item_id)
+                fehler = str(e)
+                logger.error(f"Job-Queue: DB-Fehler bei Item {item_id}: {e}")
+        if fehler is not None:
+            item.status = 'offen' if (item.versuche or 0) < MAX_VERSUCHE else 'fehler'
+            item.fehlermeldung = fehler[:1000]
+        item.aktualisiert_am = datetime.utcnow()
+        db.session.commit()
+
+    for job_id in job_ids:
+        aktualisiere_fortschritt(job_id)
+
+    return len(reserviert)
+
+
+def _herzschlag(item_ids):
+    """Markiert Items, deren Generierung noch läuft, als lebendig (sonst gelten sie als verwaist)"""
+    HintergrundJobItem.query.filter(
+        HintergrundJobItem.id.in_(item_ids), HintergrundJobItem.status == 'laeuft'
+    ).update({'aktualisiert_am': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+
+
+def _items_laufen():
+    """True, solange aktive Jobs Items im Status 'laeuft' haben (eigene oder die eines anderen Workers)"""
+    return db.session.query(
+        HintergrundJobItem.query
+        .join(HintergrundJob, HintergrundJob.id == HintergrundJobItem.job_id)
+        .filter(HintergrundJob.status.in_(AKTIVE_STATUS), HintergrundJobItem.status == 'laeuft')
+        .exists()
+    ).scalar()
+
+
+def worker_loop(poll_intervall=POLL_INTERVALL_SEK, einmalig=False):
+    """
+    Hauptschleife des Worker-Prozesses. Beendet sich sauber bei SIGTERM/SIGINT
+    nach dem aktuellen Batch.
+
+    Args:
+        poll_intervall: Wartezeit in Sekunden, wenn keine Items offen sind
+        einmalig: Beenden, sobald keine Items mehr offen sind oder laufen (Inline-Worker)
+    """
+    import services.seo_jobs  # noqa: F401 – registriert die SEO-Job-Typen
+    import services.rechnung_jobs  # noqa: F401 – registriert den Rechnungs-Job-Typ
+
+    logger.info("Job-Queue: Worker gestartet")
+
+    naechste_pruefung = 0.0
+    while not _stop_event.is_set():
+        laufen = False
+        try:
+            # Nicht nur beim Start: ein neuer Worker kann starten, bevor die Items des alten verwaist sind
+            if time.monotonic() >= naechste_pruefung:
+                gib_verwaiste_items_frei()
+                naechste_pruefung = time.monotonic() + VERWAIST_PRUEF_INTERVALL
+            verarbeitet = verarbeite_batch()
+            if not verarbeitet and einmalig:
+                laufen = _items_laufen()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Job-Queue: Batch fehlgeschlagen: {e}")
+            verarbeitet = 0
+        finally:
+            db.session.remove()
+
+        if not verarbeitet:
+            if einmalig and not laufen:
+                break
+            _stop_event.wait(poll_intervall)
+
+    logger.info("Job-Queue: Worker beendet")
+
+
+def installiere_signal_handler():
+    """SIGTERM (Render-Deploy) beendet den Worker nach dem laufenden Batch"""
+    def _stop(signum, frame):
+        logger.info(f"Job-Queue: Signal {signum} empfangen, beende nach aktuellem Batch")
+        _stop_event.set()
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+
+def starte_inline_worker():
+    """
+    Startet einen Worker-Thread im Webprozess (nur für Entwicklung ohne
+    separaten Worker, aktiviert über JOB_WORKER_INLINE=1).
+    """
+    global _inline_worker
+    from flask import current_app
+    app = current_app._get_current_object()
+
+    def _run():
+        with app.app_context():
+            worker_loop(einmalig=True)
+
+    with _inline_lock:
+        if _inline_worker and _inline_worker.is_alive():
+            return
+        _inline_worker = threading.Thread(target=_run, name='job-queue-inline', daemon=True)
+        _inline_worker.start()
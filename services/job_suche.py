@@ -0,0 +1,285 @@
+"""
+Volltextsuche für Stellenangebote (eigene Inserate und externe Jobs).
+
+PostgreSQL: generierte tsvector-Spalte such_vektor (deutsche Stammformen,
+gewichtet: Titel/Position vor Tags bzw. Unternehmen vor Beschreibung) mit
+GIN-Index, angelegt von Schema-Migration 8. Die Spalte aktualisiert sich bei
+jedem INSERT/UPDATE selbst – auch beim TheirStack-Sync.
+
+Sonst (SQLite, Migration noch nicht gelaufen): invertierter Index im Prozess,
+aufgebaut aus denselben Feldern. Er wird neu gebaut, wenn sich der Bestand
+ändert (höchstens alle VERSION_PRUEF_INTERVALL Sekunden geprüft, sofort nach
+invalidiere_job_index() – aufgerufen beim Anlegen, Umschalten, Löschen und Sync).
+
+Beide Wege suchen Wortanfänge (alle Suchbegriffe müssen vorkommen) und liefern
+einen Rang; berücksichtigt werden nur aktive Einträge. Wortteile in Titel/Position
+(z.B. "arzt" in "Zahnarzt") kommen mit Rang 0 dazu: auf PostgreSQL per ILIKE über
+den Trigramm-Index aus Schema-Migration 10 – in derselben Abfrage wie die
+Volltextsuche –, sonst über die Wörter der Titel im Index. Findet die Suche gar
+nichts, wird wie früher per ILIKE in allen Suchfeldern gesucht.
+"""
+import re
+import time
+import bisect
+import logging
+import threading
+from collections import defaultdict
+
+from sqlalchemy import func, inspect, or_
+
+from database import db
+from models import Stellenangebot, ExternesInserat
+
+logger = logging.getLogger(__name__)
+
+VERSION_PRUEF_INTERVALL = 30  # Sekunden
+
+# Tabelle -> [(Feld, Gewicht)]; Gewichte wie setweight A/B/C in Migration 8
+SUCH_FELDER = {
+    Stellenangebot: [('titel', 'A'), ('position', 'A'), ('tags', 'B')],
+    ExternesInserat: [('titel', 'A'), ('unternehmen', 'B'), ('beschreibung', 'C')],
+}
+# Standardgewichte von ts_rank für A/B/C
+GEWICHTE = {'A': 1.0, 'B': 0.4, 'C': 0.2}
+
+_WORT_RE = re.compile(r'[^\W_]+')
+# Gewichtsklasse der Titel-/Positionsfelder, in denen auch Wortteile gesucht werden
+TITEL_KLASSE = 'A'
+# Grobe Stammform für den Index im Prozess (PostgreSQL nutzt den deutschen Snowball-Stemmer)
+_ENDUNGEN = ('ungen', 'innen', 'ung', 'en', 'er', 'es', 'e', 'n', 's')
+
+
+def such_woerter(text):
+    """Suchbegriffe eines Textes (kleingeschrieben)"""
+    return _WORT_RE.findall((text or '').lower())
+
+
+def _titel_felder(modell):
+    return [feld for feld, klasse in SUCH_FELDER[modell] if klasse == TITEL_KLASSE]
+
+
+def _ilike_muster(text):
+    """'%text%' mit maskierten Platzhaltern (Escape-Zeichen: Backslash)"""
+    return '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def _stamm(wort):
+    wort = wort.replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue').replace('ß', 'ss')
+    for endung in _ENDUNGEN:
+        if wort.endswith(endung) and len(wort) - len(endung) >= 4:
+            return wort[:-len(endung)]
+    return wort
+
+
+# ========================================
+# POSTGRESQL (tsvector + GIN)
+# ========================================
+
+_volltext_cache = {}  # {tabelle: (such_vektor vorhanden, Trigramm-Indizes vorhanden)}
+
+
+def _pg_indizes(modell):
+    tabelle = modell.__tablename__
+    if tabelle not in _volltext_cache:
+        try:
+            if db.engine.dialect.name != 'postgresql':
+                _volltext_cache[tabelle] = (False, False)
+            else:
+                pruefer = inspect(db.engine)
+                indizes = {index['name'] for index in pruefer.get_indexes(tabelle)}
+                _volltext_cache[tabelle] = (
+                    any(spalte['name'] == 'such_vektor' for spalte in pruefer.get_columns(tabelle)),
+                    all(f'ix_{tabelle}_{feld}_trgm' in indizes for feld in _titel_felder(modell)),
+                )
+        except Exception as e:
+            logger.warning(f"Volltext-Prüfung für {tabelle} fehlgeschlagen: {e}")
+            return False, False
+    return _volltext_cache[tabelle]
+
+
+def volltext_verfuegbar(modell):
+    """True, wenn die Tabelle die such_vektor-Spalte aus Migration 8 hat (nur PostgreSQL)"""
+    return _pg_indizes(modell)[0]
+
+
+def trigramm_verfuegbar(modell):
+    """True, wenn Titel/Position den Trigramm-Index aus Migration 10 haben (nur PostgreSQL)"""
+    return _pg_indizes(modell)[1]
+
+
+def _tsquery(woerter):
+    # Nur Wortzeichen – der Ausdruck wird von to_tsquery geparst; jedes Wort als Präfix
+    return ' & '.join(f"{wort}:*" for wort in woerter)
+
+
+def _treffer_postgres(modell, woerter, suchtext):
+    """
+    Subquery (id, rang) der aktiven Treffer zum JOIN in die Abfrage des Aufrufers;
+    None, wenn es nichts zu suchen gibt.
+    """
+    bedingungen, parameter, rang = [], {}, '0'
+    if woerter:
+        # Konstanter Ausdruck statt Cross Join, damit beide GIN-Indizes per BitmapOr nutzbar sind
+        q = "to_tsquery('german', :q)"
+        bedingungen.append(f"such_vektor @@ {q}")
+        rang = f"CASE WHEN such_vektor @@ {q} THEN ts_rank(such_vektor, {q}) ELSE 0 END"
+        parameter['q'] = _tsquery(woerter)
+    if trigramm_verfuegbar(modell):
+        bedingungen.extend(f'"{feld}" ILIKE :muster' for feld in _titel_felder(modell))
+        parameter['muster'] = _ilike_muster(suchtext)
+    if not bedingungen:
+        return None
+    return db.text(
+        f"SELECT id, {rang} AS rang FROM {modell.__tablename__} "
+        f"WHERE ist_aktiv AND ({' OR '.join(bedingungen)})"
+    ).bindparams(**parameter).columns(id=db.Integer, rang=db.Float).subquery('such_treffer')
+
+
+# ========================================
+# INDEX IM PROZESS (Fallback)
+# ========================================
+
+class JobIndex:
+    """Invertierter Index Stammform -> {id: Gewicht} mit sortiertem Vokabular für Präfixsuche"""
+
+    def __init__(self, zeilen, felder):
+        """
+        Args:
+            zeilen: Tupel (id, feld1, feld2, ...) in der Reihenfolge von `felder`
+            felder: [(Feld, Gewichtsklasse)] aus SUCH_FELDER
+        """
+        eintraege = defaultdict(lambda: defaultdict(float))
+        titel_woerter = defaultdict(set)
+        for zeile in zeilen:
+            for (_, klasse), text in zip(felder, zeile[1:]):
+                for wort in such_woerter(text):
+                    eintraege[_stamm(wort)][zeile[0]] += GEWICHTE[klasse]
+                    if klasse == TITEL_KLASSE:
+                        titel_woerter[wort].add(zeile[0])
+        self._eintraege = {stamm: dict(ids) for stamm, ids in eintraege.items()}
+        self._vokabular = sorted(self._eintraege)
+        self._titel_woerter = dict(titel_woerter)
+
+    def suche(self, woerter):
+        """{id: rang} der Einträge, die alle Wörter (als Wortanfang) enthalten"""
+        ergebnis = None
+        for wort in woerter:
+            stamm = _stamm(wort)
+            treffer = defaultdict(float)
+            start = bisect.bisect_left(self._vokabular, stamm)
+            for eintrag in self._vokabular[start:]:
+                if not eintrag.startswith(stamm):
+                    break
+                for job_id, gewicht in self._eintraege[eintrag].items():
+                    treffer[job_id] += gewicht
+            if ergebnis is None:
+                ergebnis = dict(treffer)
+            else:
+                ergebnis = {job_id: rang + treffer[job_id] for job_id, rang in ergebnis.items() if job_id in treffer}
+            if not ergebnis:
+                break
+        return ergebnis or {}
+
+    def teilwort_suche(self, woerter):
+        """IDs der Einträge, deren Titel/Position alle Wörter als Wortteil enthalten (wie ILIKE '%wort%')"""
+        ergebnis = None
+        for wort in woerter:
+            ids = set()
+            for titel_wort, titel_ids in self._titel_woerter.items():
+                if wort in titel_wort:
+                    ids |= titel_ids
+            ergebnis = ids if ergebnis is None else ergebnis & ids
+            if not ergebnis:
+                break
+        return ergebnis or set()
+
+
+_index_lock = threading.Lock()
+_index_cache = {}  # {tabelle: {'version': ..., 'geprueft': float, 'index': JobIndex}}
+
+
+def _fingerabdruck(modell):
+    geaendert = modell.aktualisiert_am if modell is Stellenangebot else modell.abgerufen_am
+    return db.session.query(
+        func.count(modell.id), func.max(modell.id), func.max(geaendert)
+    ).filter(modell.ist_aktiv == True).one()
+
+
+def job_index(modell):
+    """Index im Prozess über die aktiven Einträge von Stellenangebot oder ExternesInserat; neu gebaut, wenn sich der Bestand ändert"""
+    tabelle = modell.__tablename__
+    jetzt = time.monotonic()
+    with _index_lock:
+        eintrag = _index_cache.get(tabelle)
+        if eintrag and jetzt - eintrag['geprueft'] < VERSION_PRUEF_INTERVALL:
+            return eintrag['index']
+
+    version = tuple(_fingerabdruck(modell))
+    if eintrag and eintrag['version'] == version:
+        index = eintrag['index']
+    else:
+        felder = SUCH_FELDER[modell]
+        spalten = [modell.id] + [getattr(modell, feld) for feld, _ in felder]
+        index = JobIndex(db.session.query(*spalten).filter(modell.ist_aktiv == True).all(), felder)
+        logger.info(f"Job-Index {tabelle} aufgebaut: {len(index._vokabular)} Begriffe")
+
+    with _index_lock:
+        _index_cache[tabelle] = {'version': version, 'geprueft': jetzt, 'index': index}
+    return index
+
+
+def invalidiere_job_index():
+    """Erzwingt die Prüfung des Bestands bei der nächsten Suche (nach Anlegen/Ändern/Sync von Jobs)"""
+    with _index_lock:
+        for eintrag in _index_cache.values():
+            eintrag['geprueft'] = 0.0
+
+
+# ========================================
+# SUCHE
+# ========================================
+
+def _mit_rang(eintrag, rang):
+    eintrag.such_rang = float(rang)
+    return eintrag
+
+
+def job_treffer(abfrage, modell, suchtext):
+    """
+    Führt `abfrage` (Query über Stellenangebot oder ExternesInserat mit den übrigen
+    Filtern) eingeschränkt auf die Treffer der Volltextsuche aus.
+
+    PostgreSQL: eine Abfrage, die Treffer kommen als Subquery per JOIN dazu. Sonst
+    filtert der Index im Prozess die Einträge von `abfrage`. In beiden Fällen wird
+    keine ID-Liste an die Datenbank gebunden.
+
+    Returns:
+        Liste der Einträge, jeweils mit Attribut such_rang (höher = relevanter;
+        Wortteil- und ILIKE-Treffer haben Rang 0)
+    """
+    woerter = such_woerter(suchtext)
+    eintraege = []
+    try:
+        if volltext_verfuegbar(modell):
+            treffer = _treffer_postgres(modell, woerter, suchtext)
+            if treffer is not None:
+                zeilen = abfrage.join(treffer, treffer.c.id == modell.id).add_columns(treffer.c.rang).all()
+                eintraege = [_mit_rang(eintrag, rang) for eintrag, rang in zeilen]
+        elif woerter:
+            index = job_index(modell)
+            rang = index.suche(woerter)
+            teilwort = index.teilwort_suche(woerter)
+            if rang or teilwort:
+                eintraege = [
+                    _mit_rang(eintrag, rang.get(eintrag.id, 0.0))
+                    for eintrag in abfrage.all() if eintrag.id in rang or eintrag.id in teilwort
+                ]
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Volltextsuche fehlgeschlagen, nutze ILIKE: {e}")
+
+    if eintraege:
+        return eintraege
+    muster = _ilike_muster(suchtext)
+    bedingungen = [getattr(modell, feld).ilike(muster, escape='\\') for feld, _ in SUCH_FELDER[modell]]
+    return [_mit_rang(eintrag, 0.0) for eintrag in abfrage.filter(or_(*bedingungen)).all()]
@@ -0,0 +1,295 @@
+"""
+Binärer, spaltenweiser Praxis-Datensatz (kompilierte Form von zahnaerzte.csv).
+
+Die CSV bleibt die bearbeitbare Quelle. `python -m tools.baue_praxis_datensatz`
+(bzw. der Webprozess selbst, wenn die Datei fehlt oder veraltet ist) schreibt
+daraus eine Datei mit festen Spalten:
+
+    Kopf     '<8sIIIII20s': Magic, Format-Version, Zeilen, Strings, Rasterzellen,
+             Zeilen mit Koordinaten, SHA-1 der CSV
+    lat/lng  float64[n] (NaN = keine gültigen Koordinaten)
+    Spalten  je uint32[n] – IDs in die String-Tabelle (gleiche Werte nur einmal)
+    Raster   uint32[c] Zellschlüssel (sortiert), uint32[c+1] Start, uint32[k] Zeilen
+             – räumlicher Index für die Umkreissuche, Zeilen nach Zelle gruppiert
+    Strings  uint32[m+1] Offsets + UTF-8-Blob
+
+Gelesen wird per mmap (read-only): Laden kostet nur das Öffnen, Werte werden
+erst beim Zugriff dekodiert, und die Seiten liegen im Page-Cache – mehrere
+Prozesse (gunicorn-Worker) teilen sich dieselbe physische Kopie.
+"""
+import os
+import sys
+import csv
+import mmap
+import math
+import struct
+import hashlib
+import bisect
+import logging
+import threading
+from array import array
+from functools import lru_cache
+from math import radians, sin, cos, sqrt, atan2, floor
+
+logger = logging.getLogger(__name__)
+
+CSV_DATEI = "zahnaerzte.csv"
+DATENSATZ_DATEI = os.environ.get("PRAXIS_DATENSATZ", "zahnaerzte.bin")
+MAGIC = b'DXPRAXEN'
+FORMAT_VERSION = 2
+KOPF = struct.Struct('<8sIIIII20s')
+# Spalten in Dateireihenfolge (Werte wie in der CSV, Name/PLZ/Stadt/Straße getrimmt)
+SPALTEN = ('name', 'email', 'telefon', 'webseite', 'plz', 'stadt', 'straße', 'beansprucht')
+RASTER_GRAD = 0.1  # Kantenlänge einer Rasterzelle in Grad (ca. 11 x 7 km)
+RASTER_SPALTEN = 1000  # Zellschlüssel = Zeile * RASTER_SPALTEN + Spalte (Längengrade 5-15 -> 50-150)
+KM_PRO_GRAD_BREITE = 111.0
+
+_lock = threading.Lock()
+_cache = {}  # {csv_datei: (mtime, datensatz oder None)}
+
+
+def parse_koordinate(roh, minimum, maximum):
+    """
+    Koordinate aus der CSV (als Ganzzahl mit Tausenderpunkten gespeichert, z.B.
+    "5.074.886" = 50,74886) oder None, wenn ungültig bzw. außerhalb des Bereichs.
+    """
+    try:
+        wert = int(roh.replace(',', '').replace('.', '')) / 1e7
+    except (AttributeError, ValueError):
+        return None
+    return wert if minimum <= wert <= maximum else None
+
+
+def parse_lat_lng(row):
+    """(lat, lng) einer CSV-Zeile; beide None, wenn eine der beiden ungültig ist (Deutschland grob)"""
+    lat = parse_koordinate(row.get('lat'), 45, 55)
+    lng = parse_koordinate(row.get('lng'), 5, 15)
+    if lat is None or lng is None:
+        return None, None
+    return lat, lng
+
+
+def _distanz_km(lat1, lon1, lat2, lon2):
+    """Haversine-Distanz in Kilometern"""
+    delta_lat = radians(lat2 - lat1)
+    delta_lon = radians(lon2 - lon1)
+    a = sin(delta_lat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(delta_lon / 2) ** 2
+    return 6371 * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+
+def _zellschluessel(lat, lng):
+    return floor(lat / RASTER_GRAD) * RASTER_SPALTEN + floor(lng / RASTER_GRAD)
+
+
+def _csv_sha1(csv_datei):
+    sha = hashlib.sha1()
+    with open(csv_datei, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(block)
+    return sha.digest()
+
+
+def _ausrichten(f):
+    rest = f.tell() % 8
+    if rest:
+        f.write(b'\0' * (8 - rest))
+
+
+def datensatz_pfad(csv_datei=CSV_DATEI):
+    """Ablageort des Datensatzes zu einer CSV (zahnaerzte.csv -> DATENSATZ_DATEI, sonst gleicher Name mit .bin)"""
+    if csv_datei == CSV_DATEI:
+        return DATENSATZ_DATEI
+    return os.path.splitext(csv_datei)[0] + '.bin'
+
+
+def baue_datensatz(csv_datei=CSV_DATEI, ziel=None):
+    """
+    Kompiliert die CSV in den Binär-Datensatz (atomar per Temp-Datei + os.replace).
+
+    Returns:
+        dict mit zeilen, strings, bytes
+    """
+    ziel = ziel or datensatz_pfad(csv_datei)
+    lat = array('d')
+    lng = array('d')
+    spalten = {spalte: array('I') for spalte in SPALTEN}
+    string_ids = {}
+    strings = []
+
+    def string_id(wert):
+        sid = string_ids.get(wert)
+        if sid is None:
+            sid = string_ids[wert] = len(strings)
+            strings.append(wert.encode('utf-8'))
+        return sid
+
+    with open(csv_datei, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            zeile_lat, zeile_lng = parse_lat_lng(row)
+            lat.append(math.nan if zeile_lat is None else zeile_lat)
+            lng.append(math.nan if zeile_lng is None else zeile_lng)
+            for spalte in SPALTEN:
+                wert = row.get(spalte) or ''
+                if spalte == 'beansprucht':
+                    wert = wert.strip().lower()
+                elif spalte in ('name', 'plz', 'stadt', 'straße'):
+                    wert = wert.strip()
+                spalten[spalte].append(string_id(wert))
+
+    zellen = {}
+    for zeile, zeile_lat in enumerate(lat):
+        if zeile_lat == zeile_lat:
+            zellen.setdefault(_zellschluessel(zeile_lat, lng[zeile]), []).append(zeile)
+    zell_schluessel = array('I', sorted(zellen))
+    zell_start = array('I', [0])
+    zell_zeilen = array('I')
+    for schluessel in zell_schluessel:
+        zell_zeilen.extend(zellen[schluessel])
+        zell_start.append(len(zell_zeilen))
+
+    offsets = array('I', [0])
+    for s in strings:
+        offsets.append(offsets[-1] + len(s))
+    abschnitte = (lat, lng, *(spalten[s] for s in SPALTEN), zell_schluessel, zell_start, zell_zeilen, offsets)
+    if sys.byteorder != 'little':
+        for arr in abschnitte:
+            arr.byteswap()
+
+    tmp_pfad = f"{ziel}.{os.getpid()}.tmp"
+    with open(tmp_pfad, 'wb') as f:
+        f.write(KOPF.pack(
+            MAGIC, FORMAT_VERSION, len(lat), len(strings), len(zell_schluessel), len(zell_zeilen), _csv_sha1(csv_datei)
+        ))
+        for arr in abschnitte:
+            _ausrichten(f)
+            arr.tofile(f)
+        f.write(b''.join(strings))
+        groesse = f.tell()
+    os.replace(tmp_pfad, ziel)
+    return {'zeilen': len(lat), 'strings': len(strings), 'bytes': groesse}
+
+
+class PraxisDatensatz:
+    """Read-only-Sicht auf den Binär-Datensatz (mmap, Werte werden bei Zugriff dekodiert)"""
+
+    def __init__(self, pfad):
+        with open(pfad, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n, m, c, k, self.csv_sha1 = KOPF.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Unbekanntes Datensatz-Format: {magic!r} v{version}")
+
+        self.anzahl = n
+        mv = memoryview(self._mm)
+        pos = KOPF.size
+
+        def abschnitt(laenge, typ):
+            nonlocal pos
+            pos += -pos % 8
+            teil = mv[pos:pos + laenge * array(typ).itemsize].cast(typ)
+            pos += laenge * array(typ).itemsize
+            return teil
+
+        self.lat = abschnitt(n, 'd')
+        self.lng = abschnitt(n, 'd')
+        self.spalten = {spalte: abschnitt(n, 'I') for spalte in SPALTEN}
+        self._zell_schluessel = abschnitt(c, 'I')
+        self._zell_start = abschnitt(c + 1, 'I')
+        self._zell_zeilen = abschnitt(k, 'I')
+        self._offsets = abschnitt(m + 1, 'I')
+        self._blob = pos
+        self.text = lru_cache(maxsize=8192)(self._text)
+
+    def __len__(self):
+        return self.anzahl
+
+    def _text(self, sid):
+        return str(self._mm[self._blob + self._offsets[sid]:self._blob + self._offsets[sid + 1]], 'utf-8')
+
+    def wert(self, spalte, zeile):
+        return self.text(self.spalten[spalte][zeile])
+
+    def koordinaten(self, zeile):
+        """(lat, lng) oder (None, None)"""
+        lat = self.lat[zeile]
+        return (None, None) if lat != lat else (lat, self.lng[zeile])
+
+    def im_umkreis(self, lat, lng, radius_km):
+        """
+        Zeilen im Umkreis über das Raster der Datei (nur die Zellen im umgebenden
+        Rechteck werden gelesen).
+
+        Returns:
+            Liste von (zeile, distanz_km), unsortiert
+        """
+        delta_lat = radius_km / KM_PRO_GRAD_BREITE
+        delta_lng = radius_km / (KM_PRO_GRAD_BREITE * max(cos(radians(lat)), 0.01))
+        j_von = floor((lng - delta_lng) / RASTER_GRAD)
+        j_bis = floor((lng + delta_lng) / RASTER_GRAD)
+        treffer = []
+        for i in range(floor((lat - delta_lat) / RASTER_GRAD), floor((lat + delta_lat) / RASTER_GRAD) + 1):
+            # Die Zellen einer Rasterzeile liegen im Schlüssel-Array direkt hintereinander
+            von = bisect.bisect_left(self._zell_schluessel, i * RASTER_SPALTEN + j_von)
+            bis = bisect.bisect_right(self._zell_schluessel, i * RASTER_SPALTEN + j_bis)
+            for pos in range(self._zell_start[von], self._zell_start[bis]):
+                zeile = self._zell_zeilen[pos]
+                zeile_lat, zeile_lng = self.lat[zeile], self.lng[zeile]
+                if abs(zeile_lat - lat) > delta_lat or abs(zeile_lng - lng) > delta_lng:
+                    continue
+                distanz = _distanz_km(lat, lng, zeile_lat, zeile_lng)
+                if distanz <= radius_km:
+                    treffer.append((zeile, distanz))
+        return treffer
+
+    def texte(self):
+        """Alle Strings der Tabelle dekodiert (Index = String-ID) – für das einmalige Aufbauen von Zeilen"""
+        blob = memoryview(self._mm)[self._blob:]
+        offsets = self._offsets
+        return [str(blob[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(len(offsets) - 1)]
+
+    def eindeutige_werte(self, spalte):
+        """Alle verschiedenen Werte einer Spalte (jeder String wird nur einmal dekodiert)"""
+        return {self.text(sid) for sid in set(self.spalten[spalte])}
+
+
+def _lade_oder_baue(csv_datei, pfad):
+    csv_sha1 = _csv_sha1(csv_datei)
+    try:
+        datensatz = PraxisDatensatz(pfad)
+        if datensatz.csv_sha1 == csv_sha1:
+            return datensatz
+        logger.info(f"Praxis-Datensatz {pfad} passt nicht zur CSV, baue neu")
+    except (OSError, ValueError) as e:
+        logger.info(f"Praxis-Datensatz {pfad} nicht lesbar ({e}), baue neu")
+
+    statistik = baue_datensatz(csv_datei, pfad)
+    logger.info(f"Praxis-Datensatz gebaut: {statistik}")
+    return PraxisDatensatz(pfad)
+
+
+def praxis_datensatz(csv_datei=CSV_DATEI):
+    """
+    Liefert den gemappten Datensatz zur aktuellen CSV (den Inhalts-Hash prüft es
+    nur bei geänderter CSV-Änderungszeit). None, wenn er weder geladen noch gebaut
+    werden kann – Aufrufer lesen dann die CSV direkt.
+    """
+    if sys.byteorder != 'little':
+        # Die Spalten werden direkt als native Arrays gelesen (Datei ist little-endian)
+        return None
+    try:
+        mtime = os.path.getmtime(csv_datei)
+    except OSError:
+        return None
+
+    with _lock:
+        cached = _cache.get(csv_datei)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            datensatz = _lade_oder_baue(csv_datei, datensatz_pfad(csv_datei))
+        except Exception as e:
+            logger.warning(f"Praxis-Datensatz nicht verfügbar, lese CSV: {e}")
+            datensatz = None
+        _cache[csv_datei] = (mtime, datensatz)
+        return datensatz
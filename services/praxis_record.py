@@ -0,0 +1,133 @@
+"""
+Kompakter, unveränderlicher Datensatz für Praxen in der Suche.
+
+Ersetzt die Dicts mit rund 20 Schlüsseln pro Praxis: Felder liegen in __slots__
+(kein Dict pro Objekt), nicht gesetzte Felder zeigen auf gemeinsame Standardwerte
+und Städte/PLZ werden interniert, damit gleiche Werte nur einmal im Speicher liegen.
+
+Zugriff wie bisher per praxis['name'] bzw. praxis.get('name', '') im Python-Code
+und per praxis.name in Jinja – suche.html bleibt unverändert. Statt Felder zu
+setzen (z.B. die Entfernung) entsteht mit mit() eine Kopie; so können
+gecachte Einträge nicht mehr versehentlich für alle Anfragen verändert werden.
+"""
+import sys
+
+# Feld -> Standardwert (gemeinsam für alle Einträge, nur unveränderliche Werte)
+STANDARDWERTE = {
+    'id': None,
+    'name': '',
+    'email': '',
+    'telefon': '',
+    'webseite': '',
+    'plz': '',
+    'stadt': '',
+    'straße': '',
+    'lat': None,
+    'lng': None,
+    'slug': None,
+    'paket': '',
+    'landingpage_aktiv': None,
+    'beansprucht': 'nein',
+    'bewertung_avg': 0,
+    'bewertung_anzahl': 0,
+    'google_rating': None,
+    'google_review_count': 0,
+    'oeffnungsstatus': None,
+    'leistungsschwerpunkte': '',
+    'entfernung': None,
+    'csv_original_idx': None,
+    'csv_schluessel': None,
+    'beansprucht_csv': '',
+}
+# Aus anderen Feldern abgeleitet (belegen keinen Platz im Eintrag)
+ABGELEITET = ('csv_id', 'aus_csv', 'aus_datenbank')
+FELDER = frozenset(STANDARDWERTE) | frozenset(ABGELEITET)
+_INTERNIERT = ('stadt', 'plz')
+
+
+class PraxisRecord:
+    __slots__ = tuple(STANDARDWERTE)
+
+    def __init__(self, **felder):
+        setzen = object.__setattr__
+        for feld, wert in felder.items():
+            if feld not in STANDARDWERTE:
+                raise TypeError(f"Unbekanntes Feld: {feld}")
+            if feld in _INTERNIERT and wert:
+                wert = sys.intern(wert)
+            # Nicht gesetzte Felder bleiben leer und liefern den gemeinsamen Standardwert
+            setzen(self, feld, wert)
+
+    def __getattr__(self, feld):
+        # Nur für nicht gesetzte Slots aufgerufen
+        try:
+            return STANDARDWERTE[feld]
+        except KeyError:
+            raise AttributeError(feld) from None
+
+    def __setattr__(self, feld, wert):
+        raise AttributeError("PraxisRecord ist unveränderlich – mit() liefert eine geänderte Kopie")
+
+    __delattr__ = __setattr__
+
+    @property
+    def csv_id(self):
+        return f"csv_{self.csv_original_idx}" if self.csv_original_idx is not None else None
+
+    @property
+    def aus_csv(self):
+        return self.csv_original_idx is not None
+
+    @property
+    def aus_datenbank(self):
+        return self.id is not None
+
+    def mit(self, **aenderungen):
+        """Kopie mit geänderten Feldern"""
+        return PraxisRecord(**{**{feld: getattr(self, feld) for feld in self.__slots__}, **aenderungen})
+
+    def als_dict(self):
+        return {feld: getattr(self, feld) for feld in (*self.__slots__, *ABGELEITET)}
+
+    # Dict-kompatibler Lesezugriff für bestehenden Code
+    def __getitem__(self, feld):
+        if feld not in FELDER:
+            raise KeyError(feld)
+        return getattr(self, feld)
+
+    def get(self, feld, standard=None):
+        return getattr(self, feld) if feld in FELDER else standard
+
+    def __contains__(self, feld):
+        return feld in FELDER
+
+    def __eq__(self, other):
+        if not isinstance(other, PraxisRecord):
+            return NotImplemented
+        return all(getattr(self, feld) == getattr(other, feld) for feld in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        quelle = 'db' if self.aus_datenbank else 'csv'
+        return f"PraxisRecord({quelle}, id={self.id or self.csv_id}, name={self.name!r}, stadt={self.stadt!r})"
+
+
+def praxis_record_aus_db(praxis, **felder):
+    """PraxisRecord aus einem Praxis-Model (mit Koordinaten) plus weiteren Feldern"""
+    return PraxisRecord(
+        id=praxis.id,
+        name=praxis.name,
+        email=praxis.email or '',
+        telefon=praxis.telefon or '',
+        webseite=praxis.webseite or '',
+        plz=praxis.plz or '',
+        stadt=praxis.stadt or '',
+        straße=praxis.strasse or '',
+        lat=float(praxis.latitude),
+        lng=float(praxis.longitude),
+        slug=praxis.slug,
+        paket=praxis.paket,
+        beansprucht='ja' if praxis.ist_verifiziert else 'nein',
+        **felder
+    )
@@ -0,0 +1,1145 @@
+"""
+Praxis-Snapshot: gemeinsame Datenversion für alle Caches über Praxisdaten.
+
+Die Version setzt sich aus der Änderungszeit der CSV und einem günstigen
+Fingerabdruck der Datenbank (Anzahl + letzte Änderung der Praxen, Anzahl
+bestätigter Bewertungen, Stand des CSV-Overlays) zusammen. Sie wird nur alle
+paar Sekunden neu ermittelt, damit nicht jede Anfrage eine Zusatzabfrage auslöst.
+
+zahnaerzte.csv ist unveränderlich: Übernahmen und andere Änderungen an einzelnen
+Zeilen stehen im Overlay (Tabelle csv_praxis_status) und werden beim Lesen
+darübergelegt, ohne die CSV neu zu parsen.
+"""
+import os
+import re
+import csv
+import time
+import hashlib
+import logging
+import heapq
+import threading
+from array import array
+from collections import defaultdict
+from math import radians, sin, cos, sqrt, atan2, floor
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from models import Praxis, Bewertung, CsvPraxisStatus, Leistung
+from database import db
+from services.praxis_datensatz import SPALTEN, praxis_datensatz, parse_lat_lng
+from services.praxis_record import PraxisRecord
+
+logger = logging.getLogger(__name__)
+
+CSV_DATEI = "zahnaerzte.csv"
+VERSION_PRUEF_INTERVALL = 30  # Sekunden
+
+_version_lock = threading.Lock()
+_version_cache = {'version': None, 'geprueft': 0.0}
+
+
+def _csv_mtime(csv_datei=CSV_DATEI):
+    try:
+        return os.path.getmtime(csv_datei)
+    except OSError:
+        return 0
+
+
+def _db_fingerabdruck():
+    anzahl, letzte_aenderung = db.session.query(func.count(Praxis.id), func.max(Praxis.aktualisiert_am)).one()
+    bewertungen = db.session.query(func.count(Bewertung.id)).filter(Bewertung.bestaetigt == True).scalar()
+    overlay_anzahl, overlay_aenderung = db.session.query(
+        func.count(CsvPraxisStatus.id), func.max(CsvPraxisStatus.aktualisiert_am)
+    ).one()
+    # Leistungen werden beim Speichern gelöscht und neu angelegt: Anzahl + höchste ID erkennen jede Änderung
+    leistungen = db.session.query(func.count(Leistung.id), func.max(Leistung.id)).one()
+    return (
+        anzahl, letzte_aenderung.isoformat() if letzte_aenderung else None, bewertungen,
+        overlay_anzahl, overlay_aenderung.isoformat() if overlay_aenderung else None, tuple(leistungen),
+    )
+
+
+def snapshot_version(erzwingen=False):
+    """
+    Liefert die aktuelle Datenversion des Praxis-Bestands (CSV + Datenbank).
+
+    Args:
+        erzwingen: Version sofort neu ermitteln statt den Zwischenwert zu nutzen
+
+    Returns:
+        Hashbares Tupel, das sich bei jeder relevanten Datenänderung ändert
+    """
+    jetzt = time.monotonic()
+    with _version_lock:
+        if not erzwingen and _version_cache['version'] is not None and jetzt - _version_cache['geprueft'] < VERSION_PRUEF_INTERVALL:
+            return _version_cache['version']
+
+    try:
+        version = (_csv_mtime(), _db_fingerabdruck())
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Snapshot-Version konnte nicht ermittelt werden: {e}")
+        version = (_csv_mtime(), None)
+
+    with _version_lock:
+        _version_cache['version'] = version
+        _version_cache['geprueft'] = jetzt
+    return version
+
+
+def invalidiere_snapshot():
+    """Erzwingt die Neuermittlung der Version beim nächsten Zugriff (z.B. nach CSV-Update)"""
+    with _version_lock:
+        _version_cache['geprueft'] = 0.0
+
+
+# ========================================
+# CSV-BASISDATEN + OVERLAY
+# ========================================
+
+CSV_SCHLUESSEL_LAENGE = 20
+
+_zeilen_cache = {}  # {csv_datei: {"zeilen": [...], "mtime": float}}
+_praxen_cache = {}  # {csv_datei: {"daten": [...], "mtime": float, "status_version": tuple}}
+_status_lock = threading.Lock()
+_status_cache = {'version': None, 'status': {}}
+_versteckt_lock = threading.Lock()
+_versteckt_cache = {'datensatz': None, 'schluessel': frozenset(), 'zeilen': frozenset()}
+
+
+def csv_schluessel(name, plz, strasse):
+    """Stabiler Overlay-Schlüssel einer CSV-Zeile (aus Name, PLZ und Straße der Basisdaten)"""
+    roh = '|'.join(((name or '').strip().lower(), (plz or '').strip(), (strasse or '').strip().lower()))
+    return hashlib.sha1(roh.encode('utf-8')).hexdigest()[:CSV_SCHLUESSEL_LAENGE]
+
+
+def _csv_zeile(idx, name, email, telefon, webseite, plz, stadt, strasse, beansprucht, lat, lng):
+    return PraxisRecord(
+        csv_original_idx=idx,
+        csv_schluessel=csv_schluessel(name, plz, strasse),
+        name=name,
+        email=email,
+        telefon=telefon,
+        webseite=webseite,
+        plz=plz,
+        stadt=stadt,
+        straße=strasse,
+        lat=lat,
+        lng=lng,
+        beansprucht_csv=beansprucht,
+    )
+
+
+def _zeilen_aus_datensatz(datensatz):
+    # Jeder String wird einmal dekodiert; gleiche Werte (Stadt, PLZ, ...) teilen sich ein Objekt
+    texte = datensatz.texte()
+    spalten = [datensatz.spalten[spalte] for spalte in SPALTEN]
+    return [
+        _csv_zeile(idx, *(texte[spalte[idx]] for spalte in spalten), *datensatz.koordinaten(idx))
+        for idx in range(len(datensatz))
+    ]
+
+
+def _zeilen_aus_csv(csv_datei):
+    zeilen = []
+    with open(csv_datei, newline='', encoding='utf-8') as f:
+        for idx, row in enumerate(csv.DictReader(f)):
+            zeilen.append(_csv_zeile(
+                idx,
+                (row.get('name') or '').strip(),
+                row.get('email') or '',
+                row.get('telefon') or '',
+                row.get('webseite') or '',
+                (row.get('plz') or '').strip(),
+                (row.get('stadt') or '').strip(),
+                (row.get('straße') or '').strip(),
+                (row.get('beansprucht') or '').strip().lower(),
+                *parse_lat_lng(row)
+            ))
+    return zeilen
+
+
+def lade_csv_zeilen(csv_datei=CSV_DATEI):
+    """
+    Alle Zeilen der CSV im Suchformat (auch ohne gültige Koordinaten: lat/lng = None),
+    ohne Overlay. Wird nur bei geänderter Datei neu geladen – aus dem gemappten
+    Binär-Datensatz (services/praxis_datensatz.py), falls verfügbar, sonst aus der CSV.
+    """
+    mtime = _csv_mtime(csv_datei)
+    cached = _zeilen_cache.get(csv_datei)
+    if cached and cached["mtime"] == mtime:
+        return cached["zeilen"]
+
+    datensatz = praxis_datensatz(csv_datei)
+    if datensatz is not None:
+        zeilen = _zeilen_aus_datensatz(datensatz)
+    else:
+        zeilen = _zeilen_aus_csv(csv_datei)
+    print(f"{len(zeilen)} CSV-Zeilen geladen ({'Datensatz' if datensatz is not None else 'CSV'}, mtime={mtime})")
+    _zeilen_cache[csv_datei] = {"zeilen": zeilen, "mtime": mtime}
+    return zeilen
+
+
+def csv_status():
+    """
+    Overlay-Zustand aller geänderten CSV-Zeilen; wird nur bei geänderter
+    Snapshot-Version neu gelesen.
+
+    Returns:
+        (version, {schluessel: {'beansprucht', 'email', 'name', 'versteckt'}})
+    """
+    version = snapshot_version()
+    with _status_lock:
+        if _status_cache['version'] == version:
+            return version, _status_cache['status']
+
+    try:
+        status = {
+            row.schluessel: {'beansprucht': bool(row.beansprucht), 'email': row.email, 'name': row.name, 'versteckt': bool(row.versteckt)}
+            for row in db.session.query(
+                CsvPraxisStatus.schluessel, CsvPraxisStatus.beansprucht, CsvPraxisStatus.email,
+                CsvPraxisStatus.name, CsvPraxisStatus.versteckt
+            ).all()
+        }
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"CSV-Overlay konnte nicht geladen werden: {e}")
+        return version, {}
+
+    with _status_lock:
+        _status_cache['version'] = version
+        _status_cache['status'] = status
+    return version, status
+
+
+def aktualisiere_csv_status(schluessel_liste, **felder):
+    """
+    Setzt Overlay-Felder (beansprucht, email, name, versteckt, praxis_id) für CSV-Zeilen.
+    Ein Upsert je Zeile – die CSV wird nicht geschrieben.
+
+    Returns:
+        Anzahl geänderter Zeilen
+    """
+    schluessel_liste = sorted(set(schluessel_liste))
+    if not schluessel_liste:
+        return 0
+
+    for versuch in range(2):
+        vorhanden = {
+            s.schluessel: s
+            for s in CsvPraxisStatus.query.filter(CsvPraxisStatus.schluessel.in_(schluessel_liste)).all()
+        }
+        for schluessel in schluessel_liste:
+            status = vorhanden.get(schluessel) or CsvPraxisStatus(schluessel=schluessel)
+            for feld, wert in felder.items():
+                setattr(status, feld, wert)
+            db.session.add(status)
+        try:
+            db.session.commit()
+            break
+        except IntegrityError:
+            # Gleichzeitig angelegt – beim zweiten Versuch als Update
+            db.session.rollback()
+            if versuch:
+                raise
+
+    invalidiere_snapshot()
+    return len(schluessel_liste)
+
+
+def lade_praxen(csv_datei):
+    """
+    CSV-Praxen mit gültigen Koordinaten im Suchformat, Overlay angewendet.
+
+    Geparst wird nur bei geänderter Datei; nach einer Übernahme wird nur das
+    Overlay neu darübergelegt (geänderte Zeilen als Kopie, ausgeblendete entfernt,
+    alle anderen Einträge werden geteilt).
+    """
+    zeilen = lade_csv_zeilen(csv_datei)
+    mtime = _zeilen_cache[csv_datei]["mtime"]
+    status_version, status = csv_status()
+
+    cached = _praxen_cache.get(csv_datei)
+    if cached and cached["mtime"] == mtime and cached["status_version"] == status_version:
+        return cached["daten"]
+
+    praxen = []
+    for zeile in zeilen:
+        if zeile['lat'] is None:
+            continue
+        zeile = _mit_overlay(zeile, status)
+        if zeile is not None:
+            praxen.append(zeile)
+
+    _praxen_cache[csv_datei] = {"daten": praxen, "mtime": mtime, "status_version": status_version}
+    return praxen
+
+
+def _mit_overlay(zeile, status):
+    """Zeile mit Overlay (geändert als Kopie) oder None, wenn sie ausgeblendet ist"""
+    aenderung = status.get(zeile['csv_schluessel'])
+    if not aenderung:
+        return zeile
+    if aenderung['versteckt']:
+        return None
+    return zeile.mit(name=aenderung['name'] or zeile['name'], email=aenderung['email'] or zeile['email'])
+
+
+def _zeile_aus_datensatz(datensatz, idx):
+    return _csv_zeile(idx, *(datensatz.wert(spalte, idx) for spalte in SPALTEN), *datensatz.koordinaten(idx))
+
+
+def csv_praxis(idx, csv_datei=CSV_DATEI):
+    """
+    Eine CSV-Praxis (Overlay angewendet) über ihre Zeilennummer als PraxisRecord,
+    oder None, wenn es die Zeile nicht gibt, sie keine Koordinaten hat oder
+    ausgeblendet ist. Liest aus dem gemappten Datensatz, ohne alle Zeilen zu laden.
+    """
+    datensatz = praxis_datensatz(csv_datei)
+    if datensatz is None:
+        treffer = [p for p in lade_praxen(csv_datei) if p['csv_original_idx'] == idx]
+        return treffer[0] if treffer else None
+
+    if not 0 <= idx < len(datensatz) or datensatz.koordinaten(idx)[0] is None:
+        return None
+    _, status = csv_status()
+    return _mit_overlay(_zeile_aus_datensatz(datensatz, idx), status)
+
+
+def csv_praxen_im_umkreis(lat, lng, radius_km, csv_datei=CSV_DATEI):
+    """
+    CSV-Praxen im Umkreis als PraxisRecords (Overlay angewendet, mit Entfernung).
+
+    Nutzt das Raster des gemappten Datensatzes: gelesen und dekodiert werden nur
+    Zeilen in der Nähe, kein Worker muss alle Praxen im Speicher halten.
+    Die Liste gehört dem Aufrufer und darf verändert werden.
+    """
+    datensatz = praxis_datensatz(csv_datei)
+    if datensatz is None:
+        treffer = []
+        for praxis in lade_praxen(csv_datei):
+            distanz = round(_distanz_km(lat, lng, praxis['lat'], praxis['lng']), 1)
+            if distanz <= radius_km:
+                treffer.append(praxis.mit(entfernung=distanz))
+        return treffer
+
+    _, status = csv_status()
+    treffer = []
+    # Entfernungen werden wie in den Routen auf 100 m gerundet verglichen
+    for idx, distanz in datensatz.im_umkreis(lat, lng, radius_km + 0.05):
+        distanz = round(distanz, 1)
+        if distanz > radius_km:
+            continue
+        zeile = _mit_overlay(_zeile_aus_datensatz(datensatz, idx), status)
+        if zeile is not None:
+            treffer.append(zeile.mit(entfernung=distanz))
+    treffer.sort(key=lambda p: p['csv_original_idx'])
+    return treffer
+
+
+def _versteckte_zeilen(datensatz, status):
+    """Zeilennummern der per Overlay ausgeblendeten Praxen (neu ermittelt, wenn sich Datensatz oder Menge ändern)"""
+    schluessel = frozenset(s for s, aenderung in status.items() if aenderung['versteckt'])
+    if not schluessel:
+        return frozenset()
+    with _versteckt_lock:
+        if _versteckt_cache['datensatz'] is datensatz and _versteckt_cache['schluessel'] == schluessel:
+            return _versteckt_cache['zeilen']
+
+    zeilen = frozenset(
+        idx for idx in range(len(datensatz))
+        if csv_schluessel(datensatz.wert('name', idx), datensatz.wert('plz', idx), datensatz.wert('straße', idx)) in schluessel
+    )
+    with _versteckt_lock:
+        _versteckt_cache.update(datensatz=datensatz, schluessel=schluessel, zeilen=zeilen)
+    return zeilen
+
+
+def csv_treffer_im_umkreis(lat, lng, radius_km, csv_datei=CSV_DATEI):
+    """
+    Sichtbare CSV-Praxen im Umkreis als [(entfernung, zeile)], sortiert nach
+    Entfernung und Zeilennummer – ohne PraxisRecords zu bauen. Für die Suche,
+    die nur die Einträge bis zur angefragten Seite braucht (csv_praxis_mit_entfernung).
+
+    Returns:
+        Liste oder None, wenn der gemappte Datensatz nicht verfügbar ist
+    """
+    datensatz = praxis_datensatz(csv_datei)
+    if datensatz is None:
+        return None
+
+    _, status = csv_status()
+    versteckt = _versteckte_zeilen(datensatz, status)
+    treffer = []
+    for idx, distanz in datensatz.im_umkreis(lat, lng, radius_km + 0.05):
+        distanz = round(distanz, 1)
+        if distanz <= radius_km and idx not in versteckt:
+            treffer.append((distanz, idx))
+    treffer.sort()
+    return treffer
+
+
+def csv_praxis_mit_entfernung(idx, entfernung, csv_datei=CSV_DATEI):
+    """PraxisRecord (Overlay angewendet) zu einem Eintrag aus csv_treffer_im_umkreis"""
+    _, status = csv_status()
+    zeile = _mit_overlay(_zeile_aus_datensatz(praxis_datensatz(csv_datei), idx), status)
+    return zeile.mit(entfernung=entfernung)
+
+
+# ========================================
+# STADT-MATCHER (Standorterkennung im Chatbot)
+# ========================================
+
+# Wörter, die auch Ortsnamen sind – werden ohne Präposition ("in", "bei", ...) nicht als Stadt erkannt
+MEHRDEUTIGE_WOERTER = {'essen', 'weil', 'bad', 'au', 'berg', 'wald', 'horn', 'lage', 'ort', 'mark', 'zell', 'rain', 'wehr'}
+
+ORTS_PRAEPOSITIONEN = {'in', 'aus', 'bei', 'nach', 'wohne', 'lebe', 'komme'}
+NAEHE_WOERTER = {'nähe', 'naehe', 'nahe'}
+
+_TOKEN_RE = re.compile(r"[a-zäöüß]+")
+
+
+def _tokens(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _ascii_variante(text):
+    return text.replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue').replace('ß', 'ss')
+
+
+class StadtMatcher:
+    """
+    Token-Trie über alle bekannten Städtenamen mit Abbildung auf den kanonischen Namen.
+
+    `finde()` läuft einmal linear über die Tokens der Nachricht und bevorzugt
+    wie bisher Treffer nach "Nähe (von)", dann nach Präpositionen ("in Köln"),
+    dann freie Erwähnungen. Frei erwähnt werden nur Städte aus `staedte` erkannt;
+    Namen aus `nur_nach_praeposition` (die vielen kleinen Orte der CSV wie Meine,
+    Senden, Halle, Weiden) sind oft gewöhnliche Wörter und zählen nur nach
+    "Nähe" oder einer Präposition.
+    """
+
+    _ENDE = object()
+
+    def __init__(self, staedte, nur_nach_praeposition=()):
+        """
+        Args:
+            staedte: Iterable kanonischer Städtenamen, in absteigender Priorität
+                     (der erste Name gewinnt bei gleicher Schreibweise)
+            nur_nach_praeposition: weitere Namen (niedrigste Priorität), die nicht
+                     frei im Text erkannt werden
+        """
+        self._trie = {}
+        self.anzahl = 0
+        for frei, namen in ((True, staedte), (False, nur_nach_praeposition)):
+            for name in namen:
+                name = (name or '').strip()
+                if not name:
+                    continue
+                for tokens in {tuple(_tokens(name)), tuple(_tokens(_ascii_variante(name.lower())))}:
+                    if tokens and self._fuege_ein(tokens, (name, frei)):
+                        self.anzahl += 1
+
+    def _fuege_ein(self, tokens, eintrag):
+        knoten = self._trie
+        for token in tokens:
+            knoten = knoten.setdefault(token, {})
+        if self._ENDE in knoten:
+            return False
+        knoten[self._ENDE] = eintrag
+        return True
+
+    def finde(self, text):
+        """
+        Sucht den Standort in einem Text.
+
+        Returns:
+            Kanonischer Städtename oder None
+        """
+        tokens = _tokens(text or '')
+        bester = None  # (prioritaet, position, name)
+        for i in range(len(tokens)):
+            if tokens[i] not in self._trie:
+                continue
+
+            vorher = tokens[i - 1] if i >= 1 else ''
+            vorvorher = tokens[i - 2] if i >= 2 else ''
+            if vorher in NAEHE_WOERTER or (vorher == 'von' and vorvorher in NAEHE_WOERTER):
+                prioritaet = 0
+            elif vorher in ORTS_PRAEPOSITIONEN:
+                prioritaet = 1
+            elif tokens[i] in MEHRDEUTIGE_WOERTER:
+                continue
+            else:
+                prioritaet = 2
+
+            # Längster Name ab Position i, der bei dieser Priorität zählt
+            knoten = self._trie
+            treffer = None
+            for token in tokens[i:]:
+                knoten = knoten.get(token)
+                if knoten is None:
+                    break
+                name, frei = knoten.get(self._ENDE, (None, False))
+                if name is not None and (frei or prioritaet < 2):
+                    treffer = name
+            if treffer is None:
+                continue
+
+            if bester is None or prioritaet < bester[0]:
+                bester = (prioritaet, i, treffer)
+                if prioritaet == 0:
+                    break
+        return bester[2] if bester else None
+
+
+_matcher_lock = threading.Lock()
+_matcher_cache = {'version': None, 'matcher': None}
+
+
+def _baue_stadt_matcher():
+    from leistungen_config import SEO_STAEDTE
+
+    db_staedte = [s for (s,) in db.session.query(Praxis.stadt).distinct().all() if s]
+    # Städtenamen direkt aus der Stadt-Spalte des gemappten Datensatzes, ohne alle Zeilen zu bauen
+    datensatz = praxis_datensatz(CSV_DATEI)
+    if datensatz is not None:
+        csv_werte = datensatz.eindeutige_werte('stadt')
+    else:
+        csv_werte = (p['stadt'] for p in lade_praxen(CSV_DATEI))
+    csv_staedte = sorted({s.strip() for s in csv_werte if s and s.strip()})
+    # Reihenfolge = Priorität der Schreibweise: Datenbank vor SEO-Liste vor CSV;
+    # Orte, die nur in der CSV stehen, zählen nur nach einer Präposition
+    matcher = StadtMatcher(db_staedte + list(SEO_STAEDTE), nur_nach_praeposition=csv_staedte)
+    logger.info(f"Stadt-Matcher aufgebaut: {matcher.anzahl} Namensvarianten")
+    return matcher
+
+
+def stadt_matcher():
+    """Liefert den Stadt-Matcher; wird nur bei geänderter Snapshot-Version neu aufgebaut"""
+    version = snapshot_version()
+    with _matcher_lock:
+        if _matcher_cache['matcher'] is None or _matcher_cache['version'] != version:
+            _matcher_cache['matcher'] = _baue_stadt_matcher()
+            _matcher_cache['version'] = version
+        return _matcher_cache['matcher']
+
+
+# ========================================
+# KANDIDATEN-INDEX (Top-k-Praxissuche für den Chatbot)
+# ========================================
+
+GRID_GRAD = 0.1  # Kantenlänge einer Rasterzelle in Grad (ca. 11 x 7 km)
+KM_PRO_GRAD_BREITE = 111.0
+
+# Filter-Schlüssel (wie vom Chat-Frontend gesendet, plus Kurzformen) -> Bit im Merkmal-Bitset
+MERKMAL_BITS = {
+    'angstpatienten': 1, 'angst': 1,
+    'kinder': 2,
+    'barrierefrei': 4,
+    'abendsprechstunde': 8, 'abend': 8,
+    'samstag': 16,
+}
+
+PAKET_PRIO = {'premiumplus': 1, 'premium': 2, 'basis': 3, 'basic': 3}
+
+
+def _distanz_km(lat1, lon1, lat2, lon2):
+    """Haversine-Distanz in Kilometern"""
+    delta_lat = radians(lat2 - lat1)
+    delta_lon = radians(lon2 - lon1)
+    a = sin(delta_lat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(delta_lon / 2) ** 2
+    return 6371 * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+
+def _merkmal_maske(filter_dict):
+    maske = 0
+    for schluessel, aktiv in (filter_dict or {}).items():
+        if aktiv:
+            maske |= MERKMAL_BITS.get(schluessel, 0)
+    return maske
+
+
+class PraxisIndex:
+    """
+    Kompakter Suchindex über Datenbank- und CSV-Praxen.
+
+    Jede Praxis ist ein Tupel (rang, lat, lng, merkmale, quelle, daten). Der Umkreis
+    wird über ein Grad-Raster abgefragt, die besten k Treffer per Heap ausgewählt –
+    es entsteht keine sortierte Gesamtliste und nur die k Ergebnis-Dicts werden gebaut.
+
+    CSV-Praxen liegen nicht im Index, wenn der gemappte Datensatz verfügbar ist:
+    Umkreis und Städtenamen werden dann direkt im Datensatz (Raster bzw.
+    Stadt-Spalte) nachgeschlagen, Daten ist die Zeilennummer, und erst die k
+    Ergebnisse werden gelesen (csv_praxis). So baut kein Worker alle CSV-Zeilen.
+    """
+
+    def __init__(self, db_praxen, csv_praxen=(), datensatz=None, versteckt=frozenset()):
+        """
+        Args:
+            db_praxen: Dicts im Ausgabeformat (inkl. latitude/longitude) aus der Datenbank
+            csv_praxen: Einträge aus lade_praxen() (werden nur referenziert, nicht kopiert),
+                        nur ohne gemappten Datensatz
+            datensatz: gemappter PraxisDatensatz für die CSV-Praxen
+            versteckt: per Overlay ausgeblendete Zeilen des Datensatzes
+        """
+        self._zellen = defaultdict(list)
+        self._nach_stadt = defaultdict(list)
+        self.anzahl = 0
+
+        for p in db_praxen:
+            paket = (p['paket'] or 'basic').lower()
+            merkmale = (
+                (1 if p['angstpatientenfreundlich'] else 0)
+                | (2 if p['kinderfreundlich'] else 0)
+                | (4 if p['barrierefrei'] else 0)
+                | (8 if p['abendsprechstunde'] else 0)
+                | (16 if p['samstagssprechstunde'] else 0)
+            )
+            rang = (PAKET_PRIO.get(paket, 4), -1 if p.pop('ist_verifiziert') else 0, self.anzahl)
+            self._fuege_ein((rang, p.pop('latitude'), p.pop('longitude'), merkmale, 'db', p), p['stadt'])
+
+        for p in csv_praxen:
+            # CSV-Praxen haben keine Merkmal-Angaben (None) und werden – wie bisher – nicht gefiltert
+            self._fuege_ein(((3, 0, self.anzahl), p.get('lat'), p.get('lng'), None, 'csv', p), p.get('stadt'))
+
+        self._datensatz_csv = datensatz
+        self._versteckt = versteckt
+        self._erste_csv_nummer = self.anzahl
+        if datensatz is not None:
+            # Stadtname (klein) -> Zeilennummern mit Koordinaten als array('I') statt Einträgen je Zeile
+            zeilen_je_sid = defaultdict(lambda: array('I'))
+            for zeile, sid in enumerate(datensatz.spalten['stadt']):
+                if datensatz.koordinaten(zeile)[0] is not None:
+                    zeilen_je_sid[sid].append(zeile)
+            self._csv_staedte = defaultdict(list)
+            for sid, zeilen in zeilen_je_sid.items():
+                name = datensatz.text(sid).strip().lower()
+                if name:
+                    self._csv_staedte[name].append(zeilen)
+            self.anzahl += len(datensatz)
+
+    def _csv_eintrag(self, zeile):
+        lat, lng = self._datensatz_csv.koordinaten(zeile)
+        return ((3, 0, self._erste_csv_nummer + zeile), lat, lng, None, 'csv', zeile)
+
+    def _fuege_ein(self, eintrag, stadt):
+        lat, lng = eintrag[1], eintrag[2]
+        if lat is not None and lng is not None:
+            self._zellen[(floor(lat / GRID_GRAD), floor(lng / GRID_GRAD))].append(eintrag)
+        stadt = (stadt or '').strip().lower()
+        if stadt:
+            self._nach_stadt[stadt].append(eintrag)
+        self.anzahl += 1
+
+    def _im_umkreis(self, lat, lng, radius_km):
+        delta_lat = radius_km / KM_PRO_GRAD_BREITE
+        delta_lng = radius_km / (KM_PRO_GRAD_BREITE * max(cos(radians(lat)), 0.01))
+        for i in range(floor((lat - delta_lat) / GRID_GRAD), floor((lat + delta_lat) / GRID_GRAD) + 1):
+            for j in range(floor((lng - delta_lng) / GRID_GRAD), floor((lng + delta_lng) / GRID_GRAD) + 1):
+                for eintrag in self._zellen.get((i, j), ()):
+                    if abs(eintrag[1] - lat) > delta_lat or abs(eintrag[2] - lng) > delta_lng:
+                        continue
+                    distanz = _distanz_km(lat, lng, eintrag[1], eintrag[2])
+                    if distanz <= radius_km:
+                        yield eintrag, distanz
+        if self._datensatz_csv is not None:
+            for zeile, distanz in self._datensatz_csv.im_umkreis(lat, lng, radius_km):
+                if zeile not in self._versteckt:
+                    yield self._csv_eintrag(zeile), distanz
+
+    def _in_stadt(self, stadt):
+        stadt = stadt.strip().lower()
+        for name, eintraege in self._nach_stadt.items():
+            if stadt in name or name in stadt:
+                for eintrag in eintraege:
+                    yield eintrag, 0
+        if self._datensatz_csv is not None:
+            for name, zeilen_listen in self._csv_staedte.items():
+                if stadt in name or name in stadt:
+                    for zeilen in zeilen_listen:
+                        for zeile in zeilen:
+                            if zeile not in self._versteckt:
+                                yield self._csv_eintrag(zeile), 0
+
+    def top_k(self, k=10, lat=None, lng=None, stadt=None, filter=None, radius_km=25):
+        """
+        Liefert die k besten Praxen (Paket > verifiziert > Entfernung).
+
+        Mit Koordinaten wird im Umkreis gesucht, sonst über den Städtenamen.
+
+        Args:
+            k: Anzahl Ergebnisse
+            lat, lng: Suchmittelpunkt (optional)
+            stadt: Städtename für die Suche ohne Koordinaten
+            filter: Dict mit Merkmal-Filtern (angstpatienten/angst, kinder, barrierefrei,
+                    abendsprechstunde/abend, samstag)
+            radius_km: Umkreis in km
+
+        Returns:
+            Liste kompakter Praxis-Dicts für den Prompt
+        """
+        if lat is not None and lng is not None:
+            kandidaten = self._im_umkreis(lat, lng, radius_km)
+        elif stadt:
+            kandidaten = self._in_stadt(stadt)
+        else:
+            return []
+
+        maske = _merkmal_maske(filter)
+        if maske:
+            kandidaten = (
+                (eintrag, distanz) for eintrag, distanz in kandidaten
+                if eintrag[3] is None or eintrag[3] & maske == maske
+            )
+
+        beste = heapq.nsmallest(k, kandidaten, key=lambda t: (t[0][0][0], t[0][0][1], t[1], t[0][0][2]))
+        return [p for p in (self._datensatz(eintrag) for eintrag, _ in beste) if p is not None]
+
+    @staticmethod
+    def _datensatz(eintrag):
+        quelle, daten = eintrag[4], eintrag[5]
+        if quelle == 'db':
+            return dict(daten)
+        if isinstance(daten, int):
+            # Zeilennummer im gemappten Datensatz – Eintrag erst jetzt lesen (Overlay angewendet)
+            daten = csv_praxis(daten)
+            if daten is None:
+                return None
+        return {
+            'name': daten.get('name', ''),
+            'strasse': daten.get('straße', ''),
+            'plz': daten.get('plz', ''),
+            'stadt': daten.get('stadt', ''),
+            'telefon': daten.get('telefon', ''),
+            'paket': 'basis',
+            'leistungsschwerpunkte': daten.get('leistungsschwerpunkte', ''),
+            'angstpatientenfreundlich': False,
+            'kinderfreundlich': False,
+            'barrierefrei': False,
+            'abendsprechstunde': False,
+            'samstagssprechstunde': False,
+            'sprachen': '',
+            'slug': None,
+            'quelle': 'csv',
+            'bewertung_avg': 0,
+            'bewertung_anzahl': 0,
+            'google_rating': None,
+            'google_review_count': 0,
+        }
+
+
+_index_lock = threading.Lock()
+_index_cache = {'version': None, 'index': None}
+
+
+def _baue_praxis_index():
+    bewertungen = {
+        praxis_id: (round(float(avg), 1), int(anzahl))
+        for praxis_id, avg, anzahl in db.session.query(
+            Bewertung.praxis_id, func.avg(Bewertung.sterne), func.count(Bewertung.id)
+        ).filter(Bewertung.bestaetigt == True).group_by(Bewertung.praxis_id).all()
+    }
+
+    spalten = (
+        Praxis.id, Praxis.name, Praxis.strasse, Praxis.plz, Praxis.stadt, Praxis.telefon, Praxis.paket,
+        Praxis.leistungsschwerpunkte, Praxis.angstpatientenfreundlich, Praxis.kinderfreundlich,
+        Praxis.barrierefrei, Praxis.abendsprechstunde, Praxis.samstagssprechstunde, Praxis.sprachen,
+        Praxis.slug, Praxis.ist_verifiziert, Praxis.google_rating, Praxis.google_review_count,
+        Praxis.latitude, Praxis.longitude,
+    )
+    db_praxen = []
+    for row in db.session.query(*spalten).filter(Praxis.ist_demo != True).all():
+        bew_avg, bew_anzahl = bewertungen.get(row.id, (0, 0))
+        db_praxen.append({
+            'name': row.name,
+            'strasse': row.strasse,
+            'plz': row.plz,
+            'stadt': row.stadt,
+            'telefon': row.telefon,
+            'paket': row.paket or 'basic',
+            'leistungsschwerpunkte': row.leistungsschwerpunkte,
+            'angstpatientenfreundlich': row.angstpatientenfreundlich,
+            'kinderfreundlich': row.kinderfreundlich,
+            'barrierefrei': row.barrierefrei,
+            'abendsprechstunde': row.abendsprechstunde,
+            'samstagssprechstunde': row.samstagssprechstunde,
+            'sprachen': row.sprachen,
+            'slug': row.slug,
+            'quelle': 'db',
+            'bewertung_avg': bew_avg,
+            'bewertung_anzahl': bew_anzahl,
+            'google_rating': row.google_rating,
+            'google_review_count': row.google_review_count or 0,
+            'ist_verifiziert': row.ist_verifiziert,
+            'latitude': row.latitude,
+            'longitude': row.longitude,
+        })
+
+    datensatz = praxis_datensatz(CSV_DATEI)
+    if datensatz is not None:
+        _, status = csv_status()
+        index = PraxisIndex(db_praxen, datensatz=datensatz, versteckt=_versteckte_zeilen(datensatz, status))
+    else:
+        try:
+            csv_praxen = lade_praxen(CSV_DATEI)
+        except Exception as e:
+            logger.warning(f"CSV-Praxen laden fehlgeschlagen: {e}")
+            csv_praxen = []
+        index = PraxisIndex(db_praxen, csv_praxen)
+    logger.info(f"Praxis-Index aufgebaut: {index.anzahl} Praxen ({len(db_praxen)} aus der Datenbank)")
+    return index
+
+
+def praxis_index():
+    """Liefert den Praxis-Index; wird nur bei geänderter Snapshot-Version neu aufgebaut"""
+    version = snapshot_version()
+    with _index_lock:
+        if _index_cache['index'] is None or _index_cache['version'] != version:
+            _index_cache['index'] = _baue_praxis_index()
+            _index_cache['version'] = version
+        return _index_cache['index']
+
+
+def finde_praxis_kandidaten(lat=None, lng=None, stadt=None, filter=None, radius_km=25, k=10):
+    """
+    Top-k-Praxissuche über den aktuellen Snapshot (Chatbot-Shortlist).
+
+    Returns:
+        Liste mit höchstens k kompakten Praxis-Dicts
+    """
+    return praxis_index().top_k(k=k, lat=lat, lng=lng, stadt=stadt, filter=filter, radius_km=radius_km)
+
+
+# ========================================
+# LEISTUNGS-INDEX (Ranking auf /<leistung>-<stadt>)
+# ========================================
+
+# Slug aus leistungen_config -> Begriffe (kleingeschrieben, Umlaute ausgeschrieben), an denen
+# die Leistung in Leistungsschwerpunkten oder Leistungs-Titeln erkannt wird. Enthält auch die
+# abweichenden Slugs der Dashboard-Auswahl (z.B. 'endodontie', 'prothetik').
+LEISTUNGS_BEGRIFFE = {
+    'implantologie': ('implantologie',),
+    'kieferorthopaedie': ('kieferorthopaedie',),
+    'prophylaxe': ('prophylaxe',),
+    'parodontologie': ('parodontologie',),
+    'wurzelbehandlung': ('wurzelbehandlung', 'endodontie'),
+    'zahnersatz': ('zahnersatz', 'prothetik'),
+    'aesthetik': ('aesthetik', 'aesthetische'),
+    'kinderzahnheilkunde': ('kinderzahnheilkunde',),
+    'oralchirurgie': ('oralchirurgie',),
+    'angstpatienten': ('angstpatienten',),
+}
+
+
+class LeistungsIndex:
+    """
+    Invertierter Index Leistungs-Slug -> Bitmap der Praxis-IDs (Bit n = Praxis n).
+
+    Aufgebaut aus Praxis.leistungsschwerpunkte und den Leistung-Einträgen der
+    Landingpage. CSV-Praxen haben keine Leistungen und kommen nicht vor.
+    """
+
+    def __init__(self, texte):
+        """
+        Args:
+            texte: {praxis_id: Text mit allen Leistungen der Praxis}
+        """
+        self._texte = {praxis_id: _ascii_variante(text.lower()) for praxis_id, text in texte.items()}
+        self._bitmaps = {slug: self._baue_bitmap(begriffe) for slug, begriffe in LEISTUNGS_BEGRIFFE.items()}
+
+    def _baue_bitmap(self, begriffe):
+        bitmap = 0
+        for praxis_id, text in self._texte.items():
+            if any(begriff in text for begriff in begriffe):
+                bitmap |= 1 << praxis_id
+        return bitmap
+
+    def bitmap(self, leistung):
+        """Bitmap der Praxen mit dieser Leistung (unbekannte Slugs werden als Begriff gesucht)"""
+        if leistung not in self._bitmaps:
+            self._bitmaps[leistung] = self._baue_bitmap((_ascii_variante(leistung.lower()),))
+        return self._bitmaps[leistung]
+
+    def praxis_ids(self, leistung):
+        bitmap = self.bitmap(leistung)
+        return [praxis_id for praxis_id in self._texte if bitmap >> praxis_id & 1]
+
+
+def id_bitmap(praxis_ids):
+    """Bitmap aus Praxis-IDs, z.B. der Kandidaten im Umkreis (zum Schneiden mit LeistungsIndex.bitmap)"""
+    bitmap = 0
+    for praxis_id in praxis_ids:
+        bitmap |= 1 << praxis_id
+    return bitmap
+
+
+_leistungs_index_lock = threading.Lock()
+_leistungs_index_cache = {'version': None, 'index': None}
+
+
+def _baue_leistungs_index():
+    texte = defaultdict(list)
+    for praxis_id, schwerpunkte in db.session.query(Praxis.id, Praxis.leistungsschwerpunkte).filter(
+        Praxis.leistungsschwerpunkte.isnot(None)
+    ).all():
+        texte[praxis_id].append(schwerpunkte)
+    for praxis_id, titel in db.session.query(Leistung.praxis_id, Leistung.titel).all():
+        texte[praxis_id].append(titel)
+    return LeistungsIndex({praxis_id: ' | '.join(teile) for praxis_id, teile in texte.items()})
+
+
+def leistungs_index():
+    """Liefert den Leistungs-Index; wird nur bei geänderter Snapshot-Version neu aufgebaut"""
+    version = snapshot_version()
+    with _leistungs_index_lock:
+        if _leistungs_index_cache['index'] is None or _leistungs_index_cache['version'] != version:
+            _leistungs_index_cache['index'] = _baue_leistungs_index()
+            _leistungs_index_cache['version'] = version
+        return _leistungs_index_cache['index']
+
+
+# ========================================
+# ADRESS-/DOMAIN-INDEX (Duplikat- und Claim-Erkennung bei der Registrierung)
+# ========================================
+
+_HAUSNUMMER_RE = re.compile(r'\s*\d+[\s\-/]*\d*\s*[a-zA-Z]?\s*$')
+_LEERZEICHEN_RE = re.compile(r'\s+')
+_PROTOKOLL_RE = re.compile(r'^https?://')
+_WWW_RE = re.compile(r'^www\.')
+
+
+def normalisiere_strasse(s):
+    """Straßenname ohne Hausnummer extrahieren und normalisieren"""
+    s = (s or '').strip().lower()
+    s = _HAUSNUMMER_RE.sub('', s)
+    s = _LEERZEICHEN_RE.sub(' ', s).strip()
+    return s.replace('str.', 'straße').replace('strasse', 'straße')
+
+
+def extrahiere_domain(url):
+    """Extrahiert die Domain aus einer URL (ohne Protokoll/www)"""
+    if not url:
+        return ""
+    url = _PROTOKOLL_RE.sub('', url.strip().lower())
+    url = _WWW_RE.sub('', url)
+    return url.split('/')[0].strip()
+
+
+def staedte_passen(stadt1, stadt2):
+    """Prüft ob zwei Städte übereinstimmen (mit/ohne Stadtteil nach Bindestrich)"""
+    s1 = (stadt1 or '').strip().lower()
+    s2 = (stadt2 or '').strip().lower()
+    if s1 == s2:
+        return True
+    base1 = s1.split('-')[0].strip()
+    base2 = s2.split('-')[0].strip()
+    return base1 == s2 or base2 == s1 or base1 == base2
+
+
+class AdressIndex:
+    """
+    Nachschlage-Index über alle CSV- und Datenbank-Praxen.
+
+    Schlüssel sind (PLZ, normalisierte Straße) und die Web-Domain. Pro Schlüssel
+    liegen die Einträge in Prioritätsreihenfolge: CSV-Zeilen in Dateireihenfolge,
+    danach Datenbank-Praxen – so wie die frühere zeilenweise Suche sie gefunden hat.
+    Einträge sind Dicts mit quelle ('csv'/'db'), name, strasse, plz, stadt, webseite,
+    beansprucht; CSV-Einträge zusätzlich schluessel, zeile, lat/lng (oder None), telefon.
+
+    Der CSV-Teil wird nur bei geänderter Datei neu aufgebaut; der Zustand aus dem
+    Overlay (CsvPraxisStatus) wird erst beim Nachschlagen darübergelegt.
+    """
+
+    def __init__(self, csv_teil, db_praxen, status):
+        self._csv_zeile, self._csv_adressen, self._csv_domains = csv_teil
+        self._status = status
+        self._db_adressen = defaultdict(list)
+        self._db_domains = defaultdict(list)
+        for eintrag in db_praxen:
+            adresse = _adress_schluessel(eintrag['plz'], eintrag['strasse'])
+            if adresse:
+                self._db_adressen[adresse].append(eintrag)
+            domain = extrahiere_domain(eintrag['webseite'])
+            if domain:
+                self._db_domains[domain].append(eintrag)
+
+    def _csv_eintrag(self, idx):
+        zeile = self._csv_zeile(idx)
+        eintrag = {
+            'quelle': 'csv',
+            'schluessel': zeile['csv_schluessel'],
+            'zeile': idx,
+            'name': zeile['name'],
+            'strasse': zeile['straße'],
+            'plz': zeile['plz'],
+            'stadt': zeile['stadt'],
+            'webseite': zeile['webseite'],
+            'beansprucht': zeile['beansprucht_csv'],
+            'lat': zeile['lat'],
+            'lng': zeile['lng'],
+            'telefon': zeile['telefon'],
+        }
+        status = self._status.get(eintrag['schluessel'])
+        if status:
+            eintrag['beansprucht'] = 'ja' if status['beansprucht'] else eintrag['beansprucht']
+            eintrag['name'] = status['name'] or eintrag['name']
+        return eintrag
+
+    def _treffer(self, csv_zeilen, db_eintraege, quelle):
+        if quelle != 'db':
+            for idx in csv_zeilen:
+                yield self._csv_eintrag(idx)
+        if quelle != 'csv':
+            yield from db_eintraege
+
+    def alle_adresse(self, plz, strasse, quelle=None):
+        """Alle Einträge mit gleicher PLZ und Straße (ohne Hausnummer)"""
+        schluessel = _adress_schluessel(plz, strasse)
+        return list(self._treffer(self._csv_adressen.get(schluessel, ()), self._db_adressen.get(schluessel, ()), quelle))
+
+    def alle_genaue_adresse(self, plz, strasse, stadt=None, quelle='csv'):
+        """Alle Einträge mit exakt gleicher Straße (inkl. Hausnummer, ohne Groß-/Kleinschreibung)"""
+        strasse_lower = (strasse or '').strip().lower()
+        stadt_lower = (stadt or '').strip().lower()
+        return [
+            e for e in self.alle_adresse(plz, strasse, quelle)
+            if e['strasse'].strip().lower() == strasse_lower
+            and (stadt is None or e['stadt'].strip().lower() == stadt_lower)
+        ]
+
+    def alle_domain(self, url, quelle=None):
+        """Alle Einträge mit gleicher Web-Domain"""
+        domain = extrahiere_domain(url)
+        if not domain:
+            return []
+        return list(self._treffer(self._csv_domains.get(domain, ()), self._db_domains.get(domain, ()), quelle))
+
+    def finde_adresse(self, plz, strasse, stadt=None, quelle=None):
+        """Erster Eintrag mit gleicher PLZ und Straße (ohne Hausnummer), optional gleicher Stadt"""
+        for eintrag in self.alle_adresse(plz, strasse, quelle):
+            if stadt is None or staedte_passen(eintrag['stadt'], stadt):
+                return eintrag
+        return None
+
+    def finde_genaue_adresse(self, plz, strasse, stadt=None, quelle='csv'):
+        treffer = self.alle_genaue_adresse(plz, strasse, stadt, quelle)
+        return treffer[0] if treffer else None
+
+    def finde_domain(self, url, quelle=None):
+        treffer = self.alle_domain(url, quelle)
+        return treffer[0] if treffer else None
+
+
+def _adress_schluessel(plz, strasse):
+    plz = (plz or '').strip()
+    strasse = normalisiere_strasse(strasse)
+    return (plz, strasse) if plz and strasse else None
+
+
+_csv_teil_cache = {'mtime': None, 'teil': None}
+_adress_index_lock = threading.Lock()
+_adress_index_cache = {'version': None, 'index': None, 'geprueft': 0.0}
+
+
+def _csv_adress_teil():
+    """
+    CSV-Teil des Adress-Index (zeile(idx), {adresse: [zeile, ...]}, {domain: [zeile, ...]});
+    die Schlüssel zeigen nur auf Zeilennummern, Einträge entstehen erst beim Nachschlagen.
+    Mit gemapptem Datensatz werden dafür nur PLZ, Straße und Webseite gelesen und die
+    Zeilen bei Bedarf einzeln gebaut. Nur bei Dateiänderung neu.
+    """
+    mtime = _csv_mtime()
+    if _csv_teil_cache['teil'] is not None and _csv_teil_cache['mtime'] == mtime:
+        return _csv_teil_cache['teil']
+
+    datensatz = praxis_datensatz()
+    if datensatz is not None:
+        text = datensatz.text
+        spalten = (datensatz.spalten['plz'], datensatz.spalten['straße'], datensatz.spalten['webseite'])
+        werte = ((text(plz), text(strasse), text(webseite)) for plz, strasse, webseite in zip(*spalten))
+        zeile = lambda idx: _zeile_aus_datensatz(datensatz, idx)
+    else:
+        zeilen = lade_csv_zeilen()
+        werte = ((z['plz'], z['straße'], z['webseite']) for z in zeilen)
+        zeile = zeilen.__getitem__
+
+    adressen = defaultdict(list)
+    domains = defaultdict(list)
+    for idx, (plz, strasse, webseite) in enumerate(werte):
+        adresse = _adress_schluessel(plz, strasse)
+        if adresse:
+            adressen[adresse].append(idx)
+        domain = extrahiere_domain(webseite)
+        if domain:
+            domains[domain].append(idx)
+
+    _csv_teil_cache['teil'] = (zeile, dict(adressen), dict(domains))
+    _csv_teil_cache['mtime'] = mtime
+    return _csv_teil_cache['teil']
+
+
+def _adress_version():
+    """
+    Version der Daten im Adress-Index: CSV-Datei, Praxis-Tabelle und Overlay.
+    Bewertungen und Leistungen gehören nicht dazu; eine Abfrage (Skalar-Subqueries).
+    """
+    try:
+        fingerabdruck = db.session.query(
+            db.session.query(func.count(Praxis.id)).scalar_subquery(),
+            db.session.query(func.max(Praxis.aktualisiert_am)).scalar_subquery(),
+            db.session.query(func.count(CsvPraxisStatus.id)).scalar_subquery(),
+            db.session.query(func.max(CsvPraxisStatus.aktualisiert_am)).scalar_subquery(),
+        ).one()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Adress-Index-Version konnte nicht ermittelt werden: {e}")
+        fingerabdruck = None
+    return _csv_mtime(), tuple(fingerabdruck) if fingerabdruck else None
+
+
+def _baue_adress_index():
+    db_praxen = [
+        {
+            'quelle': 'db',
+            'praxis_id': row.id,
+            'name': row.name or '',
+            'strasse': row.strasse or '',
+            'plz': row.plz or '',
+            'stadt': row.stadt or '',
+            'webseite': row.webseite or '',
+            # Praxen in der Datenbank gelten immer als beansprucht
+            'beansprucht': 'ja',
+        }
+        for row in db.session.query(Praxis.id, Praxis.name, Praxis.strasse, Praxis.plz, Praxis.stadt, Praxis.webseite).all()
+    ]
+    # Overlay frisch lesen: csv_status() hängt sonst bis zu VERSION_PRUEF_INTERVALL hinterher
+    invalidiere_snapshot()
+    _, status = csv_status()
+    index = AdressIndex(_csv_adress_teil(), db_praxen, status)
+    logger.info(f"Adress-Index aufgebaut: {len(db_praxen)} Datenbank-Praxen, {len(status)} CSV-Overlay-Einträge")
+    return index
+
+
+def adress_index(aktuell=False):
+    """
+    Liefert den Adress-/Domain-Index; wird nur neu aufgebaut, wenn sich CSV-Datei,
+    Praxen oder Overlay geändert haben (nicht bei Bewertungen oder Leistungen).
+
+    Args:
+        aktuell: Version sofort prüfen (eine Abfrage) statt höchstens alle
+            VERSION_PRUEF_INTERVALL Sekunden, damit gerade angelegte Praxen bei
+            der Duplikatprüfung schon gefunden werden
+    """
+    jetzt = time.monotonic()
+    with _adress_index_lock:
+        if (not aktuell and _adress_index_cache['index'] is not None
+                and jetzt - _adress_index_cache['geprueft'] < VERSION_PRUEF_INTERVALL):
+            return _adress_index_cache['index']
+
+    version = _adress_version()
+    with _adress_index_lock:
+        if _adress_index_cache['index'] is None or _adress_index_cache['version'] != version:
+            _adress_index_cache['index'] = _baue_adress_index()
+            _adress_index_cache['version'] = version
+        _adress_index_cache['geprueft'] = jetzt
+        return _adress_index_cache['index']
@@ -0,0 +1,231 @@
+"""
+Praxissuche für /suche, /zahnarzt-<stadt> und /<leistung>-<stadt>.
+
+Die drei Routen bauen nur noch eine SuchAnfrage und rendern das SuchErgebnis;
+Kandidaten (CSV-Datensatz + Datenbank-Praxen), Filter, Reihenfolge und
+Seitenaufteilung liegen hier an einer Stelle.
+
+Reihenfolge wie bisher: Premium-Praxen (premium/premiumplus) zuerst, täglich
+rotiert (Seed aus Datum + SuchAnfrage.rotation), danach Standard-Praxen nach
+Entfernung. Mit SuchAnfrage.leistung kommen innerhalb beider Gruppen die Praxen
+zuerst, die die Leistung anbieten – ermittelt als Schnitt der Kandidaten mit dem
+Leistungs-Index (Bitmap der Praxis-IDs, siehe praxis_snapshot.leistungs_index).
+
+Für Seite n werden nur die ersten n × pro_seite Einträge geordnet: gemischt wird
+nur die (kleine) Premium-Gruppe, von den Standard-Praxen werden per Heap nur so
+viele der nächstgelegenen ausgewählt wie bis zum Seitenende fehlen. CSV-Praxen
+(immer Standard, ohne Leistungsschwerpunkte) kommen dabei als leichte
+(entfernung, zeile)-Paare aus dem Datensatz; PraxisRecords entstehen nur für die
+ausgewählten Einträge. Die Seitenzahl ergibt sich aus der Trefferzahl.
+
+Braucht einen App-Kontext. Benchmark: python -m tools.bench_praxis_suche
+"""
+import math
+import heapq
+import hashlib
+from datetime import datetime
+from random import Random
+from itertools import islice
+from dataclasses import dataclass, field
+
+from services.praxis_datensatz import _distanz_km
+from services.praxis_record import praxis_record_aus_db
+from services.praxis_snapshot import (
+    csv_praxen_im_umkreis, csv_treffer_im_umkreis, csv_praxis_mit_entfernung, leistungs_index, id_bitmap
+)
+
+EINTRAEGE_PRO_SEITE = 20
+PREMIUM_PAKETE = ('premium', 'premiumplus')
+WOCHENTAGE = ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag']
+
+
+@dataclass(frozen=True)
+class SuchAnfrage:
+    lat: float
+    lng: float
+    umkreis: float = 25.0
+    seite: int = 1
+    pro_seite: int = EINTRAEGE_PRO_SEITE
+    # Leistungs-Slug (z.B. 'implantologie'): Praxen mit diesem Schwerpunkt zuerst
+    leistung: str = None
+    # Nur Praxen mit diesen Feldwerten, z.B. (('paket', 'premium'),)
+    attribute: tuple = ()
+    # Teil des Tages-Seeds der Premium-Rotation (z.B. Ort oder Stadt-Slug)
+    rotation: str = ''
+    # Datenbank-Praxen mit Bewertungen, Öffnungsstatus und Landingpage-Status
+    details: bool = True
+
+
+@dataclass
+class SuchErgebnis:
+    eintraege: list
+    gesamt: int
+    seite: int
+    pro_seite: int = EINTRAEGE_PRO_SEITE
+    gesamt_seiten: int = field(init=False)
+
+    def __post_init__(self):
+        self.gesamt_seiten = math.ceil(self.gesamt / self.pro_seite)
+
+
+def _ist_premium(praxis):
+    return (praxis.paket or '').lower() in PREMIUM_PAKETE
+
+
+def rotations_seed(rotation, heute=None):
+    """Tages-Seed der Premium-Rotation: gleiche Reihenfolge für denselben Ort am selben Tag"""
+    heute = heute or datetime.now().strftime('%Y-%m-%d')
+    return int(hashlib.sha256(f"{heute}-{rotation}".encode('utf-8')).hexdigest(), 16) % (2**32)
+
+
+class PraxisSuche:
+    def suche(self, anfrage):
+        """Führt eine SuchAnfrage aus und liefert die angefragte Seite als SuchErgebnis"""
+        start = (anfrage.seite - 1) * anfrage.pro_seite
+        ende = start + anfrage.pro_seite
+
+        # Attributfilter brauchen die vollständigen Einträge, alles andere kommt mit den Paaren aus
+        csv_treffer = None
+        if start >= 0 and not anfrage.attribute:
+            csv_treffer = csv_treffer_im_umkreis(anfrage.lat, anfrage.lng, anfrage.umkreis)
+        if csv_treffer is None:
+            treffer = self.kandidaten(anfrage)
+            geordnet = self.ordne(treffer, anfrage, anzahl=ende if start >= 0 else None)
+            return SuchErgebnis(geordnet[start:ende], len(treffer), anfrage.seite, anfrage.pro_seite)
+
+        treffer = self.datenbank_im_umkreis(anfrage)
+        geordnet = self.ordne(treffer, anfrage, anzahl=ende, csv_treffer=csv_treffer)
+        return SuchErgebnis(geordnet[start:ende], len(treffer) + len(csv_treffer), anfrage.seite, anfrage.pro_seite)
+
+    def kandidaten(self, anfrage):
+        """Alle Praxen im Umkreis (CSV zuerst, dann Datenbank) mit Entfernung, Attributfilter angewendet"""
+        treffer = csv_praxen_im_umkreis(anfrage.lat, anfrage.lng, anfrage.umkreis)
+        treffer.extend(self.datenbank_im_umkreis(anfrage))
+        if anfrage.attribute:
+            treffer = [p for p in treffer if all(p.get(feld) == wert for feld, wert in anfrage.attribute)]
+        return treffer
+
+    def datenbank_im_umkreis(self, anfrage):
+        """Datenbank-Praxen im Umkreis mit Entfernung"""
+        treffer = []
+        for praxis in self.datenbank_praxen(anfrage.details):
+            distanz = round(_distanz_km(anfrage.lat, anfrage.lng, praxis.lat, praxis.lng), 1)
+            if distanz <= anfrage.umkreis:
+                treffer.append(praxis.mit(entfernung=distanz))
+        return treffer
+
+    def datenbank_praxen(self, details=True):
+        """Datenbank-Praxen (ohne Demo-Praxen) mit Koordinaten als PraxisRecords"""
+        from models import Praxis
+
+        praxen = [p for p in Praxis.query.filter(Praxis.ist_demo != True).all() if p.latitude and p.longitude]
+        if not details:
+            return [praxis_record_aus_db(p, leistungsschwerpunkte=p.leistungsschwerpunkte or '') for p in praxen]
+
+        bewertungen = self._bewertungen()
+        oeffnungsstatus = self._oeffnungsstatus()
+        return [
+            praxis_record_aus_db(
+                praxis,
+                landingpage_aktiv=praxis.landingpage_aktiv,
+                bewertung_avg=bewertungen.get(praxis.id, (0, 0))[0],
+                bewertung_anzahl=bewertungen.get(praxis.id, (0, 0))[1],
+                google_rating=praxis.google_rating,
+                google_review_count=praxis.google_review_count or 0,
+                oeffnungsstatus=oeffnungsstatus.get(praxis.id) if praxis.ist_verifiziert else None,
+                leistungsschwerpunkte=praxis.leistungsschwerpunkte or ''
+            )
+            for praxis in praxen
+        ]
+
+    def _bewertungen(self):
+        """{praxis_id: (durchschnitt, anzahl)} der bestätigten Bewertungen"""
+        from models import Bewertung
+        from database import db
+        from sqlalchemy import func as sql_func
+
+        stats = db.session.query(
+            Bewertung.praxis_id,
+            sql_func.avg(Bewertung.sterne).label('avg_sterne'),
+            sql_func.count(Bewertung.id).label('anzahl')
+        ).filter(Bewertung.bestaetigt == True).group_by(Bewertung.praxis_id).all()
+        return {b.praxis_id: (round(float(b.avg_sterne), 1), int(b.anzahl)) for b in stats}
+
+    def _oeffnungsstatus(self):
+        """{praxis_id: 'geoeffnet'/'geschlossen'} für Praxen mit hinterlegten Öffnungszeiten (Berliner Zeit)"""
+        from models import Oeffnungszeit
+        import pytz
+
+        jetzt = datetime.now(pytz.timezone('Europe/Berlin'))
+        heute = WOCHENTAGE[jetzt.weekday()]
+        uhrzeit = jetzt.time()
+
+        heute_je_praxis = {}
+        for oz in Oeffnungszeit.query.all():
+            heute_je_praxis.setdefault(oz.praxis_id, None)
+            if oz.tag == heute:
+                heute_je_praxis[oz.praxis_id] = oz
+
+        status = {}
+        for praxis_id, oz in heute_je_praxis.items():
+            offen = oz is not None and not oz.geschlossen and oz.von and oz.bis and oz.von <= uhrzeit <= oz.bis
+            status[praxis_id] = 'geoeffnet' if offen else 'geschlossen'
+        return status
+
+    def ordne(self, treffer, anfrage, anzahl=None, csv_treffer=None):
+        """
+        Premium (rotiert) vor Standard (nach Entfernung), jeweils passende Leistung zuerst.
+
+        Args:
+            anzahl: nur die ersten `anzahl` Einträge der Reihenfolge liefern (None = alle)
+            csv_treffer: CSV-Praxen als [(entfernung, zeile)] aus csv_treffer_im_umkreis,
+                die in `treffer` fehlen; sie gehören zur letzten Standard-Gruppe und
+                stehen bei gleicher Entfernung vor den Datenbank-Praxen
+        """
+        premium = [p for p in treffer if _ist_premium(p)]
+        standard = [p for p in treffer if not _ist_premium(p)]
+        if anfrage.leistung:
+            # Kandidaten ∩ Anbieter der Leistung; CSV-Praxen (ohne ID) bieten keine an
+            passend = leistungs_index().bitmap(anfrage.leistung) & id_bitmap(p.id for p in treffer if p.id is not None)
+            hat_leistung = lambda p: p.id is not None and passend >> p.id & 1
+            premium_gruppen = [[p for p in premium if hat_leistung(p)], [p for p in premium if not hat_leistung(p)]]
+            standard_gruppen = [[p for p in standard if hat_leistung(p)], [p for p in standard if not hat_leistung(p)]]
+        else:
+            premium_gruppen, standard_gruppen = [premium], [standard]
+
+        # Alle Premium-Gruppen mischen, damit die Rotation nicht von der Seite abhängt
+        rng = Random(rotations_seed(anfrage.rotation))
+        geordnet = []
+        for gruppe in premium_gruppen:
+            rng.shuffle(gruppe)
+            geordnet.extend(gruppe)
+        if anzahl is not None:
+            del geordnet[anzahl:]
+
+        entfernung = lambda p: p.entfernung
+        for nummer, gruppe in enumerate(standard_gruppen):
+            rest = None if anzahl is None else anzahl - len(geordnet)
+            if rest is not None and rest <= 0:
+                break
+            if csv_treffer is not None and nummer == len(standard_gruppen) - 1:
+                geordnet.extend(self._mit_csv_treffer(sorted(gruppe, key=entfernung), csv_treffer, rest))
+            elif rest is None:
+                geordnet.extend(sorted(gruppe, key=entfernung))
+            else:
+                # nsmallest ist stabil wie sorted(...)[:n]: gleiche Entfernung behält die Trefferreihenfolge
+                geordnet.extend(heapq.nsmallest(rest, gruppe, key=entfernung))
+        return geordnet
+
+    def _mit_csv_treffer(self, praxen, csv_treffer, anzahl=None):
+        """Führt nach Entfernung sortierte Praxen und CSV-Paare zusammen; Records nur für die ersten `anzahl`"""
+        zusammen = heapq.merge(
+            ((distanz, 0, idx) for distanz, idx in csv_treffer),
+            ((praxis.entfernung, 1, nummer) for nummer, praxis in enumerate(praxen))
+        )
+        return [
+            csv_praxis_mit_entfernung(wert, distanz) if quelle == 0 else praxen[wert]
+            for distanz, quelle, wert in islice(zusammen, anzahl)
+        ]
+
+
+praxis_suche = PraxisSuche()
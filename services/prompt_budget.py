@@ -0,0 +1,120 @@
+"""
+Prompt-Aufbau mit Token-Budget für die Azure-OpenAI-Aufrufe.
+
+Die Nachrichtenliste beginnt immer mit einem unveränderlichen System-Prompt
+(Modul-Konstante), damit der Anbieter den Präfix zwischen Anfragen cachen kann.
+Alle variablen Daten (Praxen, Formularfelder) stehen in der Nutzernachricht.
+Der Gesprächsverlauf wird auf ein Token-Budget gekürzt.
+
+Tokens werden lokal gezählt: mit tiktoken, falls installiert, sonst mit einer
+Schätzung (deutsche Texte liegen bei ca. 3,5–4 Zeichen pro Token).
+"""
+import os
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Budget für den Gesprächsverlauf im Chatbot (Tokens)
+VERLAUF_TOKEN_BUDGET = int(os.environ.get("CHAT_VERLAUF_TOKEN_BUDGET", 1200))
+# Einzelne Verlaufsnachrichten (v.a. lange Bot-Antworten mit Praxislisten) werden gekappt
+MAX_TOKENS_PRO_VERLAUFSNACHRICHT = 300
+# Zusammenfassung älterer, weggefallener Nutzerfragen
+MAX_ZUSAMMENFASSUNG_FRAGEN = 3
+MAX_ZEICHEN_PRO_FRAGE = 120
+
+# Feste Zusatzkosten pro Nachricht im Chat-Format (Rolle, Trennzeichen)
+TOKENS_PRO_NACHRICHT = 4
+ZEICHEN_PRO_TOKEN = 3.7
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken ist optional
+    _encoding = None
+
+
+def zaehle_tokens(text):
+    """Anzahl Tokens eines Textes (exakt mit tiktoken, sonst geschätzt)"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(math.ceil(len(text) / ZEICHEN_PRO_TOKEN), len(text.split()))
+
+
+def zaehle_nachrichten_tokens(messages):
+    """Anzahl Tokens einer Chat-Nachrichtenliste inkl. Format-Overhead"""
+    return sum(zaehle_tokens(m.get('content') or '') + TOKENS_PRO_NACHRICHT for m in messages) + 2
+
+
+def _kappe(text, max_tokens):
+    if zaehle_tokens(text) <= max_tokens:
+        return text
+    max_zeichen = int(max_tokens * ZEICHEN_PRO_TOKEN)
+    gekappt = text[:max_zeichen]
+    while gekappt and zaehle_tokens(gekappt) > max_tokens:
+        gekappt = gekappt[:int(len(gekappt) * 0.9)]
+    return gekappt.rstrip() + " …"
+
+
+def kuerze_verlauf(verlauf, budget_tokens=VERLAUF_TOKEN_BUDGET):
+    """
+    Kürzt den Gesprächsverlauf auf ein Token-Budget.
+
+    Ungültige Einträge werden verworfen, lange Nachrichten gekappt. Es bleiben die
+    jüngsten Nachrichten erhalten; von älteren bleibt eine kurze Zusammenfassung
+    der Nutzerfragen, solange sie ins Budget passt.
+
+    Args:
+        verlauf: Liste von {"role": "user"/"assistant", "content": "..."} (vom Client)
+        budget_tokens: Maximale Tokenzahl für den gesamten Verlauf
+
+    Returns:
+        Gekürzte Nachrichtenliste
+    """
+    nachrichten = [
+        {'role': m['role'], 'content': _kappe(m['content'], MAX_TOKENS_PRO_VERLAUFSNACHRICHT)}
+        for m in (verlauf or [])
+        if isinstance(m, dict) and m.get('role') in ('user', 'assistant')
+        and isinstance(m.get('content'), str) and m['content'].strip()
+    ]
+
+    behalten = []
+    verbraucht = 0
+    for nachricht in reversed(nachrichten):
+        kosten = zaehle_tokens(nachricht['content']) + TOKENS_PRO_NACHRICHT
+        if verbraucht + kosten > budget_tokens:
+            break
+        behalten.append(nachricht)
+        verbraucht += kosten
+    behalten.reverse()
+
+    # Der Verlauf soll nicht mit einer Bot-Antwort ohne zugehörige Frage beginnen
+    weggefallen = nachrichten[:len(nachrichten) - len(behalten)]
+    if behalten and behalten[0]['role'] == 'assistant':
+        verbraucht -= zaehle_tokens(behalten[0]['content']) + TOKENS_PRO_NACHRICHT
+        weggefallen.append(behalten.pop(0))
+
+    fragen = [m['content'] for m in weggefallen if m['role'] == 'user'][-MAX_ZUSAMMENFASSUNG_FRAGEN:]
+    if fragen:
+        zusammenfassung = "Frühere Fragen im Gespräch (gekürzt): " + " | ".join(
+            f[:MAX_ZEICHEN_PRO_FRAGE] for f in fragen
+        )
+        kosten = zaehle_tokens(zusammenfassung) + TOKENS_PRO_NACHRICHT
+        if verbraucht + kosten <= budget_tokens:
+            behalten.insert(0, {'role': 'system', 'content': zusammenfassung})
+
+    return behalten
+
+
+def baue_nachrichten(system_prompt, nutzer_inhalt, verlauf=None, verlauf_budget=VERLAUF_TOKEN_BUDGET):
+    """
+    Setzt die Nachrichtenliste zusammen: fester System-Prompt, gekürzter Verlauf,
+    aktuelle Nutzernachricht mit allen variablen Daten.
+    """
+    messages = [{"role": "system", "content": system_prompt}]
+    if verlauf:
+        messages.extend(kuerze_verlauf(verlauf, verlauf_budget))
+    messages.append({"role": "user", "content": nutzer_inhalt})
+    return messages
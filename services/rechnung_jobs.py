@@ -0,0 +1,113 @@
+"""
+Job-Typ für die Erstellung von Rechnungs-PDFs.
+
+Die Zahlungsroute legt nur noch einen Job an; das Rendern mit WeasyPrint läuft
+im Worker (services/job_queue.py). WeasyPrint wird erst dort importiert, damit
+der Webprozess die Bibliothek (und ihre nativen Abhängigkeiten) nicht lädt.
+Der Worker ist ein eigener Render-Service ohne gemeinsames Dateisystem mit dem
+Webprozess: Das PDF landet deshalb in der Tabelle rechnung (models.Rechnung),
+deren Eintrag schon beim Einplanen angelegt wird. Ausgeliefert wird es über
+/rechnung/<rechnungsnummer>.pdf. Eine wiederholte Ausführung desselben Jobs
+überschreibt ein vorhandenes PDF nicht.
+"""
+import hashlib
+import logging
+from datetime import datetime
+from functools import lru_cache
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from database import db
+from models import Rechnung
+from services.job_queue import registriere_job_typ, erstelle_job
+
+logger = logging.getLogger(__name__)
+
+RECHNUNG_VORLAGE = "rechnung_vorlage.html"
+RECHNUNG_HASH_LAENGE = 16
+
+
+@lru_cache(maxsize=1)
+def _jinja_env():
+    """Einmalig erzeugte Template-Umgebung (kompilierte Vorlagen bleiben im Cache)"""
+    return Environment(
+        loader=FileSystemLoader("templates"),
+        autoescape=select_autoescape(['html']),
+        auto_reload=False
+    )
+
+
+def rendere_rechnung_html(params):
+    """HTML der Rechnung aus den Job-Parametern"""
+    return _jinja_env().get_template(RECHNUNG_VORLAGE).render(**params)
+
+
+def _neue_rechnungsnummer(jetzt):
+    rechnungsnummer = f"R-{jetzt.strftime('%Y%m%d-%H%M%S')}"
+    # Zwei Zahlungen in derselben Sekunde bekommen eine laufende Endung
+    nummer, zaehler = rechnungsnummer, 1
+    while Rechnung.query.filter_by(rechnungsnummer=nummer).first():
+        zaehler += 1
+        nummer = f"{rechnungsnummer}-{zaehler}"
+    return nummer
+
+
+def plane_rechnung(praxisname, email, paket, details, methode):
+    """
+    Legt den Rechnungs-Eintrag und einen Job für das PDF an (kehrt sofort zurück).
+
+    Datum und Rechnungsnummer werden hier festgelegt, damit Wiederholungen im
+    Worker dasselbe PDF erzeugen.
+
+    Returns:
+        Rechnungsnummer
+    """
+    jetzt = datetime.now()
+    rechnungsnummer = _neue_rechnungsnummer(jetzt)
+    db.session.add(Rechnung(
+        rechnungsnummer=rechnungsnummer, praxisname=praxisname, email=email, paket=paket, methode=methode
+    ))
+    erstelle_job('rechnung_pdf', f"Rechnung {rechnungsnummer} – {praxisname}", [{
+        'schluessel': rechnungsnummer,
+        'bezeichnung': f"{praxisname} ({email})",
+        'parameter': {
+            'heute': jetzt.strftime("%Y-%m-%d"),
+            'praxisname': praxisname,
+            'email': email,
+            'paket': paket,
+            'methode': methode,
+            'details': details,
+            'rechnungsnummer': rechnungsnummer,
+        },
+    }])
+    return rechnungsnummer
+
+
+def _generiere_rechnung(params):
+    from weasyprint import HTML
+
+    html_content = rendere_rechnung_html(params)
+    return {
+        'pdf': HTML(string=html_content).write_pdf(),
+        'inhalts_hash': hashlib.sha256(html_content.encode('utf-8')).hexdigest()[:RECHNUNG_HASH_LAENGE],
+    }
+
+
+def _speichere_rechnung(params, ergebnis):
+    rechnung = Rechnung.query.filter_by(rechnungsnummer=params['rechnungsnummer']).first()
+    if rechnung is None:
+        # Job aus der Zeit vor Migration 9 – Eintrag nachholen
+        rechnung = Rechnung(
+            rechnungsnummer=params['rechnungsnummer'], praxisname=params['praxisname'],
+            email=params['email'], paket=params['paket'], methode=params['methode']
+        )
+        db.session.add(rechnung)
+    elif rechnung.pdf is not None:
+        return 'vorhanden'
+
+    rechnung.pdf = ergebnis['pdf']
+    rechnung.inhalts_hash = ergebnis['inhalts_hash']
+    rechnung.pdf_erstellt_am = datetime.utcnow()
+    logger.info(f"📄 Rechnung {rechnung.rechnungsnummer} erstellt ({len(ergebnis['pdf']) // 1024} KB)")
+    return 'erstellt'
+
+
+registriere_job_typ('rechnung_pdf', _generiere_rechnung, _speichere_rechnung)
@@ -0,0 +1,158 @@
+"""
+Job-Typen für die KI-Generierung von Stadt- und Leistung+Stadt-SEO-Texten.
+
+Die Generierung läuft im Worker (services/job_queue.py); die Admin-Routen legen
+nur noch einen Job mit einem Item pro Stadt bzw. Leistung+Stadt an.
+"""
+import csv
+import json
+import logging
+from sqlalchemy.exc import IntegrityError
+from models import StadtSEO, LeistungStadtSEO
+from database import db
+from leistungen_config import LEISTUNGEN, stadt_zu_slug
+from services.job_queue import registriere_job_typ
+
+logger = logging.getLogger(__name__)
+
+CSV_DATEI = "zahnaerzte.csv"
+
+
+def lade_csv_staedte(csv_datei=CSV_DATEI):
+    """
+    Liest alle Städte aus der Praxis-CSV.
+
+    Returns:
+        dict stadt_slug -> stadt_name (sortiert nach Slug)
+    """
+    stadt_set = set()
+    with open(csv_datei, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            stadt = row.get("stadt", "").strip()
+            if stadt:
+                stadt_set.add(stadt)
+
+    slug_to_stadt = {}
+    for stadt in sorted(stadt_set):
+        slug_to_stadt.setdefault(stadt_zu_slug(stadt), stadt)
+    return dict(sorted(slug_to_stadt.items()))
+
+
+def stadt_seo_items(anzahl=None):
+    """Items für alle Städte ohne Stadt-SEO-Text (optional auf `anzahl` begrenzt)"""
+    existierende_slugs = {slug for (slug,) in db.session.query(StadtSEO.stadt_slug).all()}
+    items = [
+        {
+            'schluessel': stadt_slug,
+            'bezeichnung': stadt_name,
+            'parameter': {'stadt_name': stadt_name, 'stadt_slug': stadt_slug},
+        }
+        for stadt_slug, stadt_name in lade_csv_staedte().items()
+        if stadt_slug not in existierende_slugs
+    ]
+    return items[:anzahl] if anzahl else items
+
+
+def leistung_stadt_seo_items(leistung_slugs, anzahl=None):
+    """Items für alle Leistung+Stadt-Kombinationen ohne SEO-Text (`anzahl` gilt je Leistung)"""
+    staedte = lade_csv_staedte()
+    existierend = set(
+        db.session.query(LeistungStadtSEO.leistung_slug, LeistungStadtSEO.stadt_slug)
+        .filter(LeistungStadtSEO.leistung_slug.in_(leistung_slugs))
+        .all()
+    )
+
+    items = []
+    for leistung_slug in leistung_slugs:
+        leistung_name = LEISTUNGEN[leistung_slug]['name']
+        offen = [
+            {
+                'schluessel': f"{leistung_slug}/{stadt_slug}",
+                'bezeichnung': f"{leistung_name} – {stadt_name}",
+                'parameter': {
+                    'leistung_slug': leistung_slug,
+                    'leistung_name': leistung_name,
+                    'stadt_name': stadt_name,
+                    'stadt_slug': stadt_slug,
+                },
+            }
+            for stadt_slug, stadt_name in staedte.items()
+            if (leistung_slug, stadt_slug) not in existierend
+        ]
+        items.extend(offen[:anzahl] if anzahl else offen)
+    return items
+
+
+def _faq_json(seo_data):
+    return json.dumps(seo_data.get('faq', []), ensure_ascii=False) if seo_data.get('faq') else None
+
+
+def _generiere_stadt_seo(params):
+    from services.ai_service import generate_city_seo_texts
+    # Ohne Fallback: Fehler landen im Item-Status und werden von der Queue wiederholt
+    return generate_city_seo_texts(params['stadt_name'], fallback=False)
+
+
+def _speichere_stadt_seo(params, seo_data):
+    stadt_name = params['stadt_name']
+    stadt_slug = params['stadt_slug']
+    if StadtSEO.query.filter_by(stadt_slug=stadt_slug).first():
+        return 'vorhanden'
+
+    db.session.add(StadtSEO(
+        stadt_slug=stadt_slug,
+        stadt_name=stadt_name,
+        meta_title=seo_data.get('meta_title', f"Zahnarzt {stadt_name} | Top Zahnärzte finden - Dentalax"),
+        meta_description=seo_data.get('meta_description', f"Finden Sie Ihren Zahnarzt in {stadt_name}."),
+        h1_titel=seo_data.get('h1_titel', f"Zahnarzt {stadt_name}: Finden Sie Ihre ideale Praxis"),
+        teaser_text=seo_data.get('teaser_text', f"Entdecken Sie qualifizierte Zahnärzte in {stadt_name} und Umgebung."),
+        h2_titel_1=seo_data.get('h2_titel_1'),
+        seo_text_1=seo_data.get('seo_text_1'),
+        h2_titel_2=seo_data.get('h2_titel_2'),
+        seo_text_2=seo_data.get('seo_text_2'),
+        faq_json=_faq_json(seo_data)
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return 'vorhanden'
+    return 'erstellt'
+
+
+def _generiere_leistung_stadt_seo(params):
+    from services.ai_service import generate_leistung_stadt_seo_texts
+    return generate_leistung_stadt_seo_texts(params['leistung_name'], params['leistung_slug'], params['stadt_name'], fallback=False)
+
+
+def _speichere_leistung_stadt_seo(params, seo_data):
+    leistung_slug = params['leistung_slug']
+    stadt_slug = params['stadt_slug']
+    if LeistungStadtSEO.query.filter_by(leistung_slug=leistung_slug, stadt_slug=stadt_slug).first():
+        return 'vorhanden'
+
+    db.session.add(LeistungStadtSEO(
+        leistung_slug=leistung_slug,
+        leistung_name=params['leistung_name'],
+        stadt_slug=stadt_slug,
+        stadt_name=params['stadt_name'],
+        meta_title=seo_data.get('meta_title'),
+        meta_description=seo_data.get('meta_description'),
+        h1_titel=seo_data.get('h1_titel'),
+        teaser_text=seo_data.get('teaser_text'),
+        h2_titel_1=seo_data.get('h2_titel_1'),
+        seo_text_1=seo_data.get('seo_text_1'),
+        h2_titel_2=seo_data.get('h2_titel_2'),
+        seo_text_2=seo_data.get('seo_text_2'),
+        faq_json=_faq_json(seo_data)
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return 'vorhanden'
+    return 'erstellt'
+
+
+registriere_job_typ('stadt_seo', _generiere_stadt_seo, _speichere_stadt_seo)
+registriere_job_typ('leistung_stadt_seo', _generiere_leistung_stadt_seo, _speichere_leistung_stadt_seo)
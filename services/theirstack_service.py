@@ -4,6 +4,7 @@ import logging
 from datetime import datetime, timedelta
 from models import ExternesInserat
 from database import db
+from services.job_suche import invalidiere_job_index
 
 logger = logging.getLogger(__name__)
 
@@ -251,6 +252,7 @@ def sync_external_jobs(limit=25):
     
     try:
         db.session.commit()
+        invalidiere_job_index()
         logger.info(f"TheirStack Sync: {new_count} neue, {updated_count} aktualisierte Jobs")
         return {"new": new_count, "updated": updated_count}
     except Exception as e:
@@ -1,12 +1,20 @@
 import os
-import stripe
 from flask import redirect, request, url_for
 from datetime import datetime, timedelta
 from models import PaketBuchung, Praxis
 # Import db später, um zirkuläre Imports zu vermeiden
 
-# Stripe Secret Key aus Umgebungsvariablen laden
-stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+
+def hole_stripe():
+    """
+    Stripe-SDK mit Secret Key aus den Umgebungsvariablen.
+
+    Das SDK wird erst bei der ersten Zahlung importiert statt beim Start jedes Workers.
+    """
+    import stripe
+    stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+    return stripe
+
 
 # Domain für Redirect-URLs
 def get_domain():
@@ -55,7 +63,7 @@ def create_checkout_session(praxis_id, paket, zahlweise):
         zahlweise_text = 'pro Monat' if zahlweise == 'monatlich' else 'pro Jahr'
         
         # Stripe Checkout Session erstellen
-        checkout_session = stripe.checkout.Session.create(
+        checkout_session = hole_stripe().checkout.Session.create(
             payment_method_types=['card'],
             line_items=[{
                 'price_data': {
@@ -0,0 +1,99 @@
+"""
+Kompiliert zahnaerzte.csv in den binären Praxis-Datensatz (zahnaerzte.bin).
+
+Die CSV bleibt die bearbeitbare Quelle; der Datensatz wird beim Deploy gebaut
+(render.yaml) und vom Webprozess read-only gemappt (services/praxis_datensatz.py).
+Fehlt er oder passt er nicht zur CSV, baut der Webprozess ihn selbst neu.
+
+Mit --pruefen wird jede Zeile gegen das direkte Parsen der CSV verglichen, mit
+--messen werden Ladezeit und Speicherzuwachs (RSS) von CSV-Parsen und mmap in
+jeweils frischen Prozessen gegenübergestellt.
+
+Aufruf:
+    python -m tools.baue_praxis_datensatz
+    python -m tools.baue_praxis_datensatz --pruefen --messen
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from services.praxis_datensatz import CSV_DATEI, baue_datensatz, datensatz_pfad, PraxisDatensatz
+
+
+def _rss_mb():
+    with open('/proc/self/status') as f:
+        for zeile in f:
+            if zeile.startswith('VmRSS:'):
+                return int(zeile.split()[1]) / 1024
+    return 0.0
+
+
+def _messe(fall, csv_datei, pfad):
+    from services import praxis_snapshot
+
+    basis = _rss_mb()
+    start = time.perf_counter()
+    if fall == 'CSV parsen':
+        daten = praxis_snapshot._zeilen_aus_csv(csv_datei)
+    elif fall == 'mmap öffnen':
+        daten = PraxisDatensatz(pfad)
+    elif fall == 'mmap + Umkreis-Scan':
+        # Typischer Zugriff: alle Koordinaten lesen, nur Treffer dekodieren
+        daten = PraxisDatensatz(pfad)
+        treffer = [i for i, lat in enumerate(daten.lat) if abs(lat - 50.94) < 0.2 and abs(daten.lng[i] - 6.96) < 0.3]
+        _ = [daten.wert('name', i) for i in treffer]
+    else:
+        daten = praxis_snapshot._zeilen_aus_datensatz(PraxisDatensatz(pfad))
+    return (time.perf_counter() - start) * 1000, _rss_mb() - basis
+
+
+def _pruefe(csv_datei, pfad):
+    from services import praxis_snapshot
+
+    aus_csv = praxis_snapshot._zeilen_aus_csv(csv_datei)
+    aus_datensatz = praxis_snapshot._zeilen_aus_datensatz(PraxisDatensatz(pfad))
+    if len(aus_csv) != len(aus_datensatz):
+        return [f"Zeilenzahl {len(aus_csv)} != {len(aus_datensatz)}"]
+    return [f"Zeile {a['csv_original_idx']}" for a, b in zip(aus_csv, aus_datensatz) if a != b]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Baut den binären Praxis-Datensatz aus der CSV")
+    parser.add_argument('--csv', default=CSV_DATEI)
+    parser.add_argument('--ziel', default=None, help="Zieldatei (Standard: passend zur CSV)")
+    parser.add_argument('--pruefen', action='store_true', help="Zeilen gegen die CSV vergleichen")
+    parser.add_argument('--messen', action='store_true', help="Ladezeit und RSS CSV vs. mmap messen")
+    args = parser.parse_args()
+
+    ziel = args.ziel or datensatz_pfad(args.csv)
+    start = time.perf_counter()
+    statistik = baue_datensatz(args.csv, ziel)
+    print(f"✅ {ziel}: {statistik['zeilen']} Zeilen, {statistik['strings']} verschiedene Strings, "
+          f"{statistik['bytes'] / 1024 / 1024:.1f} MB (CSV {os.path.getsize(args.csv) / 1024 / 1024:.1f} MB) "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    ok = True
+    if args.pruefen:
+        abweichungen = _pruefe(args.csv, ziel)
+        if abweichungen:
+            print(f"❌ {len(abweichungen)} Abweichungen, z.B. {', '.join(abweichungen[:5])}")
+            ok = False
+        else:
+            print("✅ Alle Zeilen stimmen mit der CSV überein")
+
+    if args.messen:
+        ctx = multiprocessing.get_context('spawn')
+        print(f"{'Fall':<22} {'ms':>8} {'RSS +MB':>8}")
+        for fall in ('CSV parsen', 'mmap öffnen', 'mmap + Umkreis-Scan', 'mmap -> PraxisRecords'):
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                dauer, rss = pool.submit(_messe, fall, args.csv, ziel).result()
+            print(f"{fall:<22} {dauer:>8.1f} {rss:>8.1f}")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
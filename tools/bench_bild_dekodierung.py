@@ -0,0 +1,120 @@
+"""
+Misst den Spitzen-Speicherverbrauch (RSS) beim Dekodieren großer Uploads.
+
+Jeder Fall läuft in einem frischen Prozess, damit die Werte nicht voneinander
+abhängen. Verglichen werden die volle Dekodierung (open -> convert -> resize)
+und image_utils.dekodiere_reduziert (Draft-Modus/reduce()). Das Skript endet mit
+Exit-Code 1, wenn der reduzierte Pfad die Obergrenze überschreitet oder eine
+Dekompressionsbombe nicht abgelehnt wird.
+
+Aufruf:
+    python -m tools.bench_bild_dekodierung [--max-mb 150]
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _setze_spitze_zurueck():
+    # Linux: "5" setzt den Höchstwert VmHWM des Prozesses auf den aktuellen RSS zurück
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _rss_mb():
+    """Spitzen-RSS des Prozesses in MB (VmHWM; ru_maxrss würde Werte des Elternprozesses vor exec enthalten)"""
+    try:
+        with open('/proc/self/status') as f:
+            for zeile in f:
+                if zeile.startswith('VmHWM:'):
+                    return int(zeile.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _messe(fall, dateipfad):
+    from PIL import Image, ImageOps
+    import image_utils
+
+    _setze_spitze_zurueck()
+    basis = _rss_mb()
+    start = time.perf_counter()
+    if fall == 'voll':
+        with Image.open(dateipfad) as original:
+            img = ImageOps.exif_transpose(original).convert('RGB')
+        img = img.resize((image_utils.MAX_WIDTH, round(img.height * image_utils.MAX_WIDTH / img.width)), Image.LANCZOS)
+    else:
+        img = image_utils.dekodiere_reduziert(dateipfad, image_utils.MAX_WIDTH)
+        img = img.resize((image_utils.MAX_WIDTH, round(img.height * image_utils.MAX_WIDTH / img.width)), Image.LANCZOS)
+    return _rss_mb() - basis, (time.perf_counter() - start) * 1000
+
+
+def _pruefe_bombe(dateipfad):
+    from werkzeug.datastructures import FileStorage
+    import image_utils
+
+    image_utils.UPLOAD_FOLDER = tempfile.mkdtemp()
+    with open(dateipfad, 'rb') as f:
+        return image_utils.optimize_and_save(FileStorage(io.BytesIO(f.read()), filename='bombe.png'), 'test', 0)
+
+
+def _erzeuge_testbilder(ordner):
+    from PIL import Image
+
+    # Rauschen, damit der JPEG-Encoder realistische Dateigrößen erzeugt
+    rauschen = Image.effect_noise((6000, 4000), 60).convert('RGB')
+    jpeg = os.path.join(ordner, 'foto_24mp.jpg')
+    rauschen.save(jpeg, 'JPEG', quality=85)
+    png = os.path.join(ordner, 'grafik_24mp.png')
+    Image.new('RGB', (6000, 4000), (42, 130, 148)).save(png, 'PNG')
+    # Kleine Datei, riesige Abmessungen (Dekompressionsbombe)
+    bombe = os.path.join(ordner, 'bombe.png')
+    Image.new('1', (20000, 20000)).save(bombe, 'PNG', optimize=True)
+    return {'JPEG 6000x4000': jpeg, 'PNG 6000x4000': png}, bombe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--max-mb', type=float, default=150, help='Obergrenze für den reduzierten Pfad')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    ok = True
+    with tempfile.TemporaryDirectory() as ordner:
+        bilder, bombe = _erzeuge_testbilder(ordner)
+
+        print(f"{'Bild':<16} {'Datei':>8} {'voll MB':>8} {'reduziert MB':>13} {'voll ms':>8} {'reduziert ms':>13}")
+        for name, pfad in bilder.items():
+            ergebnisse = {}
+            for fall in ('voll', 'reduziert'):
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                    ergebnisse[fall] = pool.submit(_messe, fall, pfad).result()
+            groesse_mb = os.path.getsize(pfad) / 1024 / 1024
+            print(f"{name:<16} {groesse_mb:>7.1f}M {ergebnisse['voll'][0]:>8.0f} {ergebnisse['reduziert'][0]:>13.0f} "
+                  f"{ergebnisse['voll'][1]:>8.0f} {ergebnisse['reduziert'][1]:>13.0f}")
+            if ergebnisse['reduziert'][0] > args.max_mb:
+                print(f"❌ {name}: {ergebnisse['reduziert'][0]:.0f} MB > {args.max_mb:.0f} MB")
+                ok = False
+
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            ergebnis = pool.submit(_pruefe_bombe, bombe).result()
+        print(f"Dekompressionsbombe 20000x20000 ({os.path.getsize(bombe) / 1024:.0f} KB): "
+              f"{'abgelehnt' if ergebnis is None else 'ANGENOMMEN'}")
+        ok = ok and ergebnis is None
+
+    print("✅ Speichergrenzen eingehalten" if ok else "❌ Speichergrenzen verletzt")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
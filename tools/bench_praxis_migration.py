@@ -0,0 +1,54 @@
+"""
+Benchmark für den Praxis-Import (migrations.migriere_praxen) in Zeilen pro Sekunde.
+
+Läuft standardmäßig gegen eine temporäre SQLite-Datenbank: Schema anlegen,
+Import ausführen und zur Kontrolle ein zweites Mal importieren (alle Zeilen
+müssen dann als vorhanden übersprungen werden). Mit --datenbank lässt sich
+eine leere Test-Datenbank (z.B. PostgreSQL) angeben – nie die Produktion.
+
+Aufruf:
+    python -m tools.bench_praxis_migration
+    python -m tools.bench_praxis_migration --chunk 500 --datenbank postgresql://.../dentalax_test
+"""
+import os
+import sys
+import argparse
+import tempfile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zeilen/s des Praxis-Imports messen")
+    parser.add_argument('--csv', default='zahnaerzte.csv')
+    parser.add_argument('--chunk', type=int, default=None, help="Zeilen pro INSERT-Block")
+    parser.add_argument('--datenbank', default=None, help="Leere Test-Datenbank (Standard: temporäre SQLite-Datei)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as ordner:
+        os.environ['DATABASE_URL'] = args.datenbank or f"sqlite:///{os.path.join(ordner, 'migration.db')}"
+        os.environ['MIGRATIONEN_BEIM_START'] = '0'
+        from main import app
+        import migrations
+
+        with app.app_context():
+            migrations.fuehre_schema_migrationen_aus()
+            if migrations.models.Praxis.query.count():
+                print("❌ Datenbank enthält bereits Praxen – bitte eine leere Test-Datenbank verwenden")
+                return 1
+
+            chunk = args.chunk or migrations.PRAXEN_CHUNK_GROESSE
+            erster = migrations.migriere_praxen(args.csv, chunk)
+            zweiter = migrations.migriere_praxen(args.csv, chunk)
+            slugs = migrations.db.session.query(migrations.models.Praxis.slug).distinct().count()
+
+    print(f"\nErster Lauf:  {erster['importiert']} importiert, {erster['uebersprungen']} Dubletten, "
+          f"{erster['sekunden']:.1f} s = {erster['gesamt'] / erster['sekunden']:.0f} Zeilen/s (Block {chunk})")
+    print(f"Zweiter Lauf: {zweiter['importiert']} importiert, {zweiter['uebersprungen']} übersprungen, "
+          f"{zweiter['sekunden']:.1f} s = {zweiter['gesamt'] / zweiter['sekunden']:.0f} Zeilen/s")
+
+    ok = zweiter['importiert'] == 0 and slugs == erster['importiert']
+    print("✅ Import idempotent, Slugs eindeutig" if ok else "❌ Zweiter Lauf hat importiert oder Slugs sind doppelt")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
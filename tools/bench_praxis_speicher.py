@@ -0,0 +1,78 @@
+"""
+Misst mit tracemalloc den Heap-Bedarf aller CSV-Praxen als Dict (bisheriges
+Suchformat) und als PraxisRecord (services/praxis_record.py).
+
+Beide Varianten werden aus denselben Werten des gemappten Datensatzes gebaut;
+gemessen wird nur, was die Einträge selbst zusätzlich belegen.
+
+Aufruf:
+    python -m tools.bench_praxis_speicher
+"""
+import sys
+import gc
+import time
+import tracemalloc
+
+from services.praxis_datensatz import SPALTEN, praxis_datensatz
+from services.praxis_snapshot import csv_schluessel
+from services.praxis_record import PraxisRecord
+
+
+def _als_dict(idx, name, email, telefon, webseite, plz, stadt, strasse, beansprucht, lat, lng, schluessel):
+    # Layout der Dicts vor PraxisRecord (ein Dict mit 20 Schlüsseln pro Praxis)
+    return {
+        'csv_id': f"csv_{idx}", 'csv_original_idx': idx, 'csv_schluessel': schluessel,
+        'name': name, 'email': email, 'telefon': telefon, 'webseite': webseite,
+        'plz': plz, 'stadt': stadt, 'straße': strasse, 'lat': lat, 'lng': lng,
+        'paket': '', 'beansprucht': 'nein', 'beansprucht_csv': beansprucht, 'aus_csv': True,
+        'google_rating': None, 'google_review_count': 0, 'bewertung_avg': 0, 'bewertung_anzahl': 0,
+    }
+
+
+def _als_record(idx, name, email, telefon, webseite, plz, stadt, strasse, beansprucht, lat, lng, schluessel):
+    return PraxisRecord(
+        csv_original_idx=idx, csv_schluessel=schluessel, name=name, email=email, telefon=telefon,
+        webseite=webseite, plz=plz, stadt=stadt, straße=strasse, lat=lat, lng=lng, beansprucht_csv=beansprucht,
+    )
+
+
+def _messe(baue, werte):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    eintraege = [baue(*w) for w in werte]
+    dauer = (time.perf_counter() - start) * 1000
+    groesse, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(eintraege), groesse, dauer
+
+
+def main():
+    datensatz = praxis_datensatz()
+    if datensatz is None:
+        print("❌ Praxis-Datensatz nicht verfügbar (python -m tools.baue_praxis_datensatz)")
+        return 1
+
+    # Gemeinsame Eingabewerte: jeder String nur einmal dekodiert, wie in lade_csv_zeilen()
+    texte = datensatz.texte()
+    spalten = [datensatz.spalten[spalte] for spalte in SPALTEN]
+    werte = []
+    for idx in range(len(datensatz)):
+        name, email, telefon, webseite, plz, stadt, strasse, beansprucht = (texte[spalte[idx]] for spalte in spalten)
+        werte.append((
+            idx, name, email, telefon, webseite, plz, stadt, strasse, beansprucht,
+            *datensatz.koordinaten(idx), csv_schluessel(name, plz, strasse)
+        ))
+
+    print(f"{'Format':<14} {'Einträge':>9} {'Heap MB':>8} {'Bytes/Eintrag':>14} {'Aufbau ms':>10}")
+    ergebnisse = {}
+    for name, baue in (('dict', _als_dict), ('PraxisRecord', _als_record)):
+        anzahl, groesse, dauer = _messe(baue, werte)
+        ergebnisse[name] = groesse
+        print(f"{name:<14} {anzahl:>9} {groesse / 1024 / 1024:>8.1f} {groesse / anzahl:>14.0f} {dauer:>10.0f}")
+    print(f"Ersparnis: {(1 - ergebnisse['PraxisRecord'] / ergebnisse['dict']) * 100:.0f} %")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Benchmark für die Praxissuche (services/praxis_suche.py).
+
+Misst für einige Städte, Umkreise und Seiten die Dauer von Kandidatensuche
+mit vollständigen PraxisRecords, Reihenfolge (komplett sortiert vs. nur bis zur
+angefragten Seite) und kompletter Suche, die Records nur für die Einträge bis
+zur Seite baut (Median und p95 in ms). Geocoding wird nicht gemessen – die
+Koordinaten stehen fest.
+
+Läuft standardmäßig gegen eine temporäre SQLite-Datenbank (nur CSV-Praxen);
+mit --datenbank lässt sich eine Test-Datenbank mit Praxen angeben.
+
+Aufruf:
+    python -m tools.bench_praxis_suche
+    python -m tools.bench_praxis_suche --umkreis 25 50 --seiten 1 20 --wiederholungen 50
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+STAEDTE = {
+    'Berlin': (52.5200, 13.4050),
+    'München': (48.1372, 11.5756),
+    'Köln': (50.9375, 6.9603),
+    'Göttingen': (51.5413, 9.9158),
+    'Aarbergen': (50.2500, 8.0700),
+}
+
+
+def _ms(messungen):
+    werte = sorted(messungen)
+    return statistics.median(werte) * 1000, werte[int(len(werte) * 0.95) - 1 if len(werte) > 1 else 0] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dauer der Praxissuche messen")
+    parser.add_argument('--umkreis', type=float, nargs='+', default=[10, 25, 50])
+    parser.add_argument('--seiten', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--wiederholungen', type=int, default=20)
+    parser.add_argument('--leistung', default=None, help="Leistungs-Slug wie auf /<leistung>-<stadt>")
+    parser.add_argument('--datenbank', default=None, help="Test-Datenbank (Standard: temporäre SQLite-Datei)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as ordner:
+        os.environ['DATABASE_URL'] = args.datenbank or f"sqlite:///{os.path.join(ordner, 'suche.db')}"
+        os.environ['MIGRATIONEN_BEIM_START'] = '0'
+        from main import app
+        import migrations
+        from services.praxis_suche import praxis_suche, SuchAnfrage
+
+        with app.app_context():
+            if not args.datenbank:
+                migrations.fuehre_schema_migrationen_aus()
+            # Aufwärmen: Datensatz mappen, Overlay laden
+            praxis_suche.suche(SuchAnfrage(*STAEDTE['Berlin']))
+
+            print(f"\n{'Stadt':<10} {'km':>4} {'Seite':>5} {'Treffer':>8} "
+                  f"{'Kandidaten ms':>14} {'Voll ms':>8} {'Top-k ms':>9} {'Suche ms':>9} {'p95':>7}")
+            for stadt, (lat, lng) in STAEDTE.items():
+                for umkreis in args.umkreis:
+                    for seite in args.seiten:
+                        anfrage = SuchAnfrage(lat, lng, umkreis, seite, leistung=args.leistung, rotation=stadt.lower())
+                        kandidaten, voll, top_k, gesamt = [], [], [], []
+                        for _ in range(args.wiederholungen):
+                            start = time.perf_counter()
+                            treffer = praxis_suche.kandidaten(anfrage)
+                            kandidaten.append(time.perf_counter() - start)
+
+                            start = time.perf_counter()
+                            praxis_suche.ordne(list(treffer), anfrage)
+                            voll.append(time.perf_counter() - start)
+
+                            start = time.perf_counter()
+                            praxis_suche.ordne(list(treffer), anfrage, anzahl=seite * anfrage.pro_seite)
+                            top_k.append(time.perf_counter() - start)
+
+                            start = time.perf_counter()
+                            ergebnis = praxis_suche.suche(anfrage)
+                            gesamt.append(time.perf_counter() - start)
+                        median, p95 = _ms(gesamt)
+                        print(f"{stadt:<10} {umkreis:>4.0f} {seite:>5} {ergebnis.gesamt:>8} "
+                              f"{_ms(kandidaten)[0]:>14.2f} {_ms(voll)[0]:>8.2f} {_ms(top_k)[0]:>9.2f} {median:>9.2f} {p95:>7.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
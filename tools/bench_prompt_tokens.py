@@ -0,0 +1,84 @@
+"""
+Benchmark: Prompt-Tokens pro Anfrage für Chatbot, Praxis- und Stellenangebot-Texte.
+
+Vergleicht den ungekürzten Verlauf mit dem budgetierten Prompt-Aufbau aus
+services/prompt_budget.py und zeigt den Anteil des festen (cachebaren) Präfixes.
+Es werden keine API-Aufrufe gemacht.
+
+Aufruf:
+    python -m tools.bench_prompt_tokens
+"""
+import time
+
+from services import prompt_budget
+from services.prompt_budget import zaehle_tokens, zaehle_nachrichten_tokens
+from services.ai_service import (
+    _dental_match_messages, DENTAL_MATCH_SYSTEM_PROMPT,
+    PRAXIS_TEXT_SYSTEM_PROMPT, PRAXIS_TEXT_AUFGABEN,
+    STELLENANGEBOT_SYSTEM_PROMPT, STELLENANGEBOT_AUFGABEN,
+)
+
+FRAGE = "Ich habe seit ein paar Tagen Zahnfleischbluten beim Zähneputzen und suche eine Praxis in Köln, die auch samstags geöffnet hat. Was kann das sein?"
+ANTWORT = (
+    "Zahnfleischbluten kann verschiedene Ursachen haben, zum Beispiel eine Zahnfleischentzündung (Gingivitis) "
+    "oder beginnende Parodontitis. Ein Zahnarzt mit Schwerpunkt Parodontologie kann dir hier gut weiterhelfen.\n\n"
+    + "\n".join(
+        f"{i}. Zahnarztpraxis Beispiel {i}\n   Adresse: Musterstraße {i}, 50667 Köln\n   Telefon: 0221 123456{i}\n"
+        f"   Schwerpunkte: Parodontologie, Prophylaxe, Implantologie\n   ⭐ Google Bewertung: 4.{i}/5 ({i * 37} Google-Bewertungen)"
+        for i in range(1, 6)
+    )
+    + "\n\nMöchtest du, dass ich nach weiteren Kriterien filtere, zum Beispiel Angstpatienten oder Barrierefreiheit?"
+)
+PRAXEN = [
+    {
+        'name': f"Zahnarztpraxis Beispiel {i}", 'strasse': f"Musterstraße {i}", 'plz': '50667', 'stadt': 'Köln',
+        'telefon': f"0221 123456{i}", 'paket': 'premium' if i < 3 else 'basis',
+        'leistungsschwerpunkte': 'Parodontologie, Prophylaxe, Implantologie', 'angstpatientenfreundlich': i % 2 == 0,
+        'kinderfreundlich': True, 'barrierefrei': i % 3 == 0, 'sprachen': 'Deutsch, Englisch',
+        'bewertung_avg': 4.5, 'bewertung_anzahl': 12, 'google_rating': 4.6, 'google_review_count': 87,
+    }
+    for i in range(1, 11)
+]
+
+
+def verlauf(runden):
+    nachrichten = []
+    for _ in range(runden):
+        nachrichten.append({'role': 'user', 'content': FRAGE})
+        nachrichten.append({'role': 'assistant', 'content': ANTWORT})
+    return nachrichten
+
+
+def main():
+    zaehler = "tiktoken (o200k_base)" if prompt_budget._encoding is not None else "Schätzung (Zeichen/Token)"
+    print(f"Token-Zählung: {zaehler}, Verlauf-Budget: {prompt_budget.VERLAUF_TOKEN_BUDGET} Tokens\n")
+
+    praefix = zaehle_tokens(DENTAL_MATCH_SYSTEM_PROMPT)
+    print("Dental Match Chatbot (Prompt-Tokens pro Anfrage)")
+    print(f"{'Runden':>6} {'ungekürzt':>10} {'budgetiert':>11} {'Ersparnis':>10} {'fester Präfix':>14}")
+    for runden in (0, 1, 3, 6, 10, 20):
+        historie = verlauf(runden)
+        budgetiert = zaehle_nachrichten_tokens(_dental_match_messages(FRAGE, PRAXEN, historie))
+        ungekuerzt = budgetiert - zaehle_nachrichten_tokens(prompt_budget.kuerze_verlauf(historie)) + zaehle_nachrichten_tokens(historie)
+        ersparnis = 100 * (1 - budgetiert / ungekuerzt) if ungekuerzt else 0
+        print(f"{runden:>6} {ungekuerzt:>10} {budgetiert:>11} {ersparnis:>9.0f}% {100 * praefix / budgetiert:>13.0f}%")
+
+    print("\nPraxis-Texte (fester System-Prompt je Typ)")
+    for typ, aufgabe in PRAXIS_TEXT_AUFGABEN.items():
+        print(f"  {typ:<18} Präfix {zaehle_tokens(PRAXIS_TEXT_SYSTEM_PROMPT + aufgabe):>4} Tokens")
+
+    print("\nStellenangebot-Texte (fester System-Prompt je Feld)")
+    for typ, aufgabe in STELLENANGEBOT_AUFGABEN.items():
+        print(f"  {typ:<18} Präfix {zaehle_tokens(STELLENANGEBOT_SYSTEM_PROMPT + aufgabe):>4} Tokens")
+
+    historie = verlauf(10)
+    durchlaeufe = 2000
+    start = time.perf_counter()
+    for _ in range(durchlaeufe):
+        _dental_match_messages(FRAGE, PRAXEN, historie)
+    dauer_us = (time.perf_counter() - start) / durchlaeufe * 1e6
+    print(f"\nPrompt-Aufbau inkl. Kürzung (10 Runden Verlauf): {dauer_us:.0f} µs pro Anfrage")
+
+
+if __name__ == "__main__":
+    main()
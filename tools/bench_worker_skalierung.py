@@ -0,0 +1,191 @@
+"""
+Misst Speicher pro gunicorn-Worker und Durchsatz bei 1-4 Workern.
+
+Für jede Worker-Anzahl wird gunicorn (gthread, wie in render.yaml) gegen eine
+temporäre SQLite-Datenbank gestartet und unter Last abgefragt: /suche mit
+Koordinaten (ohne Geocoding), /api/chat/match mit Standort (Stadt-Matcher und
+Praxis-Index; ohne Azure-Schlüssel antwortet der Chatbot mit dem Fallback-Text)
+und /register mit Adresse (Adress-Index). So baut jeder Worker alle Indizes auf,
+die er in Produktion hält. Danach werden RSS und PSS jedes Workers aus
+/proc gelesen: PSS rechnet gemeinsam genutzte Seiten (z.B. den gemappten
+Praxis-Datensatz im Page-Cache) anteilig, die Summe entspricht dem echten
+Verbrauch gegenüber dem Speicherlimit.
+
+Aufruf:
+    python -m tools.bench_worker_skalierung
+    python -m tools.bench_worker_skalierung --worker 1 2 4 --dauer 20 --parallel 16
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import subprocess
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Suchmittelpunkte (Großstädte und ländliche Gegenden)
+ORTE = [
+    (52.52, 13.40), (53.55, 9.99), (48.14, 11.58), (50.94, 6.96), (50.11, 8.68),
+    (48.78, 9.18), (51.23, 6.78), (51.34, 12.37), (49.45, 11.08), (53.08, 8.80),
+    (50.98, 11.03), (54.32, 10.13), (49.01, 12.10), (51.96, 7.63), (47.99, 7.85),
+]
+
+STAEDTE = ['Berlin', 'Hamburg', 'München', 'Köln', 'Frankfurt', 'Stuttgart', 'Leipzig', 'Göttingen', 'Aarbergen']
+# (PLZ, Straße) für die Duplikatprüfung auf /register – Treffer oder nicht, der Index wird gebraucht
+ADRESSEN = [('10115', 'Invalidenstraße 12'), ('80331', 'Marienplatz 1'), ('50667', 'Hohe Straße 40'), ('37073', 'Weender Str. 5')]
+
+
+def _freier_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _proc_werte(pid):
+    """(RSS MB, PSS MB) eines Prozesses"""
+    werte = {}
+    for datei, feld in (('status', 'VmRSS:'), ('smaps_rollup', 'Pss:')):
+        try:
+            with open(f'/proc/{pid}/{datei}') as f:
+                for zeile in f:
+                    if zeile.startswith(feld):
+                        werte[feld] = int(zeile.split()[1]) / 1024
+                        break
+        except OSError:
+            pass
+    return werte.get('VmRSS:', 0.0), werte.get('Pss:', 0.0)
+
+
+def _kinder(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def _suche(basis_url):
+    lat, lng = random.choice(ORTE)
+    return urllib.request.Request(
+        f"{basis_url}/suche?lat={lat + random.uniform(-0.2, 0.2):.4f}&lng={lng + random.uniform(-0.2, 0.2):.4f}&umkreis=25"
+    )
+
+
+def _chat(basis_url):
+    stadt = random.choice(STAEDTE)
+    daten = {'message': f"Ich suche einen Zahnarzt für Kinder in {stadt}", 'location': stadt, 'filters': {'kinder': True}}
+    return urllib.request.Request(
+        f"{basis_url}/api/chat/match", data=json.dumps(daten).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}, method='POST'
+    )
+
+
+def _register(basis_url):
+    plz, strasse = random.choice(ADRESSEN)
+    return urllib.request.Request(f"{basis_url}/register?{urllib.parse.urlencode({'paket': 'premium', 'plz': plz, 'strasse': strasse})}")
+
+
+# Anteil der Routen an der Last (Gewichte)
+ROUTEN = [(_suche, 8), (_chat, 1), (_register, 1)]
+
+
+def _abfrage(basis_url, route=None):
+    route = route or random.choices([r for r, _ in ROUTEN], weights=[g for _, g in ROUTEN])[0]
+    with urllib.request.urlopen(route(basis_url), timeout=60) as antwort:
+        antwort.read()
+        return antwort.status
+
+
+def _warte_bereit(basis_url, prozess, timeout=60):
+    ende = time.monotonic() + timeout
+    while time.monotonic() < ende:
+        if prozess.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f"{basis_url}/", timeout=5):
+                return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+def _last(basis_url, dauer, parallel):
+    ende = time.monotonic() + dauer
+    fehler = 0
+
+    def schleife():
+        nonlocal fehler
+        anzahl = 0
+        while time.monotonic() < ende:
+            try:
+                _abfrage(basis_url)
+                anzahl += 1
+            except OSError:
+                fehler += 1
+        return anzahl
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        anzahl = sum(pool.map(lambda _: schleife(), range(parallel)))
+    return anzahl / (time.monotonic() - start), fehler
+
+
+def messe(worker, threads, dauer, parallel, env):
+    port = _freier_port()
+    basis_url = f"http://127.0.0.1:{port}"
+    prozess = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(worker),
+         '--worker-class', 'gthread', '--threads', str(threads), '--timeout', '120', '--log-level', 'warning', 'main:app'],
+        env=dict(env, WEB_CONCURRENCY=str(worker)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not _warte_bereit(basis_url, prozess):
+            raise RuntimeError("gunicorn nicht gestartet")
+        # Aufwärmen, damit jeder Worker seine Caches und Indizes geladen hat
+        with ThreadPoolExecutor(max_workers=worker * threads) as pool:
+            for route, _ in ROUTEN:
+                list(pool.map(lambda _: _abfrage(basis_url, route), range(worker * 20)))
+        durchsatz, fehler = _last(basis_url, dauer, parallel)
+        speicher = [_proc_werte(pid) for pid in _kinder(prozess.pid)]
+        master = _proc_werte(prozess.pid)
+    finally:
+        prozess.terminate()
+        prozess.wait(timeout=30)
+    return durchsatz, fehler, speicher, master
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speicher pro Worker und Durchsatz (Suche, Chatbot, Registrierung)")
+    parser.add_argument('--worker', type=int, nargs='+', default=[1, 2, 3, 4])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--dauer', type=float, default=15, help="Lastdauer je Messung in Sekunden")
+    parser.add_argument('--parallel', type=int, default=16, help="Gleichzeitige Clients")
+    args = parser.parse_args()
+
+    print(f"CPU-Kerne: {os.cpu_count()}")
+    print(f"{'Worker':>6} {'Anfr./s':>8} {'Fehler':>6} {'RSS/Worker':>11} {'PSS/Worker':>11} {'PSS gesamt':>11}")
+    with tempfile.TemporaryDirectory() as ordner:
+        env = dict(os.environ)
+        # Keine externen Aufrufe: Chatbot antwortet mit dem Fallback-Text, Standort über den Städtenamen
+        for schluessel in ('AZURE_OPENAI_API_KEY', 'GOOGLE_MAPS_API_KEY'):
+            env.pop(schluessel, None)
+        env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(ordner, 'bench.db')}")
+        env.setdefault('SESSION_SECRET', 'bench')
+        subprocess.run([sys.executable, 'migrations.py', '--schema'], env=env, check=True, capture_output=True)
+
+        for worker in args.worker:
+            durchsatz, fehler, speicher, master = messe(worker, args.threads, args.dauer, args.parallel, env)
+            rss = sum(r for r, _ in speicher) / max(len(speicher), 1)
+            pss = sum(p for _, p in speicher) / max(len(speicher), 1)
+            gesamt = sum(p for _, p in speicher) + master[1]
+            print(f"{worker:>6} {durchsatz:>8.1f} {fehler:>6} {rss:>9.0f}MB {pss:>9.0f}MB {gesamt:>9.0f}MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+"""
+Räumt nicht mehr referenzierte Praxisbilder auf (muss auf dem Webservice mit der Upload-Disk laufen).
+
+Aufruf:
+    python -m tools.bild_sweeper [--trockenlauf] [--karenz-std 24]
+"""
+import argparse
+from main import app
+from services.bild_speicher import raeume_verwaiste_bilder
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trockenlauf', action='store_true')
+    parser.add_argument('--karenz-std', type=int, default=24)
+    args = parser.parse_args()
+
+    with app.app_context():
+        ergebnis = raeume_verwaiste_bilder(karenz_sek=args.karenz_std * 3600, trockenlauf=args.trockenlauf)
+        print(f"🧹 {ergebnis['geloescht']} Dateien ({ergebnis['bytes'] / 1024 / 1024:.1f} MB) "
+              f"{'würden gelöscht' if args.trockenlauf else 'gelöscht'}, {ergebnis['referenziert']} von {ergebnis['bilder']} Bildern referenziert")
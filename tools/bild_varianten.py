@@ -0,0 +1,41 @@
+"""
+Erzeugt fehlende responsive Bildvarianten für bereits hochgeladene Praxisbilder
+(z.B. Uploads aus der Zeit vor der Varianten-Pipeline oder nach einem Neustart
+während der Verarbeitung).
+
+Aufruf:
+    python -m tools.bild_varianten [--prozesse 2]
+"""
+import os
+import re
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from image_utils import UPLOAD_FOLDER, ALLOWED_EXTENSIONS, erzeuge_varianten
+
+VARIANTE_RE = re.compile(r"-\d+w\.(webp|avif)$")
+
+
+def offene_bilder():
+    if not os.path.isdir(UPLOAD_FOLDER):
+        return []
+    offen = []
+    for ordner, _, namen in os.walk(UPLOAD_FOLDER):
+        for name in sorted(namen):
+            basis, endung = os.path.splitext(name)
+            if endung.lstrip('.').lower() not in ALLOWED_EXTENSIONS or VARIANTE_RE.search(name):
+                continue
+            if not os.path.exists(os.path.join(ordner, basis + '.json')):
+                offen.append(os.path.join(ordner, name))
+    return offen
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--prozesse', type=int, default=1)
+    args = parser.parse_args()
+
+    dateien = offene_bilder()
+    print(f"🖼️ {len(dateien)} Bilder ohne Varianten")
+    with ProcessPoolExecutor(max_workers=args.prozesse) as pool:
+        for dateipfad, ergebnis in zip(dateien, pool.map(erzeuge_varianten, dateien)):
+            print(f"✅ {ergebnis[0]}: {ergebnis[1]}")
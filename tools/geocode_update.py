@@ -1,50 +1,373 @@
+"""
+Ergänzt fehlende Koordinaten in einer Praxis-CSV per Google Geocoding (Batch).
+
+- Gleiche Adressen werden nur einmal abgefragt.
+- Bereits bekannte Adressen kommen aus dem dauerhaften Geocode-Cache
+  (Tabelle geocode_cache) und aus dem Checkpoint eines abgebrochenen Laufs.
+- Abfragen laufen parallel (--parallel), begrenzt durch einen Token-Bucket
+  (--rate Anfragen pro Sekunde); Limit- und Serverfehler werden mit Backoff
+  wiederholt.
+- Jedes Ergebnis wird sofort an den Checkpoint (<ausgabe>.checkpoint.jsonl)
+  angehängt – ein erneuter Aufruf setzt dort fort. Die Ausgabedatei wird erst am
+  Ende (atomar) geschrieben, danach werden die Ergebnisse in den Cache übernommen.
+
+Mit --selbsttest läuft das Ganze gegen einen lokalen HTTP-Stand-in der
+Google-API (kein API-Key, keine Datenbank nötig).
+
+Aufruf:
+    python -m tools.geocode_update
+    python -m tools.geocode_update --eingabe neue_zahnaerzte.csv --parallel 4 --rate 10
+    python -m tools.geocode_update --selbsttest
+"""
+import os
+import sys
 import csv
+import json
 import time
-from utils.geocode import get_coordinates_from_address
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-input_file = "neue_zahnaerzte.csv"
-output_file = "neue_zahnaerzte_mit_koordinaten.csv"
+import requests
 
-updated_rows = []
-count_updated = 0
+from utils.geocode import geocode_anfrage, geocode_schluessel, CACHEBARE_STATUS
 
-with open(input_file, newline='', encoding="utf-8") as infile:
-    reader = csv.DictReader(infile)
-    fieldnames = reader.fieldnames
+STANDARD_EINGABE = "neue_zahnaerzte.csv"
+STANDARD_AUSGABE = "neue_zahnaerzte_mit_koordinaten.csv"
+# Vorübergehende Fehler der API: erneut versuchen
+WIEDERHOLBARE_STATUS = ('OVER_QUERY_LIMIT', 'UNKNOWN_ERROR')
+MAX_VERSUCHE = 4
+CACHE_BLOCK = 200
 
-    for row in reader:
-        lat = row.get("lat", "").strip()
-        lng = row.get("lng", "").strip()
 
-        # Prüfe, ob Koordinaten bereits vorhanden und gültig sind
-        try:
-            if 45 <= float(lat) <= 55 and 5 <= float(lng) <= 15:
-                updated_rows.append(row)
-                continue
-        except:
-            pass
+class TokenBucket:
+    """Begrenzt die Anfragerate über alle Threads: `rate` Token pro Sekunde, höchstens `kapazitaet` auf Vorrat"""
+
+    def __init__(self, rate, kapazitaet=None):
+        self.rate = rate
+        self.kapazitaet = kapazitaet or max(1, int(rate))
+        self._token = float(self.kapazitaet)
+        self._zeit = time.monotonic()
+        self._lock = threading.Lock()
+
+    def nimm(self):
+        while True:
+            with self._lock:
+                jetzt = time.monotonic()
+                self._token = min(self.kapazitaet, self._token + (jetzt - self._zeit) * self.rate)
+                self._zeit = jetzt
+                if self._token >= 1:
+                    self._token -= 1
+                    return
+                warten = (1 - self._token) / self.rate
+            time.sleep(warten)
+
+
+class Checkpoint:
+    """Ergebnisse als JSON-Zeilen; eine abgebrochene letzte Zeile wird beim Laden ignoriert"""
+
+    def __init__(self, pfad):
+        self.pfad = pfad
+        self._lock = threading.Lock()
+
+    def lade(self):
+        ergebnisse = {}
+        if not os.path.exists(self.pfad):
+            return ergebnisse
+        with open(self.pfad, encoding='utf-8') as f:
+            for zeile in f:
+                try:
+                    eintrag = json.loads(zeile)
+                except ValueError:
+                    continue
+                ergebnisse[geocode_schluessel(eintrag['adresse'])] = (eintrag['status'], eintrag['lat'], eintrag['lng'])
+        return ergebnisse
+
+    def schreibe(self, adresse, status, lat, lng):
+        zeile = json.dumps({'adresse': adresse, 'status': status, 'lat': lat, 'lng': lng}, ensure_ascii=False)
+        with self._lock, open(self.pfad, 'a', encoding='utf-8') as f:
+            f.write(zeile + '\n')
+
+    def entferne(self):
+        if os.path.exists(self.pfad):
+            os.remove(self.pfad)
+
+
+def _hat_gueltige_koordinaten(row):
+    try:
+        return 45 <= float(row.get("lat", "").strip()) <= 55 and 5 <= float(row.get("lng", "").strip()) <= 15
+    except (TypeError, ValueError):
+        return False
+
+
+def _adresse(row):
+    return f'{row["straße"]}, {row["plz"]} {row["stadt"]}'
+
+
+def geocodiere_batch(adressen, api_key, parallel=4, rate=10.0, checkpoint=None, url=None):
+    """
+    Geokodiert eindeutige Adressen parallel mit Ratenbegrenzung.
+
+    Returns:
+        {schluessel: (status, lat, lng)} – endgültige Ergebnisse (OK/ZERO_RESULTS)
+        und Adressen, die auch nach allen Versuchen fehlschlugen
+    """
+    bucket = TokenBucket(rate)
+    lokal = threading.local()
+
+    def abfrage(adresse):
+        if not hasattr(lokal, 'session'):
+            lokal.session = requests.Session()
+        status = 'FEHLER'
+        for versuch in range(MAX_VERSUCHE):
+            bucket.nimm()
+            try:
+                status, lat, lng = geocode_anfrage(adresse, api_key, session=lokal.session, url=url)
+            except (requests.RequestException, ValueError, KeyError) as e:
+                status, lat, lng = f'FEHLER: {e}', None, None
+            else:
+                if status not in WIEDERHOLBARE_STATUS:
+                    break
+            time.sleep(min(2 ** versuch * 0.5, 8) * (1 + random.random()))
+        if checkpoint and status in CACHEBARE_STATUS:
+            checkpoint.schreibe(adresse, status, lat, lng)
+        return adresse, status, lat, lng
+
+    ergebnisse = {}
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        futures = [pool.submit(abfrage, adresse) for adresse in adressen]
+        for nummer, future in enumerate(as_completed(futures), 1):
+            adresse, status, lat, lng = future.result()
+            ergebnisse[geocode_schluessel(adresse)] = (status, lat, lng)
+            if status not in CACHEBARE_STATUS:
+                print(f"⚠️ {adresse}: {status}")
+            if nummer % 50 == 0 or nummer == len(futures):
+                print(f"🌍 {nummer}/{len(futures)} Adressen geokodiert")
+    return ergebnisse
+
+
+def aktualisiere_datei(eingabe, ausgabe, api_key, parallel=4, rate=10.0, max_anfragen=None,
+                       cache_lesen=None, cache_schreiben=None, url=None):
+    """
+    Ergänzt die Koordinaten aller Zeilen ohne gültige Werte.
+
+    Args:
+        max_anfragen: höchstens so viele neue Adressen abfragen (Rest beim nächsten Lauf)
+        cache_lesen/cache_schreiben: Zugriff auf den dauerhaften Cache (None = ohne)
+
+    Returns:
+        dict mit zeilen, adressen, aus_cache, abgefragt, aktualisiert, offen
+    """
+    with open(eingabe, newline='', encoding="utf-8") as infile:
+        reader = csv.DictReader(infile)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+
+    # Eindeutige Adressen der Zeilen ohne gültige Koordinaten
+    adressen = {}
+    for row in rows:
+        if not _hat_gueltige_koordinaten(row):
+            adressen.setdefault(geocode_schluessel(_adresse(row)), _adresse(row))
+
+    checkpoint = Checkpoint(f"{ausgabe}.checkpoint.jsonl")
+    bekannt = checkpoint.lade()
+    offen = [s for s in adressen if s not in bekannt]
+    aus_checkpoint = len(adressen) - len(offen)
+    aus_cache = 0
+    if cache_lesen and offen:
+        for schluessel, (lat, lng) in cache_lesen(offen).items():
+            bekannt[schluessel] = ('OK' if lat is not None else 'ZERO_RESULTS', lat, lng)
+            aus_cache += 1
+
+    neu = [adressen[s] for s in adressen if s not in bekannt]
+    if max_anfragen is not None:
+        neu = neu[:max_anfragen]
+    print(f"📋 {len(rows)} Zeilen, {len(adressen)} Adressen ohne Koordinaten: "
+          f"{aus_checkpoint} aus Checkpoint, {aus_cache} aus Cache, {len(neu)} abzufragen")
 
-        # Wenn leer oder ungültig → Geocoding durchführen
-        address = f'{row["straße"]}, {row["plz"]} {row["stadt"]}'
-        print(f"🌍 Geokodiere: {address}")
-        new_lat, new_lng = get_coordinates_from_address(address)
+    if neu:
+        if not api_key:
+            print("⚠️ GOOGLE_MAPS_API_KEY nicht gesetzt - Geocoding übersprungen")
+        else:
+            bekannt.update(geocodiere_batch(neu, api_key, parallel, rate, checkpoint, url))
 
-        if new_lat and new_lng:
-            row["lat"] = str(new_lat)
-            row["lng"] = str(new_lng)
+    count_updated = 0
+    for row in rows:
+        if _hat_gueltige_koordinaten(row):
+            continue
+        status, lat, lng = bekannt.get(geocode_schluessel(_adresse(row)), (None, None, None))
+        if lat is not None and lng is not None:
+            row["lat"] = str(lat)
+            row["lng"] = str(lng)
             count_updated += 1
         else:
             row["lat"] = ""
             row["lng"] = ""
 
-        updated_rows.append(row)
-        time.sleep(0.2)  # Verzögerung zur Einhaltung der Google API Rate Limits
+    tmp_pfad = f"{ausgabe}.tmp"
+    with open(tmp_pfad, "w", newline='', encoding="utf-8") as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_pfad, ausgabe)
+
+    if cache_schreiben:
+        endgueltig = [
+            (adressen[s], *bekannt[s]) for s in adressen if s in bekannt and bekannt[s][0] in CACHEBARE_STATUS
+        ]
+        gespeichert = sum(cache_schreiben(endgueltig[i:i + CACHE_BLOCK]) for i in range(0, len(endgueltig), CACHE_BLOCK))
+        print(f"💾 {gespeichert} neue Adressen im Geocode-Cache gespeichert")
+
+    offen_danach = sum(1 for s in adressen if s not in bekannt or bekannt[s][0] not in CACHEBARE_STATUS)
+    if not offen_danach:
+        checkpoint.entferne()
+    return {
+        'zeilen': len(rows), 'adressen': len(adressen), 'aus_cache': aus_cache,
+        'abgefragt': len(neu), 'aktualisiert': count_updated, 'offen': offen_danach,
+    }
+
+
+# ========================================
+# SELBSTTEST MIT LOKALEM STAND-IN
+# ========================================
+
+def _starte_stand_in():
+    """HTTP-Server im Format der Geocoding-API; zählt Anfragen je Adresse"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+    anfragen = {}
+    zeitpunkte = []
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            adresse = parse_qs(urlparse(self.path).query)['address'][0]
+            with lock:
+                anfragen[adresse] = anfragen.get(adresse, 0) + 1
+                zeitpunkte.append(time.monotonic())
+                erster_versuch = anfragen[adresse] == 1
+            if 'unbekannt' in adresse:
+                antwort = {'status': 'ZERO_RESULTS', 'results': []}
+            elif 'limit' in adresse and erster_versuch:
+                antwort = {'status': 'OVER_QUERY_LIMIT', 'results': []}
+            else:
+                plz = int(adresse.split(', ')[1].split()[0])
+                antwort = {'status': 'OK', 'results': [{'geometry': {'location': {
+                    'lat': 47.5 + (plz % 700) / 100, 'lng': 6.0 + (plz % 800) / 100}}}]}
+            daten = json.dumps(antwort).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(daten)))
+            self.end_headers()
+            self.wfile.write(daten)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/geocode/json", anfragen, zeitpunkte
+
+
+def selbsttest(parallel=4, rate=20.0):
+    server, url, anfragen, zeitpunkte = _starte_stand_in()
+    ok = True
+
+    def pruefe(bedingung, text):
+        nonlocal ok
+        print(f"{'✅' if bedingung else '❌'} {text}")
+        ok = ok and bedingung
+
+    with tempfile.TemporaryDirectory() as ordner:
+        eingabe = os.path.join(ordner, 'eingabe.csv')
+        ausgabe = os.path.join(ordner, 'ausgabe.csv')
+        with open(eingabe, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['name', 'straße', 'plz', 'stadt', 'lat', 'lng'])
+            writer.writeheader()
+            for i in range(120):
+                # Jede Adresse kommt zweimal vor (Dubletten), dazu gültige, unbekannte und limitierte Zeilen
+                strasse = 'unbekannt 1' if i % 40 == 0 else ('limit 2' if i % 30 == 0 else f'Teststr. {i % 60}')
+                writer.writerow({'name': f'Praxis {i}', 'straße': strasse, 'plz': f'{10000 + i % 60}', 'stadt': 'Teststadt',
+                                 'lat': '50.1' if i % 7 == 0 else '', 'lng': '8.6' if i % 7 == 0 else ''})
+
+        cache = {}
+
+        def cache_lesen(schluessel):
+            return {s: cache[s] for s in schluessel if s in cache}
+
+        def cache_schreiben(eintraege):
+            neu = [e for e in eintraege if geocode_schluessel(e[0]) not in cache]
+            cache.update({geocode_schluessel(a): (lat, lng) for a, _, lat, lng in neu})
+            return len(neu)
+
+        # Lauf 1 bricht nach 20 Adressen ab (Budget), Lauf 2 setzt am Checkpoint fort
+        start = time.monotonic()
+        erster = aktualisiere_datei(eingabe, ausgabe, 'test', parallel, rate, max_anfragen=20, url=url)
+        zweiter = aktualisiere_datei(eingabe, ausgabe, 'test', parallel, rate, url=url,
+                                     cache_lesen=cache_lesen, cache_schreiben=cache_schreiben)
+        dauer = time.monotonic() - start
+
+        mehrfach = {a: n for a, n in anfragen.items() if n > 1 and 'limit' not in a}
+        pruefe(not mehrfach, f"jede Adresse nur einmal abgefragt ({sum(anfragen.values())} Anfragen für {len(anfragen)} Adressen)")
+        pruefe(erster['abgefragt'] == 20 and zweiter['abgefragt'] == zweiter['adressen'] - 20,
+               f"Fortsetzung am Checkpoint (Lauf 1: {erster['abgefragt']}, Lauf 2: {zweiter['abgefragt']} Adressen)")
+        pruefe(any(n == 2 for a, n in anfragen.items() if 'limit' in a), "OVER_QUERY_LIMIT wird wiederholt")
+        pruefe(zweiter['offen'] == 0 and not os.path.exists(f"{ausgabe}.checkpoint.jsonl"), "alles erledigt, Checkpoint entfernt")
+        # Zwei Läufe mit je vollem Bucket (kapazitaet = rate) dürfen sofort starten
+        mindestdauer = (len(zeitpunkte) - 2 * int(rate)) / rate
+        pruefe(dauer >= mindestdauer, f"Rate eingehalten ({len(zeitpunkte)} Anfragen in {dauer:.1f} s, Grenze {rate:.0f}/s)")
+
+        with open(ausgabe, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        ohne = [r for r in rows if not r['lat']]
+        pruefe(all('unbekannt' in r['straße'] for r in ohne) and len(rows) == 120,
+               f"Koordinaten ergänzt ({len(rows) - len(ohne)} von {len(rows)} Zeilen, nur unbekannte Adressen ohne)")
+
+        vorher = sum(anfragen.values())
+        dritter = aktualisiere_datei(eingabe, ausgabe, 'test', parallel, rate, url=url, cache_lesen=cache_lesen)
+        pruefe(sum(anfragen.values()) == vorher and dritter['aus_cache'] == dritter['adressen'],
+               f"erneuter Lauf komplett aus dem Cache ({dritter['aus_cache']} Adressen, 0 Anfragen)")
+
+    server.shutdown()
+    print("✅ Selbsttest bestanden" if ok else "❌ Selbsttest fehlgeschlagen")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fehlende Koordinaten in einer Praxis-CSV ergänzen")
+    parser.add_argument('--eingabe', default=STANDARD_EINGABE)
+    parser.add_argument('--ausgabe', default=STANDARD_AUSGABE)
+    parser.add_argument('--parallel', type=int, default=4, help="Gleichzeitige Anfragen")
+    parser.add_argument('--rate', type=float, default=10.0, help="Höchstens so viele Anfragen pro Sekunde")
+    parser.add_argument('--max-anfragen', type=int, default=None, help="Neue Adressen pro Lauf begrenzen")
+    parser.add_argument('--ohne-cache', action='store_true', help="Dauerhaften Geocode-Cache (Datenbank) nicht nutzen")
+    parser.add_argument('--selbsttest', action='store_true', help="Gegen einen lokalen Stand-in der API testen")
+    args = parser.parse_args()
+
+    if args.selbsttest:
+        return selbsttest(args.parallel, args.rate)
+
+    api_key = os.environ.get("GOOGLE_MAPS_API_KEY")
+    kwargs = dict(parallel=args.parallel, rate=args.rate, max_anfragen=args.max_anfragen)
+    if args.ohne_cache or not os.environ.get("DATABASE_URL"):
+        print("ℹ️ Ohne dauerhaften Geocode-Cache")
+        ergebnis = aktualisiere_datei(args.eingabe, args.ausgabe, api_key, **kwargs)
+    else:
+        from main import app
+        from utils.geocode import lade_geocode_cache, speichere_geocode_cache
+        with app.app_context():
+            ergebnis = aktualisiere_datei(args.eingabe, args.ausgabe, api_key, cache_lesen=lade_geocode_cache,
+                                          cache_schreiben=speichere_geocode_cache, **kwargs)
+
+    print(f"✅ {ergebnis['aktualisiert']} Koordinaten ergänzt.")
+    if ergebnis['offen']:
+        print(f"⏸️ {ergebnis['offen']} Adressen offen – erneuter Aufruf setzt am Checkpoint fort")
+    print(f"📄 Datei gespeichert als: {args.ausgabe}")
+    return 0
 
-# Schreibe aktualisierte Datei
-with open(output_file, "w", newline='', encoding="utf-8") as outfile:
-    writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-    writer.writeheader()
-    writer.writerows(updated_rows)
 
-print(f"✅ {count_updated} Koordinaten ergänzt.")
-print(f"📄 Datei gespeichert als: {output_file}")
+if __name__ == "__main__":
+    sys.exit(main())
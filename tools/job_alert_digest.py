@@ -0,0 +1,14 @@
+"""
+Versendet fällige Job-Alert Sammel-E-Mails (täglich/wöchentlich).
+
+Aufruf (z.B. als Render-Cronjob):
+    python -m tools.job_alert_digest
+"""
+from main import app
+from services.job_alert_service import versende_job_alert_digests
+
+if __name__ == "__main__":
+    with app.app_context():
+        ergebnis = versende_job_alert_digests()
+        print(f"📬 Job-Alert Digest: {ergebnis['gesendet']} E-Mails an {ergebnis['empfaenger']} Empfänger, "
+              f"{ergebnis['stellen']} Stellen, {ergebnis['fehler']} Fehler")
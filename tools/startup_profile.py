@@ -0,0 +1,129 @@
+"""
+Startprofil: Importzeit von `main` (so wie gunicorn die App lädt) als Baum.
+
+Startet einen frischen Interpreter mit `-X importtime`, misst die Gesamtzeit
+bis `main:app` bereit ist und zeigt die teuersten Module mit ihren teuersten
+Unter-Imports. Schlägt fehl (Exit-Code 1), wenn das Zeitbudget überschritten
+wird oder schwere Bibliotheken schon beim Start geladen werden – diese sollen
+erst bei der ersten Benutzung importiert werden.
+
+Ohne DATABASE_URL wird eine temporäre SQLite-Datenbank verwendet; die
+Schema-Migrationen werden dort beim ersten Start nachgeholt (siehe migrations.py)
+und sind in der gemessenen Zeit enthalten.
+
+Aufruf:
+    python -m tools.startup_profile
+    python -m tools.startup_profile --budget-ms 2000 --top 15
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+# Werden erst bei Bedarf importiert (Rechnungen, Zahlung, Bild-Upload, KI-Aufrufe)
+LAZY_MODULE = ('weasyprint', 'stripe', 'PIL', 'openai')
+STANDARD_BUDGET_MS = int(os.environ.get('STARTUP_BUDGET_MS', 2500))
+
+MESS_SKRIPT = f"""
+import sys, time, json
+start = time.perf_counter()
+import main
+dauer = (time.perf_counter() - start) * 1000
+geladen = [m for m in {LAZY_MODULE!r} if m in sys.modules]
+print('STARTPROFIL ' + json.dumps({{'dauer_ms': dauer, 'geladen': geladen, 'module': len(sys.modules)}}))
+"""
+
+
+class Knoten:
+    __slots__ = ('name', 'eigen_us', 'kumuliert_us', 'kinder')
+
+    def __init__(self, name, eigen_us, kumuliert_us):
+        self.name = name
+        self.eigen_us = eigen_us
+        self.kumuliert_us = kumuliert_us
+        self.kinder = []
+
+
+def parse_importtime(stderr):
+    """
+    Baut aus der `-X importtime`-Ausgabe einen Baum.
+
+    Python gibt ein Modul erst nach seinen Unter-Imports aus; die Einrückung
+    (zwei Leerzeichen pro Ebene) gibt die Tiefe an.
+
+    Returns:
+        Liste der Wurzelknoten (direkt vom Messskript importiert)
+    """
+    offen = {}  # tiefe -> bereits ausgegebene Kinder, die auf ihr Elternmodul warten
+    for zeile in stderr.splitlines():
+        if not zeile.startswith('import time:') or 'self [us]' in zeile:
+            continue
+        eigen, kumuliert, name = zeile[len('import time:'):].split('|', 2)
+        # Ein Leerzeichen nach '|', danach zwei pro Ebene
+        tiefe = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        knoten = Knoten(name.strip(), int(eigen), int(kumuliert))
+        knoten.kinder = offen.pop(tiefe + 1, [])
+        offen.setdefault(tiefe, []).append(knoten)
+    return offen.get(0, [])
+
+
+def _zeige(knoten, tiefe, max_tiefe, top, min_ms, ausgabe):
+    ausgabe.append(f"{knoten.kumuliert_us / 1000:>9.1f} {knoten.eigen_us / 1000:>8.1f}  {'  ' * tiefe}{knoten.name}")
+    if tiefe + 1 >= max_tiefe:
+        return
+    kinder = sorted(knoten.kinder, key=lambda k: k.kumuliert_us, reverse=True)[:top]
+    for kind in kinder:
+        if kind.kumuliert_us / 1000 >= min_ms:
+            _zeige(kind, tiefe + 1, max_tiefe, top, min_ms, ausgabe)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importzeit-Profil für main:app")
+    parser.add_argument('--budget-ms', type=float, default=STANDARD_BUDGET_MS, help="Maximale Startzeit in ms")
+    parser.add_argument('--top', type=int, default=10, help="Teuerste Module pro Ebene")
+    parser.add_argument('--tiefe', type=int, default=3, help="Anzeigetiefe des Baums")
+    parser.add_argument('--min-ms', type=float, default=5.0, help="Kleinere Module ausblenden")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as ordner:
+        env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(ordner, 'startprofil.db')}")
+        ergebnis = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', MESS_SKRIPT],
+            capture_output=True, text=True, env=env, cwd=os.getcwd()
+        )
+
+    zeilen = [z for z in ergebnis.stdout.splitlines() if z.startswith('STARTPROFIL ')]
+    if ergebnis.returncode != 0 or not zeilen:
+        print(ergebnis.stderr[-3000:])
+        print("❌ Import von main fehlgeschlagen")
+        return 1
+
+    messung = json.loads(zeilen[-1][len('STARTPROFIL '):])
+    wurzeln = parse_importtime(ergebnis.stderr)
+
+    ausgabe = [f"{'kum. ms':>9} {'eigen ms':>8}  Modul"]
+    for wurzel in sorted(wurzeln, key=lambda k: k.kumuliert_us, reverse=True)[:args.top]:
+        _zeige(wurzel, 0, args.tiefe, args.top, args.min_ms, ausgabe)
+    print('\n'.join(ausgabe))
+
+    import_ms = sum(w.kumuliert_us for w in wurzeln) / 1000
+    print(f"\nModule geladen: {messung['module']}")
+    print(f"Importzeit (Summe der Wurzeln): {import_ms:.0f} ms")
+    print(f"Start bis main:app bereit: {messung['dauer_ms']:.0f} ms (Budget {args.budget_ms:.0f} ms)")
+
+    ok = True
+    if messung['geladen']:
+        print(f"❌ Beim Start geladen, sollte lazy sein: {', '.join(messung['geladen'])}")
+        ok = False
+    if messung['dauer_ms'] > args.budget_ms:
+        print("❌ Startzeit über Budget")
+        ok = False
+    print("✅ Startprofil im Budget" if ok else "❌ Startprofil verletzt")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
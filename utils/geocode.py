@@ -1,28 +1,94 @@
 import requests
 import os
+import re
+import hashlib
+import logging
 from functools import lru_cache
 
-@lru_cache(maxsize=10000)
-def get_coordinates_from_address(address):
-    api_key = os.environ.get("GOOGLE_MAPS_API_KEY")
+logger = logging.getLogger(__name__)
 
-    if not api_key:
-        print("⚠️ GOOGLE_MAPS_API_KEY nicht gesetzt - Geocoding übersprungen")
-        return None, None
+# Über GOOGLE_GEOCODE_URL lässt sich ein lokaler Stand-in angeben (tools/geocode_update.py --selbsttest)
+GEOCODE_URL = os.environ.get("GOOGLE_GEOCODE_URL", "https://maps.googleapis.com/maps/api/geocode/json")
+GEOCODE_TIMEOUT_SEK = 10
+# Endgültige Antworten – alles andere (Limit, Serverfehler) wird nicht gecacht
+CACHEBARE_STATUS = ('OK', 'ZERO_RESULTS')
+
+_LEERZEICHEN_RE = re.compile(r'\s+')
 
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
+
+def geocode_schluessel(address):
+    """Cache-Schlüssel einer Adresse (Groß-/Kleinschreibung und Leerzeichen normalisiert)"""
+    normalisiert = _LEERZEICHEN_RE.sub(' ', (address or '').strip().lower())
+    return hashlib.sha1(normalisiert.encode('utf-8')).hexdigest()
+
+
+def geocode_anfrage(address, api_key, session=None, url=None):
+    """
+    Eine Anfrage an die Geocoding-API.
+
+    Returns:
+        (status, lat, lng) – lat/lng None, wenn status nicht 'OK' ist
+    """
     params = {
         "address": address,
         "key": api_key,
         "region": "de"
     }
-
-    response = requests.get(url, params=params)
+    response = (session or requests).get(url or GEOCODE_URL, params=params, timeout=GEOCODE_TIMEOUT_SEK)
     data = response.json()
 
     if data["status"] == "OK":
         location = data["results"][0]["geometry"]["location"]
-        return location["lat"], location["lng"]
-    else:
-        print("Geocoding fehlgeschlagen:", data)
+        return "OK", location["lat"], location["lng"]
+    return data["status"], None, None
+
+
+def lade_geocode_cache(schluessel_liste):
+    """Gespeicherte Ergebnisse {schluessel: (lat, lng)} (lat/lng None = nicht gefunden); braucht App-Kontext"""
+    from models import GeocodeCache
+
+    ergebnis = {}
+    schluessel_liste = list(schluessel_liste)
+    for start in range(0, len(schluessel_liste), 500):
+        for row in GeocodeCache.query.filter(GeocodeCache.schluessel.in_(schluessel_liste[start:start + 500])).all():
+            ergebnis[row.schluessel] = (row.lat, row.lng)
+    return ergebnis
+
+
+def speichere_geocode_cache(eintraege):
+    """
+    Speichert Ergebnisse [(adresse, status, lat, lng), ...] im dauerhaften Cache
+    (bereits vorhandene Adressen werden übersprungen); braucht App-Kontext.
+
+    Returns:
+        Anzahl neu gespeicherter Adressen
+    """
+    from models import GeocodeCache
+    from database import db
+
+    neu = {}
+    for adresse, status, lat, lng in eintraege:
+        if status in CACHEBARE_STATUS:
+            neu[geocode_schluessel(adresse)] = GeocodeCache(
+                schluessel=geocode_schluessel(adresse), adresse=adresse[:300], status=status, lat=lat, lng=lng
+            )
+    for schluessel in lade_geocode_cache(neu):
+        neu.pop(schluessel)
+    if neu:
+        db.session.add_all(neu.values())
+        db.session.commit()
+    return len(neu)
+
+
+@lru_cache(maxsize=10000)
+def get_coordinates_from_address(address):
+    api_key = os.environ.get("GOOGLE_MAPS_API_KEY")
+
+    if not api_key:
+        print("⚠️ GOOGLE_MAPS_API_KEY nicht gesetzt - Geocoding übersprungen")
         return None, None
+
+    status, lat, lng = geocode_anfrage(address, api_key)
+    if status != "OK":
+        print("Geocoding fehlgeschlagen:", status)
+    return lat, lng
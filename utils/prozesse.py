@@ -0,0 +1,19 @@
+import os
+
+
+def anzahl_prozesse():
+    """Anzahl der Worker-Prozesse dieses Services (WEB_CONCURRENCY wie bei gunicorn, sonst 1)"""
+    try:
+        return max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+    except ValueError:
+        return 1
+
+
+def anteil_pro_prozess(gesamt):
+    """
+    Anteil eines Prozesses an einem Limit, das für den ganzen Service gilt.
+
+    Rate-Limiter, Token-Bucket und Semaphoren zählen nur im eigenen Prozess –
+    mit N gunicorn-Workern würde jedes Limit sonst N-mal gewährt.
+    """
+    return max(1, int(gesamt) // anzahl_prozesse())
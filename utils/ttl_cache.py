@@ -0,0 +1,54 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-sicherer LRU-Cache mit Ablaufzeit und Datenversion.
+
+    Wechselt die Datenversion (z.B. weil sich der Praxis-Bestand geändert hat),
+    wird der komplette Cache verworfen.
+    """
+
+    def __init__(self, max_eintraege=500, ttl_sekunden=3600):
+        self.max_eintraege = max_eintraege
+        self.ttl_sekunden = ttl_sekunden
+        self._daten = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.treffer = 0
+        self.fehlschlaege = 0
+
+    def _pruefe_version(self, version):
+        if version != self._version:
+            self._daten.clear()
+            self._version = version
+
+    def get(self, key, version=None):
+        with self._lock:
+            self._pruefe_version(version)
+            eintrag = self._daten.get(key)
+            if eintrag is None or eintrag[0] < time.monotonic():
+                if eintrag is not None:
+                    del self._daten[key]
+                self.fehlschlaege += 1
+                return None
+            self._daten.move_to_end(key)
+            self.treffer += 1
+            return eintrag[1]
+
+    def set(self, key, wert, version=None):
+        with self._lock:
+            self._pruefe_version(version)
+            self._daten[key] = (time.monotonic() + self.ttl_sekunden, wert)
+            self._daten.move_to_end(key)
+            while len(self._daten) > self.max_eintraege:
+                self._daten.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._daten.clear()
+
+    def __len__(self):
+        return len(self._daten)
@@ -0,0 +1,14 @@
+"""
+Hintergrund-Worker für die persistente Job-Queue (services/job_queue.py).
+
+Start: python worker.py
+"""
+import logging
+from main import app
+from services.job_queue import worker_loop, installiere_signal_handler
+
+if __name__ == "__main__":
+    logging.getLogger(__name__).info("Starte Hintergrund-Worker...")
+    installiere_signal_handler()
+    with app.app_context():
+        worker_loop()